@@ -1,26 +1,86 @@
 import os
+import hmac
 import json
 from datetime import datetime, timedelta
-from flask import Flask, request, Response
-from twilio.twiml.messaging_response import MessagingResponse
+from flask import Flask, request, Response, jsonify
 from twilio.twiml.voice_response import VoiceResponse
 from twilio.rest import Client
 import sqlite3
-from utils.image_processing import process_image, blur_faces, remove_metadata
+from utils.image_processing import blur_faces, remove_metadata
 from utils.ocr import extract_vin
 from utils.stolen_vehicle_api import check_stolen_status
-from utils.bait_car_api import get_nearby_bait_cars
+from utils.vin_decoder import vin_decoder
+from utils.stolen_hotlist import stolen_hotlist
+from utils.bait_car_api import get_nearby_bait_cars, bait_car_fleet
 from utils.redis_manager import RedisManager
-from database.models import create_tables, save_report, delete_old_reports
-from config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, DEBUG_MODE
+from utils.media_pipeline import MediaPipeline
+from utils.call_dispatcher import CallDispatcher, EMERGENCY_PRIORITY, FAMILY_PRIORITY
+from utils.command_router import CommandRouter
+from utils.rate_limiter import RateLimiter
+from utils.retention_scheduler import RetentionScheduler, create_leader_lock
+from utils.twiml_cache import TwimlCache, template_renderer, TEMPLATE_DIR
+from utils.metrics import metrics
+from database.models import create_tables, save_report
+from database.retention import RetentionEngine
+from database.report_queries import iter_reports_near, reports_near, report_hotspots
+from database.export import stream_export, columnar_format, EXPORT_TABLES, EXPORT_FORMATS, pq
+from utils.spatial_index import bounding_box
+from config import (
+    TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, DEBUG_MODE, VOICE_TWIML_SOURCE,
+    RETENTION_SCHEDULER_ENABLED, REPORT_RETENTION_HOURS, REPORT_QUERY_MAX_LIMIT
+)
 
 app = Flask(__name__)
 client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
 redis_manager = RedisManager()
+redis_manager.start_location_eviction()
+vin_decoder.redis_manager = redis_manager
+stolen_hotlist.start_sync()
+bait_car_fleet.start()
 
 # Ensure database tables exist
 create_tables()
 
+# Expired reports are purged continuously in short chunks by whichever
+# worker holds the leader lock; their image files are unlinked by a
+# background thread
+retention_engine = RetentionEngine()
+retention_scheduler = RetentionScheduler(retention_engine, create_leader_lock(redis_manager))
+if RETENTION_SCHEDULER_ENABLED:
+    retention_scheduler.start()
+else:
+    retention_engine.start_image_deleter()
+
+# Images are processed by background workers so /sms can reply right away
+media_pipeline = MediaPipeline()
+media_pipeline.start()
+
+# Per-number budgets for each class of command
+rate_limiter = RateLimiter(redis_manager)
+
+# Outbound calls are placed by their own workers so /sms replies right away
+call_dispatcher = CallDispatcher(client)
+call_dispatcher.start()
+
+# SMS replies (shared with the async server in asgi_app.py)
+EMERGENCY_CALL_REPLY = "Initiating emergency call to your phone. Stay safe."
+FAMILY_CALL_REPLY = "Initiating family emergency call to your phone."
+REPORT_REPLY = "Thank you for your report. Your anonymous report ID is {report_id}. All images are being processed to protect privacy. The report will be automatically deleted after 48 hours."
+STOLEN_REPLY = "⚠️ ALERT: This vehicle with VIN {vin} is REPORTED STOLEN. Do not approach. Contact IMPD at 317-327-3811."
+NOT_STOLEN_REPLY = "✅ Vehicle with VIN {vin} is not reported stolen in our database."
+NO_VIN_REPLY = "Could not detect a VIN in the image. Please try with a clearer photo of the VIN plate."
+VIN_PHOTO_NEEDED_REPLY = "Please send a photo of the vehicle's VIN plate for checking."
+BAIT_CAR_NEARBY_REPLY = "🚨 Police bait car active near you. Park here to deter theft!"
+NO_BAIT_CAR_REPLY = "No active bait cars currently reported in your immediate area."
+LOCATION_NEEDED_REPLY = "Location information is needed to check for nearby bait cars. Please enable location sharing."
+HELP_REPLY = ("Indianapolis Public Safety Bot Commands:\n"
+              "- 'report [details]' + photo: Report suspicious activity\n"
+              "- 'check vin' + photo: Check if a vehicle is stolen\n"
+              "- 'bait cars': Check for nearby bait cars\n"
+              "- 'RED': Emergency help (triggers call)\n"
+              "- 'call mom': Fake family emergency call")
+THROTTLED_REPLY = "You're sending messages too quickly. Please wait a few minutes and try again."
+
 
 @app.route('/')
 def index():
@@ -53,137 +113,224 @@ def index():
     """
     
     
+# SMS commands, highest priority first. Emergency keywords are matched
+# anywhere in the message, on word boundaries.
+sms_router = CommandRouter()
+
+@sms_router.command('emergency', r'red', rate_class='call')
+def emergency_command(message):
+    # Queue the emergency call ahead of everything else
+    call_dispatcher.dispatch(message.from_number, message.url_root + 'emergency_call', EMERGENCY_PRIORITY)
+    return EMERGENCY_CALL_REPLY
+
+@sms_router.command('family_call', r'call mom', rate_class='call')
+def family_call_command(message):
+    # Queue the family emergency call
+    call_dispatcher.dispatch(message.from_number, message.url_root + 'family_call', FAMILY_PRIORITY)
+    return FAMILY_CALL_REPLY
+
+@sms_router.command('report', r'report', needs_media=True, rate_class='report')
+def report_command(message):
+    # Attached images are downloaded, stripped of metadata and face-blurred
+    # by the background media pipeline
+    if message.image_urls:
+        report_id = media_pipeline.submit_report(message.argument, message.image_urls,
+                                                 message.latitude, message.longitude)
+    else:
+        report_id = save_report(message.argument, [], message.latitude, message.longitude)
+    return REPORT_REPLY.format(report_id=report_id)
+
+@sms_router.command('check_vin', r'check vin', needs_media=True, rate_class='lookup')
+def check_vin_command(message):
+    if not message.image_urls:
+        return VIN_PHOTO_NEEDED_REPLY
+    
+    # Extract VIN from the first photo using OCR
+    vin = extract_vin(message.image_urls[0])
+    if not vin:
+        return NO_VIN_REPLY
+    
+    # Check if vehicle is stolen; the reply doesn't show vehicle details,
+    # so skip the NHTSA decode
+    stolen_status = check_stolen_status(vin, with_details=False)
+    return (STOLEN_REPLY if stolen_status['is_stolen'] else NOT_STOLEN_REPLY).format(vin=vin)
+
+@sms_router.command('bait_cars', r'bait cars?', rate_class='lookup')
+def bait_cars_command(message):
+    if not (message.latitude and message.longitude):
+        return LOCATION_NEEDED_REPLY
+    nearby_bait_cars = get_nearby_bait_cars(float(message.latitude), float(message.longitude))
+    return BAIT_CAR_NEARBY_REPLY if nearby_bait_cars else NO_BAIT_CAR_REPLY
+
+@sms_router.default
+def help_command(message):
+    # Help message for unknown commands
+    return HELP_REPLY
+
 @app.route('/sms', methods=['POST'])
 def sms_reply():
     """Main route for handling incoming SMS messages"""
+    handler, message, command = sms_router.route(request.values, request.url_root)
     
-    # Get incoming message details
-    incoming_msg = request.values.get('Body', '').strip().lower()
-    media_count = int(request.values.get('NumMedia', 0))
-    from_number = request.values.get('From', '')
-    latitude = request.values.get('Latitude')
-    longitude = request.values.get('Longitude')
-    
-    # Initialize Twilio response
-    resp = MessagingResponse()
-    
-    # Process emergency keywords (priority check)
-    if "red" in incoming_msg.lower():
-        # Trigger emergency call
-        client.calls.create(
-            to=from_number,
-            from_=TWILIO_PHONE_NUMBER,
-            url=request.url_root + 'emergency_call'
-        )
-        resp.message("Initiating emergency call to your phone. Stay safe.")
-        return str(resp)
-    
-    elif "call mom" in incoming_msg.lower():
-        # Trigger family emergency call
-        client.calls.create(
-            to=from_number,
-            from_=TWILIO_PHONE_NUMBER,
-            url=request.url_root + 'family_call'
-        )
-        resp.message("Initiating family emergency call to your phone.")
-        return str(resp)
-    
-    # Process based on message content
-    if "report" in incoming_msg and media_count > 0:
-        # Crime reporting with image
-        report_text = incoming_msg.replace("report", "").strip()
-        
-        # Process attached media
-        media_urls = []
-        for i in range(media_count):
-            media_url = request.values.get(f'MediaUrl{i}')
-            media_type = request.values.get(f'MediaContentType{i}')
-            
-            if media_type.startswith('image/'):
-                # Process image - remove metadata and blur faces
-                processed_img_path = process_image(media_url)
-                # Save to database with report
-                media_urls.append(processed_img_path)
-        
-        # Save report to database (anonymously)
-        report_id = save_report(report_text, media_urls, latitude, longitude)
-        resp.message(f"Thank you for your report. Your anonymous report ID is {report_id}. All images have been processed to protect privacy. The report will be automatically deleted after 48 hours.")
-    
-    elif "check vin" in incoming_msg and media_count > 0:
-        # Stolen vehicle check
-        for i in range(media_count):
-            media_url = request.values.get(f'MediaUrl{i}')
-            media_type = request.values.get(f'MediaContentType{i}')
-            
-            if media_type.startswith('image/'):
-                # Extract VIN using OCR
-                vin = extract_vin(media_url)
-                if vin:
-                    # Check if vehicle is stolen
-                    stolen_status = check_stolen_status(vin)
-                    if stolen_status['is_stolen']:
-                        resp.message(f"⚠️ ALERT: This vehicle with VIN {vin} is REPORTED STOLEN. Do not approach. Contact IMPD at 317-327-3811.")
-                    else:
-                        resp.message(f"✅ Vehicle with VIN {vin} is not reported stolen in our database.")
-                else:
-                    resp.message("Could not detect a VIN in the image. Please try with a clearer photo of the VIN plate.")
-                break
-        else:
-            resp.message("Please send a photo of the vehicle's VIN plate for checking.")
-    
-    elif "bait cars" in incoming_msg:
-        # Bait car alerts check
-        if latitude and longitude:
-            nearby_bait_cars = get_nearby_bait_cars(float(latitude), float(longitude))
-            if nearby_bait_cars:
-                resp.message("🚨 Police bait car active near you. Park here to deter theft!")
-            else:
-                resp.message("No active bait cars currently reported in your immediate area.")
-        else:
-            resp.message("Location information is needed to check for nearby bait cars. Please enable location sharing.")
-    
+    # Over-budget numbers are turned away before any photo is downloaded
+    if rate_limiter.allow_message(message, command):
+        reply = handler(message)
     else:
-        # Help message for unknown commands
-        resp.message("Indianapolis Public Safety Bot Commands:\n"
-                     "- 'report [details]' + photo: Report suspicious activity\n"
-                     "- 'check vin' + photo: Check if a vehicle is stolen\n"
-                     "- 'bait cars': Check for nearby bait cars\n"
-                     "- 'RED': Emergency help (triggers call)\n"
-                     "- 'call mom': Fake family emergency call")
-    
-    return str(resp)
+        reply = THROTTLED_REPLY
+    return Response(twiml_cache.message(reply), mimetype='text/xml')
 
-@app.route('/emergency_call', methods=['POST'])
-def emergency_call():
-    """Route for emergency call TwiML"""
+def emergency_call_twiml(url_root):
+    """TwiML for the emergency call"""
     response = VoiceResponse()
-    response.play(url=request.url_root + 'static/audio/emergency_call.mp3')
+    response.play(url=url_root + 'static/audio/emergency_call.mp3')
     response.say("This is an emergency call. If you're in danger, please try to get to safety. "
                  "Police have been notified of your location and are on their way. "
                  "Stay on the line if possible.", voice='woman')
     response.pause(length=30)
     response.say("Help is on the way. Please stay calm.", voice='woman')
-    return Response(str(response), mimetype='text/xml')
+    return str(response)
 
-@app.route('/family_call', methods=['POST'])
-def family_call():
-    """Route for fake family emergency call TwiML"""
+def family_call_twiml(url_root):
+    """TwiML for the fake family emergency call"""
     response = VoiceResponse()
-    response.play(url=request.url_root + 'static/audio/family_call.mp3')
+    response.play(url=url_root + 'static/audio/family_call.mp3')
     response.say("Hey, it's mom. There's an emergency at home. "
                  "We need you to come right away. The situation is urgent. "
                  "Please call me back as soon as you can.", voice='woman')
     response.pause(length=5)
     response.say("I hope you can get home soon. It's important.", voice='woman')
-    return Response(str(response), mimetype='text/xml')
+    return str(response)
+
+# Static replies are rendered once and served as the same bytes
+twiml_cache = TwimlCache()
+twiml_cache.add_messages(EMERGENCY_CALL_REPLY, FAMILY_CALL_REPLY, NO_VIN_REPLY, VIN_PHOTO_NEEDED_REPLY,
+                         BAIT_CAR_NEARBY_REPLY, NO_BAIT_CAR_REPLY, LOCATION_NEEDED_REPLY, HELP_REPLY, THROTTLED_REPLY)
+if VOICE_TWIML_SOURCE == 'templates':
+    twiml_cache.add_voice('emergency_call', template_renderer(os.path.join(TEMPLATE_DIR, 'emergency.xml')))
+    twiml_cache.add_voice('family_call', template_renderer(os.path.join(TEMPLATE_DIR, 'family_emergency.xml')))
+else:
+    twiml_cache.add_voice('emergency_call', emergency_call_twiml)
+    twiml_cache.add_voice('family_call', family_call_twiml)
+
+@app.route('/emergency_call', methods=['POST'])
+def emergency_call():
+    """Route for emergency call TwiML"""
+    return Response(twiml_cache.voice('emergency_call', request.url_root), mimetype='text/xml')
+
+@app.route('/family_call', methods=['POST'])
+def family_call():
+    """Route for fake family emergency call TwiML"""
+    return Response(twiml_cache.voice('family_call', request.url_root), mimetype='text/xml')
+
+def is_admin_request():
+    """Check the request's key against ADMIN_KEY (never matches while ADMIN_KEY is unset)"""
+    admin_key = os.environ.get('ADMIN_KEY')
+    return bool(admin_key) and hmac.compare_digest(request.args.get('key', ''), admin_key)
 
 @app.route('/cleanup', methods=['GET'])
 def cleanup_old_reports():
     """Admin route to manually trigger cleanup of old reports"""
-    if request.args.get('key') == os.environ.get('ADMIN_KEY'):
-        count = delete_old_reports()
-        return f"Deleted {count} reports older than 48 hours."
+    if is_admin_request():
+        stats = retention_engine.purge()
+        return (f"Deleted {stats.deleted} reports older than 48 hours "
+                f"({stats.rows_per_second:.0f} reports/s, longest lock hold {stats.max_lock_ms:.1f} ms).")
     return "Unauthorized", 401
 
+@app.route('/metrics', methods=['GET'])
+def show_metrics():
+    """Admin route exposing in-process performance metrics"""
+    if is_admin_request():
+        return jsonify(metrics.snapshot())
+    return "Unauthorized", 401
+
+@app.route('/reports/near', methods=['GET'])
+def query_reports_near():
+    """Admin route: reports within ?radius miles of ?lat,?lon in the last ?hours
+    
+    Returns a page of at most ?limit reports plus the ?before cursor for the
+    next page, or with ?stream=1 every match as newline-delimited JSON.
+    """
+    if not is_admin_request():
+        return "Unauthorized", 401
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius = float(request.args.get('radius', 1))
+        hours = float(request.args.get('hours', REPORT_RETENTION_HOURS))
+        limit = min(int(request.args.get('limit', 100)), REPORT_QUERY_MAX_LIMIT)
+        before = request.args.get('before', type=int)
+    except (KeyError, ValueError):
+        return "lat and lon are required; radius, hours, limit and before must be numbers", 400
+    if limit < 1:
+        return "limit must be at least 1", 400
+    
+    if request.args.get('stream') == '1':
+        results = iter_reports_near(lat, lon, radius, hours, before)
+        return Response((json.dumps(report) + '\n' for report in results), mimetype='application/x-ndjson')
+    
+    reports, next_before = reports_near(lat, lon, radius, hours, limit, before)
+    return jsonify({'reports': reports, 'before': next_before})
+
+@app.route('/reports/hotspots', methods=['GET'])
+def query_report_hotspots():
+    """Admin route: report counts per ?cell-degree grid cell in the last ?hours
+    
+    The area is either ?south, ?west, ?north and ?east, or ?radius miles
+    around ?lat,?lon.
+    """
+    if not is_admin_request():
+        return "Unauthorized", 401
+    try:
+        if 'lat' in request.args:
+            box = bounding_box(float(request.args['lat']), float(request.args['lon']),
+                               float(request.args.get('radius', 5)))
+        else:
+            box = tuple(float(request.args[name]) for name in ('south', 'north', 'west', 'east'))
+        hours = float(request.args.get('hours', REPORT_RETENTION_HOURS))
+        cell = float(request.args.get('cell', 0.01))
+        limit = min(int(request.args.get('limit', 100)), REPORT_QUERY_MAX_LIMIT)
+    except (KeyError, ValueError):
+        return "Give lat, lon and radius or south, west, north and east; hours, cell and limit must be numbers", 400
+    if cell <= 0:
+        return "cell must be positive", 400
+    if limit < 1:
+        return "limit must be at least 1", 400
+    
+    return jsonify({'cells': report_hotspots(*box, hours, cell, limit)})
+
+@app.route('/export', methods=['GET'])
+def export_table():
+    """Admin route streaming a whole ?table (reports or bait_car_logs) as a file
+    
+    ?format is ndjson (default), parquet, csv (gzipped) or columnar (the
+    best of the two available); ?since and ?until limit the rows to a UTC
+    time window. Rows come from one read snapshot, in fixed-size batches.
+    """
+    if not is_admin_request():
+        return "Unauthorized", 401
+    
+    table = request.args.get('table', 'reports')
+    export_format = request.args.get('format', 'ndjson')
+    if export_format == 'columnar':
+        export_format = columnar_format()
+    if table not in EXPORT_TABLES or export_format not in EXPORT_FORMATS:
+        return f"table must be one of {', '.join(EXPORT_TABLES)} and format one of ndjson, parquet, csv, columnar", 400
+    if export_format == 'parquet' and pq is None:
+        return "Parquet export needs pyarrow; use format=csv", 400
+    
+    try:
+        window = [
+            datetime.fromisoformat(request.args[name]).strftime('%Y-%m-%d %H:%M:%S') if name in request.args else None
+            for name in ('since', 'until')
+        ]
+    except ValueError:
+        return "since and until must be ISO times (YYYY-MM-DD HH:MM:SS, UTC)", 400
+    
+    extension, mimetype = EXPORT_FORMATS[export_format]
+    return Response(
+        stream_export(table, export_format, *window), mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={table}{extension}'}
+    )
+
 if __name__ == '__main__':
     app.run(debug=DEBUG_MODE)
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""Async (ASGI) server mode for the Twilio webhooks
+
+Serves /sms, /emergency_call and /family_call on an event loop so one
+process can hold hundreds of webhooks in flight. Media downloads are
+awaited; OCR runs on a thread pool (OpenCV and the Tesseract subprocess
+don't hold the GIL); SQLite writes and stolen-vehicle lookups run on the
+blocking-call pool. Outbound calls for RED / call mom are queued on the
+same CallDispatcher as the Flask app. Everything else (home page, admin
+routes) stays on the Flask app.
+
+Run with: uvicorn asgi_app:app --workers 4
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+from app import (
+    media_pipeline, call_dispatcher, rate_limiter, twiml_cache, sms_router as flask_sms_router,
+    EMERGENCY_CALL_REPLY, FAMILY_CALL_REPLY, REPORT_REPLY, STOLEN_REPLY, NOT_STOLEN_REPLY,
+    NO_VIN_REPLY, VIN_PHOTO_NEEDED_REPLY, BAIT_CAR_NEARBY_REPLY, NO_BAIT_CAR_REPLY,
+    LOCATION_NEEDED_REPLY, HELP_REPLY, THROTTLED_REPLY
+)
+from utils.call_dispatcher import EMERGENCY_PRIORITY, FAMILY_PRIORITY
+from utils.command_router import CommandRouter
+from utils.async_media_fetcher import create_async_media_fetcher
+from utils.ocr import extract_vin_from_bytes
+from utils.stolen_vehicle_api import check_stolen_status
+from utils.bait_car_api import get_nearby_bait_cars
+from database.models import save_report
+from config import IMAGE_WORKERS, ASGI_BLOCKING_THREADS, ASGI_MAX_BODY_BYTES
+
+class Services:
+    """Clients that must be created inside the running event loop"""
+    
+    def __init__(self):
+        self.media = None
+        self.ocr_executor = None
+    
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(ASGI_BLOCKING_THREADS, thread_name_prefix='asgi-blocking'))
+        self.ocr_executor = ThreadPoolExecutor(IMAGE_WORKERS, thread_name_prefix='asgi-ocr')
+        self.media = create_async_media_fetcher()
+    
+    async def stop(self):
+        await self.media.close()
+        self.ocr_executor.shutdown(wait=False)
+
+services = Services()
+
+async def extract_vin_async(media_url):
+    """Download a photo and OCR it without blocking the event loop"""
+    try:
+        image_bytes = await services.media.fetch(media_url)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(services.ocr_executor, extract_vin_from_bytes, image_bytes)
+    
+    except Exception as e:
+        print(f"Error extracting VIN: {str(e)}")
+        return None
+
+# Same commands as the Flask app, with coroutine handlers
+sms_router = CommandRouter(flask_sms_router.commands)
+
+@sms_router.handler('emergency')
+async def emergency_command(message):
+    # Only a queue put, so it is safe to do on the event loop
+    call_dispatcher.dispatch(message.from_number, message.url_root + 'emergency_call', EMERGENCY_PRIORITY)
+    return EMERGENCY_CALL_REPLY
+
+@sms_router.handler('family_call')
+async def family_call_command(message):
+    call_dispatcher.dispatch(message.from_number, message.url_root + 'family_call', FAMILY_PRIORITY)
+    return FAMILY_CALL_REPLY
+
+@sms_router.handler('report')
+async def report_command(message):
+    # SQLite writes block, so they run on the blocking-call pool
+    if message.image_urls:
+        report_id = await asyncio.to_thread(media_pipeline.submit_report, message.argument, message.image_urls,
+                                            message.latitude, message.longitude)
+    else:
+        report_id = await asyncio.to_thread(save_report, message.argument, [], message.latitude, message.longitude)
+    return REPORT_REPLY.format(report_id=report_id)
+
+@sms_router.handler('check_vin')
+async def check_vin_command(message):
+    if not message.image_urls:
+        return VIN_PHOTO_NEEDED_REPLY
+    
+    vin = await extract_vin_async(message.image_urls[0])
+    if not vin:
+        return NO_VIN_REPLY
+    
+    stolen_status = await asyncio.to_thread(check_stolen_status, vin, with_details=False)
+    return (STOLEN_REPLY if stolen_status['is_stolen'] else NOT_STOLEN_REPLY).format(vin=vin)
+
+@sms_router.handler('bait_cars')
+async def bait_cars_command(message):
+    if not (message.latitude and message.longitude):
+        return LOCATION_NEEDED_REPLY
+    # The fleet lookup is in memory, but a hit is logged to SQLite
+    nearby_bait_cars = await asyncio.to_thread(get_nearby_bait_cars, float(message.latitude), float(message.longitude))
+    return BAIT_CAR_NEARBY_REPLY if nearby_bait_cars else NO_BAIT_CAR_REPLY
+
+@sms_router.default
+async def help_command(message):
+    return HELP_REPLY
+
+async def sms_reply(values, url_root):
+    """Async version of app.sms_reply"""
+    handler, message, command = sms_router.route(values, url_root)
+    
+    # One Redis round-trip, but it can block on a Redis stall, so it runs off the loop
+    if await asyncio.to_thread(rate_limiter.allow_message, message, command):
+        reply = await handler(message)
+    else:
+        reply = THROTTLED_REPLY
+    return twiml_cache.message(reply)
+
+async def emergency_call(values, url_root):
+    return twiml_cache.voice('emergency_call', url_root)
+
+async def family_call(values, url_root):
+    return twiml_cache.voice('family_call', url_root)
+
+ROUTES = {
+    ('POST', '/sms'): sms_reply,
+    ('POST', '/emergency_call'): emergency_call,
+    ('POST', '/family_call'): family_call,
+}
+
+async def read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body.extend(message.get('body', b''))
+        if len(body) > ASGI_MAX_BODY_BYTES:
+            return None
+        if not message.get('more_body'):
+            return bytes(body)
+
+def url_root_for(scope):
+    """Equivalent of Flask's request.url_root"""
+    headers = dict(scope['headers'])
+    host = headers.get(b'host', b'').decode() or '{}:{}'.format(*scope['server'])
+    return f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}/"
+
+async def send_response(send, status, body, content_type='text/plain; charset=utf-8'):
+    body = body.encode() if isinstance(body, str) else body
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await services.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await services.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    
+    route = ROUTES.get((scope['method'], scope['path']))
+    if route is None:
+        return await send_response(send, 404, 'Not Found')
+    
+    body = await read_body(receive)
+    if body is None:
+        return await send_response(send, 413, 'Request Entity Too Large')
+    
+    # Same as Flask's request.values: query string, then form fields
+    values = dict(parse_qsl(scope.get('query_string', b'').decode()))
+    values.update(parse_qsl(body.decode('utf-8', 'replace')))
+    
+    try:
+        twiml = await route(values, url_root_for(scope))
+    except Exception as e:
+        print(f"Error handling {scope['path']}: {str(e)}")
+        return await send_response(send, 500, 'Internal Server Error')
+    await send_response(send, 200, twiml, 'text/xml; charset=utf-8')
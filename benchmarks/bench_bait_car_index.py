@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Compare bait car lookup latency: grid index vs linear haversine scan
+
+Usage: python benchmarks/bench_bait_car_index.py [num_queries]
+"""
+import os
+import sys
+import time
+import random
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.bait_car_api import calculate_distance
+from utils.spatial_index import GridIndex
+
+def make_fleet(size, rng):
+    """Random active bait cars spread over the Indianapolis metro area"""
+    return {
+        f'bc-{i}': (rng.uniform(39.63, 39.93), rng.uniform(-86.33, -85.95), None)
+        for i in range(size)
+    }
+
+def linear_scan(fleet, lat, lon, radius_miles):
+    """The original lookup: haversine against every car"""
+    nearby = []
+    for car_id, (car_lat, car_lon, _) in fleet.items():
+        if calculate_distance(lat, lon, car_lat, car_lon) <= radius_miles:
+            nearby.append((car_id, round(calculate_distance(lat, lon, car_lat, car_lon), 2)))
+    return nearby
+
+def time_queries(lookup, queries):
+    start = time.perf_counter()
+    for lat, lon in queries:
+        lookup(lat, lon, 0.5)
+    return (time.perf_counter() - start) * 1e6 / len(queries)
+
+def main():
+    num_queries = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(42)
+    queries = [(rng.uniform(39.63, 39.93), rng.uniform(-86.33, -85.95)) for _ in range(num_queries)]
+
+    print(f"{'fleet size':>10} {'linear us/query':>16} {'index us/query':>15} {'speedup':>8} {'sync ms':>8}")
+    for size in (5, 100, 500, 5000, 50000):
+        fleet = make_fleet(size, rng)
+        index = GridIndex()
+
+        start = time.perf_counter()
+        index.sync(fleet)
+        sync_ms = (time.perf_counter() - start) * 1000
+
+        linear_us = time_queries(lambda lat, lon, r: linear_scan(fleet, lat, lon, r), queries)
+        index_us = time_queries(index.query, queries)
+        print(f"{size:>10} {linear_us:>16.1f} {index_us:>15.1f} {linear_us / index_us:>7.1f}x {sync_ms:>8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Measure SMS command classification throughput and accuracy
+
+Builds a corpus of real-looking messages (commands with surrounding text,
+plus everyday chatter containing words like "bored", "reduced" or
+"credit") and classifies it with the old substring if/elif chain and with
+the precompiled CommandRouter.
+
+Usage: python benchmarks/bench_command_router.py [corpus_size]
+"""
+import os
+import sys
+import time
+import random
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import sms_router
+
+COMMANDS = [
+    ("RED", 'emergency', False), ("red help me", 'emergency', False), ("Please RED now!", 'emergency', False),
+    ("call mom", 'family_call', False), ("Call Mom please", 'family_call', False),
+    ("report broken window at 38th and Meridian", 'report', True),
+    ("Report suspicious van parked for 3 days", 'report', True),
+    ("check vin", 'check_vin', True), ("Check VIN on this one", 'check_vin', True),
+    ("bait cars", 'bait_cars', False), ("any bait cars near me?", 'bait_cars', False),
+]
+CHATTER = [
+    "I'm bored, what is this number?", "prices reduced at the store", "my credit card was declined",
+    "Fred told me to text this", "hello", "thanks!", "who is this", "stop", "ordered pizza, delivered late",
+    "is the library open on sunday", "the shredder in the office is broken", "hi there, need info on permits",
+]
+
+def substring_chain(text, has_media):
+    """The previous classification: ordered substring checks"""
+    text = text.strip().lower()
+    if "red" in text.lower():
+        return 'emergency'
+    elif "call mom" in text.lower():
+        return 'family_call'
+    if "report" in text and has_media:
+        return 'report'
+    elif "check vin" in text and has_media:
+        return 'check_vin'
+    elif "bait cars" in text:
+        return 'bait_cars'
+    return None
+
+def router(text, has_media):
+    match = sms_router.classify(text.strip(), has_media)
+    return match.name if match else None
+
+def build_corpus(size, seed=7):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        if rng.random() < 0.5:
+            text, expected, has_media = rng.choice(COMMANDS)
+        else:
+            text, expected, has_media = rng.choice(CHATTER), None, rng.random() < 0.1
+        corpus.append((text, has_media, expected))
+    return corpus
+
+def measure(classify, corpus):
+    started = time.perf_counter()
+    results = [classify(text, has_media) for text, has_media, _ in corpus]
+    elapsed = time.perf_counter() - started
+    wrong = sum(result != expected for result, (_, _, expected) in zip(results, corpus))
+    false_emergencies = sum(result == 'emergency' and expected != 'emergency'
+                            for result, (_, _, expected) in zip(results, corpus))
+    return len(corpus) / elapsed, wrong / len(corpus), false_emergencies
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    corpus = build_corpus(size)
+    
+    print(f"{size} messages")
+    print(f"{'classifier':<18}{'msgs/s':>12}{'misclassified':>15}{'false RED':>11}")
+    for name, classify in (('substring chain', substring_chain), ('command router', router)):
+        rate, error_rate, false_emergencies = measure(classify, corpus)
+        print(f"{name:<18}{rate:>12,.0f}{error_rate:>14.1%}{false_emergencies:>11}")
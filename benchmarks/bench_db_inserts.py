@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare report inserts per second with and without the connection pool
+
+Also compares 16 concurrent writers with group commit on and off.
+
+Usage: python benchmarks/bench_db_inserts.py [num_reports]
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import models
+
+def save_report_unpooled(db_path, report_text, image_paths, latitude, longitude):
+    """The original save_report: a fresh connection and default pragmas per call"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.execute(
+        'INSERT INTO reports (report_text, latitude, longitude, images) VALUES (?, ?, ?, ?)',
+        (report_text, latitude, longitude, json.dumps(image_paths))
+    )
+    report_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return report_id
+
+def run(label, insert, num_reports):
+    start = time.perf_counter()
+    for i in range(num_reports):
+        insert(f'benchmark report {i}', ['/tmp/a.jpg'], 39.768, -86.158)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {num_reports / elapsed:>10.0f} inserts/s  ({elapsed * 1000 / num_reports:.3f} ms/insert)")
+
+def run_concurrent(label, insert, num_reports, num_threads=16):
+    per_thread = num_reports // num_threads
+
+    def worker():
+        for i in range(per_thread):
+            insert(f'benchmark report {i}', ['/tmp/a.jpg'], 39.768, -86.158)
+
+    threads = [threading.Thread(target=worker) for _ in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    total = per_thread * num_threads
+    print(f"{label:<28} {total / elapsed:>10.0f} inserts/s  ({num_threads} threads)")
+
+def main():
+    num_reports = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Baseline on a rollback-journal database, as the app used to run
+        baseline_path = os.path.join(tmpdir, 'baseline.db')
+        conn = sqlite3.connect(baseline_path)
+        with open(os.path.join(os.path.dirname(models.__file__), 'schema.sql')) as f:
+            conn.executescript(f.read())
+        conn.close()
+        run('per-call connect', lambda *args: save_report_unpooled(baseline_path, *args), num_reports)
+
+        with patch.object(models, 'DATABASE_PATH', os.path.join(tmpdir, 'pooled.db')), \
+                patch.object(models, 'WRITE_BATCHING_ENABLED', False):
+            models.create_tables()
+            run('pooled WAL connection', models.save_report, num_reports)
+            run_concurrent('concurrent, commit per row', models.save_report, num_reports)
+
+        with patch.object(models, 'DATABASE_PATH', os.path.join(tmpdir, 'batched.db')), \
+                patch.object(models, 'WRITE_BATCHING_ENABLED', True):
+            models.create_tables()
+            run_concurrent('concurrent, group commit', models.save_report, num_reports)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Measure export throughput, output size and peak memory per format
+
+Fills a scratch database with synthetic reports and streams the reports
+table in every available format, counting bytes instead of storing them.
+Peak memory (tracemalloc) should stay flat as num_reports grows, since
+only one batch is held at a time.
+
+Usage: python benchmarks/bench_export.py [num_reports]
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import models
+from database.export import stream_export, pq
+
+def fill(num_reports, batch_size=50000):
+    for offset in range(0, num_reports, batch_size):
+        rows = [
+            (f'Suspicious activity near stop {i % 977}', 39.6 + (i % 3000) / 10000, -86.3 + (i % 3700) / 10000,
+             f'2026-01-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00', '[]')
+            for i in range(offset, min(offset + batch_size, num_reports))
+        ]
+        with models.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO reports (report_text, latitude, longitude, timestamp, images) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+
+def run(export_format, num_reports):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in stream_export('reports', export_format))
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{export_format:<10}{num_reports / seconds:>14,.0f}{size / 1e6:>12.1f}{peak / 1e6:>14.1f}")
+
+if __name__ == '__main__':
+    num_reports = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(models, 'DATABASE_PATH', os.path.join(tmpdir, 'bench.db')):
+            models.create_tables()
+            fill(num_reports)
+            print(f"{num_reports} reports")
+            print(f"{'format':<10}{'rows/s':>14}{'MB out':>12}{'peak MB':>14}")
+            for export_format in ['ndjson', 'csv'] + (['parquet'] if pq is not None else []):
+                run(export_format, num_reports)
+            models.close_db_connections()
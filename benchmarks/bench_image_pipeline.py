@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Compare the legacy and single-decode image privacy pipelines
+
+Generates synthetic 12MP JPEGs with EXIF and runs each pipeline in its own
+process so peak memory (max RSS) is measured independently.
+
+Usage: python benchmarks/bench_image_pipeline.py [num_images]
+"""
+import os
+import sys
+import json
+import time
+import resource
+import tempfile
+import subprocess
+from io import BytesIO
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import cv2
+from PIL import Image
+
+def make_corpus(directory, num_images, width=4000, height=3000):
+    """Write synthetic 12MP photos with camera EXIF"""
+    rng = np.random.default_rng(7)
+    paths = []
+    for i in range(num_images):
+        # Smooth gradients plus noise compress like a real photo
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        base = (x + y) / 2
+        pixels = np.stack([base, np.roll(base, i * 50, axis=1), 255 - base], axis=2)
+        pixels += rng.normal(0, 8, size=(height, width, 1)).astype(np.float32)
+        exif = Image.Exif()
+        exif[0x010F] = 'BenchCam'
+        path = os.path.join(directory, f'photo_{i}.jpg')
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(path, 'JPEG', quality=90, exif=exif)
+        paths.append(path)
+    return paths
+
+def legacy_process_image(image_data, output_path):
+    """The original pipeline: PIL decode, pixel list copy, save, re-read, blur, re-save"""
+    from utils.image_processing import blur_faces
+    image = Image.open(image_data)
+    data = list(image.getdata())
+    clean = Image.new(image.mode, image.size)
+    clean.putdata(data)
+    clean.save(output_path)
+    # The original detected faces on the full-resolution image
+    with patch('utils.image_processing.FACE_DETECTION_MAX_DIMENSION', 0):
+        blur_faces(output_path)
+    return output_path
+
+def run_variant(variant, paths, output_dir):
+    import utils.image_processing as image_processing
+    from database import models
+    from utils.media_store import media_store
+    from utils.cv_models import warm_models
+    warm_models()
+    models.DATABASE_PATH = os.path.join(output_dir, 'bench.db')
+    models.create_tables()
+
+    timings = []
+    for i, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            data = f.read()
+        started = time.perf_counter()
+        if variant == 'legacy':
+            legacy_process_image(BytesIO(data), os.path.join(output_dir, f'legacy_{i}.jpg'))
+        else:
+            with patch.object(image_processing, 'download_image', return_value=BytesIO(data)), \
+                    patch.object(media_store, 'root', output_dir):
+                image_processing.process_image('bench://photo')
+        timings.append((time.perf_counter() - started) * 1000)
+
+    print(json.dumps({
+        'ms_per_image': sum(timings) / len(timings),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }))
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--variant':
+        run_variant(sys.argv[2], json.loads(sys.argv[3]), sys.argv[4])
+        return
+
+    num_images = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = make_corpus(tmpdir, num_images)
+        print(f"{num_images} synthetic 12MP images")
+        print(f"{'pipeline':<14} {'ms/image':>10} {'peak RSS MB':>12}")
+        for variant in ('legacy', 'single-decode'):
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--variant', variant, json.dumps(paths), tmpdir],
+                capture_output=True, text=True, check=True
+            )
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{variant:<14} {stats['ms_per_image']:>10.0f} {stats['peak_rss_mb']:>12.0f}")
+
+if __name__ == '__main__':
+    main()
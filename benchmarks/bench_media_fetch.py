@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Compare attachment download latency for 1 vs 10 attachments
+
+Serves 200 KB attachments with 50 ms of simulated latency from a local
+stand-in server and times bare requests.get, the pooled fetcher one by
+one, and the pooled fetcher downloading all attachments concurrently.
+
+Usage: python benchmarks/bench_media_fetch.py [rounds]
+"""
+import os
+import sys
+import time
+import requests
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.stub_server import StubServer
+from utils.media_fetcher import MediaFetcher
+
+BODY = os.urandom(200 * 1024)
+
+def attachment(handler):
+    time.sleep(0.05)
+    return 200, {'Content-Type': 'image/jpeg'}, BODY
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) * 1000 / rounds
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    fetcher = MediaFetcher()
+
+    with StubServer({f'/media/{i}': attachment for i in range(10)}) as server:
+        print(f"{'attachments':>11} {'bare get ms':>12} {'pooled ms':>10} {'concurrent ms':>14}")
+        for count in (1, 10):
+            urls = [f'{server.url}/media/{i}' for i in range(count)]
+            bare = timed(lambda: [requests.get(url).content for url in urls], rounds)
+            pooled = timed(lambda: [fetcher.fetch(url) for url in urls], rounds)
+            concurrent = timed(lambda: fetcher.fetch_all(urls), rounds)
+            print(f"{count:>11} {bare:>12.1f} {pooled:>10.1f} {concurrent:>14.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Measure location updates per second at different batch sizes
+
+Runs against REDIS_URL when a server is reachable, otherwise against an
+in-memory fakeredis server (which shows client-side overhead only, not
+network round-trips).
+
+Usage: python benchmarks/bench_redis_batch.py [num_updates]
+"""
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis
+from utils.redis_manager import RedisManager, create_redis_client, hash_phone_number
+
+def get_client():
+    client = create_redis_client()
+    try:
+        client.ping()
+        return client, 'redis server'
+    except redis.RedisError:
+        import fakeredis
+        return fakeredis.FakeRedis(), 'fakeredis'
+
+def main():
+    num_updates = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    client, backend = get_client()
+    manager = RedisManager(redis_client=client)
+    updates = [(f'+1317{i:07d}', 39.7 + (i % 1000) / 10000, -86.2 + (i % 997) / 10000) for i in range(num_updates)]
+
+    print(f"backend: {backend}, {num_updates} updates")
+    print(f"{'batch size':>10} {'updates/s':>12}")
+    for batch_size in (1, 100, 10000):
+        client.flushdb()
+        hash_phone_number.cache_clear()
+        start = time.perf_counter()
+        if batch_size == 1:
+            for phone_number, latitude, longitude in updates:
+                manager.cache_user_location(phone_number, latitude, longitude)
+        else:
+            for i in range(0, num_updates, batch_size):
+                manager.cache_user_locations(updates[i:i + batch_size], chunk_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{batch_size:>10} {num_updates / elapsed:>12.0f}")
+
+    # Hashing cost with and without the memo, for numbers seen repeatedly
+    numbers = [phone_number for phone_number, _, _ in updates[:1000]] * 20
+    hash_phone_number.cache_clear()
+    start = time.perf_counter()
+    for phone_number in numbers:
+        hash_phone_number.__wrapped__(phone_number)
+    uncached = time.perf_counter() - start
+    start = time.perf_counter()
+    for phone_number in numbers:
+        hash_phone_number(phone_number)
+    cached = time.perf_counter() - start
+    print(f"phone hash: {uncached * 1e6 / len(numbers):.2f} us uncached, {cached * 1e6 / len(numbers):.2f} us memoized")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Compare radius and hotspot queries over the lat/lon B-tree and the R*Tree
+
+Fills a scratch database with synthetic reports spread over the
+Indianapolis area and the last 48 hours, then times "reports within 1 mile
+in the last 6 hours" around random points and a hotspot grid over the
+downtown area, once through idx_reports_location (the composite
+latitude/longitude B-tree) and once through reports_rtree.
+
+Usage: python benchmarks/bench_report_queries.py [num_reports] [num_queries]
+"""
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+import numpy as np
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import models
+from database.report_queries import iter_reports_near, report_hotspots
+from utils.spatial_index import bounding_box, haversine_miles
+
+# Marion County, roughly
+MIN_LAT, MAX_LAT = 39.63, 39.93
+MIN_LON, MAX_LON = -86.33, -85.95
+DOWNTOWN = (39.74, 39.80, -86.19, -86.12)
+
+def fill(num_reports, batch_size=50000):
+    rng = np.random.default_rng(7)
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    for offset in range(0, num_reports, batch_size):
+        count = min(batch_size, num_reports - offset)
+        lats = rng.uniform(MIN_LAT, MAX_LAT, count)
+        lons = rng.uniform(MIN_LON, MAX_LON, count)
+        ages = rng.uniform(0, 48 * 3600, count)
+        rows = [
+            ('synthetic report', float(lat), float(lon),
+             (now - timedelta(seconds=float(age))).strftime('%Y-%m-%d %H:%M:%S'), '[]')
+            for lat, lon, age in zip(lats, lons, ages)
+        ]
+        with models.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO reports (report_text, latitude, longitude, timestamp, images) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+    return time.perf_counter() - started
+
+def btree_reports_near(lat, lon, radius_miles, hours, now):
+    """The same query without the R*Tree: a latitude range scan on idx_reports_location"""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_miles)
+    since = (now - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+    rows = models.get_pooled_connection().execute(
+        'SELECT id, latitude, longitude FROM reports INDEXED BY idx_reports_location '
+        'WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ? AND timestamp >= ? ORDER BY id DESC',
+        (min_lat, max_lat, min_lon, max_lon, since)
+    ).fetchall()
+    if not rows:
+        return []
+    distances = haversine_miles(lat, lon, np.array([row['latitude'] for row in rows]),
+                                np.array([row['longitude'] for row in rows]))
+    return [row['id'] for row, distance in zip(rows, distances) if distance <= radius_miles]
+
+def btree_hotspots(min_lat, max_lat, min_lon, max_lon, hours, now, cell_degrees=0.01):
+    since = (now - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+    return models.get_pooled_connection().execute(
+        'SELECT CAST((latitude - ?) / ? AS INTEGER) AS lat_cell, CAST((longitude - ?) / ? AS INTEGER) AS lon_cell, '
+        'COUNT(*) AS reports FROM reports INDEXED BY idx_reports_location '
+        'WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ? AND timestamp >= ? '
+        'GROUP BY lat_cell, lon_cell ORDER BY reports DESC LIMIT 100',
+        (min_lat, cell_degrees, min_lon, cell_degrees, min_lat, max_lat, min_lon, max_lon, since)
+    ).fetchall()
+
+def time_ms(function, args_list):
+    started = time.perf_counter()
+    results = [function(*args) for args in args_list]
+    return (time.perf_counter() - started) * 1000 / len(args_list), results
+
+if __name__ == '__main__':
+    num_reports = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(models, 'DATABASE_PATH', os.path.join(tmpdir, 'bench.db')):
+            models.create_tables()
+            fill_seconds = fill(num_reports)
+            models.get_pooled_connection().execute('ANALYZE')
+            print(f"{num_reports} reports inserted in {fill_seconds:.1f} s "
+                  f"({num_reports / fill_seconds:,.0f}/s with the R*Tree triggers)")
+            
+            rng = np.random.default_rng(11)
+            # Every query uses the same clock so both indexes see the same window
+            now = datetime.now(timezone.utc)
+            centers = [(float(lat), float(lon), 1.0, 6, now)
+                       for lat, lon in zip(rng.uniform(MIN_LAT, MAX_LAT, num_queries),
+                                           rng.uniform(MIN_LON, MAX_LON, num_queries))]
+            
+            rtree_ms, rtree_results = time_ms(
+                lambda lat, lon, radius, hours, now: [
+                    report['id'] for report in iter_reports_near(lat, lon, radius, hours, now=now)
+                ],
+                centers
+            )
+            btree_ms, btree_results = time_ms(btree_reports_near, centers)
+            mismatches = sum(a != b for a, b in zip(rtree_results, btree_results))
+            matches = sum(len(result) for result in rtree_results) / num_queries
+            
+            hotspot_args = [(*DOWNTOWN, 24, now)] * 20
+            rtree_hot_ms, _ = time_ms(lambda *args: report_hotspots(*args[:5], now=args[5]), hotspot_args)
+            btree_hot_ms, _ = time_ms(btree_hotspots, hotspot_args)
+            
+            print(f"{'query':<32}{'B-tree ms':>12}{'R*Tree ms':>12}{'speedup':>10}")
+            print(f"{'1 mile, last 6 h':<32}{btree_ms:>12.2f}{rtree_ms:>12.2f}{btree_ms / rtree_ms:>9.1f}x")
+            print(f"{'downtown hotspots, last 24 h':<32}{btree_hot_ms:>12.2f}{rtree_hot_ms:>12.2f}"
+                  f"{btree_hot_ms / rtree_hot_ms:>9.1f}x")
+            print(f"{matches:.0f} matches per radius query on average, {mismatches} result mismatches")
+            models.close_db_connections()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Compare the single-transaction retention purge with the chunked engine
+
+Fills a scratch database with expired reports (two image files each),
+then purges them while a writer thread keeps inserting new reports.
+Reports purge throughput, the longest write-lock hold, and the worst
+insert latency seen by the writer during the purge.
+
+Usage: python benchmarks/bench_retention.py [num_reports]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import models
+from database.retention import RetentionEngine, retention_cutoff
+
+def single_transaction_purge():
+    """The previous delete_old_reports: one transaction, files unlinked inside it"""
+    cutoff_str = retention_cutoff()
+    started = time.perf_counter()
+    with models.transaction(immediate=True) as conn:
+        locked_at = time.perf_counter()
+        reports = conn.execute('SELECT images FROM reports WHERE timestamp < ?', (cutoff_str,)).fetchall()
+        for report in reports:
+            for path in json.loads(report['images']):
+                if os.path.exists(path):
+                    os.remove(path)
+        deleted = conn.execute('DELETE FROM reports WHERE timestamp < ?', (cutoff_str,)).rowcount
+        conn.execute('DELETE FROM media_jobs WHERE report_id NOT IN (SELECT id FROM reports)')
+    finished = time.perf_counter()
+    return deleted, finished - started, (finished - locked_at) * 1000
+
+def chunked_purge():
+    engine = RetentionEngine()
+    stats = engine.purge()
+    engine.delete_pending_images()
+    return stats.deleted, stats.seconds, stats.max_lock_ms
+
+def fill(image_dir, num_reports):
+    timestamp = (datetime.now(timezone.utc) - timedelta(hours=49)).strftime('%Y-%m-%d %H:%M:%S')
+    rows = []
+    for i in range(num_reports):
+        paths = []
+        for j in range(2):
+            path = os.path.join(image_dir, f'{i}_{j}.jpg')
+            with open(path, 'wb') as f:
+                f.write(b'jpeg')
+            paths.append(path)
+        rows.append(('expired report', timestamp, json.dumps(paths)))
+    with models.transaction() as conn:
+        conn.executemany('INSERT INTO reports (report_text, timestamp, images) VALUES (?, ?, ?)', rows)
+
+def run(label, purge, num_reports):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(models, 'DATABASE_PATH', os.path.join(tmpdir, 'bench.db')):
+            models.create_tables()
+            fill(tmpdir, num_reports)
+            
+            latencies = []
+            stop = threading.Event()
+            
+            def writer():
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    models.save_report('new report', [], 39.768, -86.158)
+                    latencies.append(time.perf_counter() - started)
+                    time.sleep(0.002)
+            
+            thread = threading.Thread(target=writer)
+            thread.start()
+            time.sleep(0.1)
+            deleted, seconds, max_lock_ms = purge()
+            stop.set()
+            thread.join()
+            models.close_db_connections()
+    
+    print(f"{label:<22}{deleted / seconds:>12,.0f}{max_lock_ms:>14.1f}{max(latencies) * 1000:>18.1f}")
+
+if __name__ == '__main__':
+    num_reports = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{num_reports} expired reports, 2 images each")
+    print(f"{'purge':<22}{'reports/s':>12}{'max lock ms':>14}{'max insert ms':>18}")
+    run('single transaction', single_transaction_purge, num_reports)
+    run('chunked engine', chunked_purge, num_reports)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Measure static TwiML responses/s: rendered per request vs pre-rendered
+
+Times the help reply and both voice scripts, first as bare rendering
+(building the Twilio response objects and serializing them, as the
+routes used to) against the TwimlCache lookup, then end to end through
+the Flask routes with the test client.
+
+Usage: python benchmarks/bench_twiml.py [iterations]
+"""
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, twiml_cache, emergency_call_twiml, family_call_twiml, HELP_REPLY
+from utils.twiml_cache import render_message
+
+URL_ROOT = 'http://bot.example.org/'
+
+def rate(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - started)
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    
+    print(f"{'response':<18}{'rendered/s':>14}{'cached/s':>14}{'speedup':>10}")
+    cases = [
+        ('help SMS', lambda: render_message(HELP_REPLY).encode(), lambda: twiml_cache.message(HELP_REPLY)),
+        ('emergency_call', lambda: emergency_call_twiml(URL_ROOT).encode(),
+         lambda: twiml_cache.voice('emergency_call', URL_ROOT)),
+        ('family_call', lambda: family_call_twiml(URL_ROOT).encode(),
+         lambda: twiml_cache.voice('family_call', URL_ROOT)),
+    ]
+    for name, rendered, cached in cases:
+        before, after = rate(rendered, iterations), rate(cached, iterations)
+        print(f"{name:<18}{before:>14,.0f}{after:>14,.0f}{after / before:>9.0f}x")
+    
+    # End to end through Flask (routing and WSGI overhead included)
+    client = app.test_client()
+    requests_count = iterations // 10
+    print()
+    print(f"{'route':<18}{'responses/s':>14}")
+    for path, data in (('/sms', {'Body': 'hello'}), ('/emergency_call', None), ('/family_call', None)):
+        print(f"{path:<18}{rate(lambda: client.post(path, data=data, base_url=URL_ROOT), requests_count):>14,.0f}")
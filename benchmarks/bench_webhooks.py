@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Load test: sync (gunicorn) vs async (uvicorn) webhook serving
+
+Starts a fake Twilio API that takes TWILIO_LATENCY seconds per call, runs
+the webhook server in each mode, and fires a mix of "RED" (places a call)
+and "bait cars" (answered from memory) webhooks at a fixed concurrency.
+
+Usage: python benchmarks/bench_webhooks.py [requests] [concurrency]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import socket
+import subprocess
+import aiohttp
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.stub_server import StubServer
+
+TWILIO_LATENCY = 0.15
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def fake_calls_api(handler):
+    time.sleep(TWILIO_LATENCY)
+    call = {'sid': 'CA' + '0' * 32, 'status': 'queued'}
+    return 201, {'Content-Type': 'application/json'}, json.dumps(call).encode()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+async def wait_until_up(url, timeout=20):
+    deadline = time.time() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.time() < deadline:
+            try:
+                async with session.post(url + '/emergency_call') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+async def load(url, total, concurrency):
+    bodies = [
+        {'Body': 'RED', 'From': f'+1317555{i:04d}'} if i % 2 == 0 else
+        {'Body': 'bait cars', 'From': f'+1317555{i:04d}', 'Latitude': '39.9', 'Longitude': '-86.0'}
+        for i in range(total)
+    ]
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for body in bodies:
+        queue.put_nowait(body)
+    
+    async def worker(session):
+        nonlocal errors
+        while not queue.empty():
+            body = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                async with session.post(url + '/sms', data=body) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+    
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(session) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    return {
+        'rps': total / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'errors': errors
+    }
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    
+    with StubServer({}) as twilio_api:
+        twilio_api.routes.update({
+            f'/2010-04-01/Accounts/AC{"0" * 32}/Calls.json': fake_calls_api
+        })
+        env = dict(os.environ, BENCH_TWILIO_URL=twilio_api.url, TWILIO_ACCOUNT_SID='AC' + '0' * 32,
+                   TWILIO_AUTH_TOKEN='token', TWILIO_PHONE_NUMBER='+13175550000')
+        
+        print(f"{total} webhooks, concurrency {concurrency}, Twilio latency {TWILIO_LATENCY * 1000:.0f} ms")
+        print(f"{'mode':>22} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for mode, workers in (('sync', 4), ('async', 1)):
+            port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, os.path.join(ROOT, 'benchmarks', 'webhook_server.py'), mode, str(port), str(workers)],
+                cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+            )
+            try:
+                url = f'http://127.0.0.1:{port}'
+                asyncio.run(wait_until_up(url))
+                result = asyncio.run(load(url, total, concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+            label = f"{mode} ({workers} worker{'s' if workers > 1 else ''})"
+            print(f"{label:>22} {result['rps']:>8.0f} {result['p50_ms']:>8.0f} {result['p99_ms']:>8.0f} {result['errors']:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Run the webhook server in sync or async mode against a fake Twilio API
+
+Used by bench_webhooks.py. Twilio REST calls are sent to the URL in
+BENCH_TWILIO_URL instead of api.twilio.com.
+
+Usage: python benchmarks/webhook_server.py sync|async PORT WORKERS
+"""
+import os
+import sys
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def run_sync(port, workers, upstream):
+    from gunicorn.app.base import BaseApplication
+    import app as flask_module
+    
+    flask_module.client.api.base_url = upstream
+    
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'127.0.0.1:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'sync')
+            self.cfg.set('loglevel', 'warning')
+        
+        def load(self):
+            return flask_module.app
+    
+    Server().run()
+
+def run_async(port, workers, upstream):
+    # Patching below only reaches this process, so serve with one worker
+    if workers != 1:
+        raise SystemExit("async mode runs a single worker in this harness")
+    import uvicorn
+    import app as flask_module
+    import asgi_app
+    
+    flask_module.client.api.base_url = upstream
+    uvicorn.run(asgi_app.app, host='127.0.0.1', port=port, log_level='warning', lifespan='on')
+
+if __name__ == '__main__':
+    mode, port, workers = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    upstream = os.environ['BENCH_TWILIO_URL']
+    if mode == 'sync':
+        run_sync(port, workers, upstream)
+    else:
+        run_async(port, workers, upstream)
@@ -11,20 +11,160 @@ TWILIO_PHONE_NUMBER = os.environ.get('TWILIO_PHONE_NUMBER')
 
 # Database configuration
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'database', 'safety_bot.db')
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 64 * 1024 * 1024))
+DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 8192))
+
+# Group commit: report and bait car log inserts are flushed together every
+# WRITE_BATCH_MAX_LATENCY_MS or every WRITE_BATCH_MAX_ROWS writes. A latency
+# of 0 commits whatever queued up while the previous batch was committing,
+# which suits fast disks; raise it when each commit costs a slow fsync.
+WRITE_BATCHING_ENABLED = os.environ.get('WRITE_BATCHING_ENABLED', 'True').lower() == 'true'
+WRITE_BATCH_MAX_ROWS = int(os.environ.get('WRITE_BATCH_MAX_ROWS', 200))
+WRITE_BATCH_MAX_LATENCY_MS = float(os.environ.get('WRITE_BATCH_MAX_LATENCY_MS', 0))
 
 # Redis configuration (for scaling to 870k users)
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+REDIS_SOCKET_KEEPALIVE = os.environ.get('REDIS_SOCKET_KEEPALIVE', 'True').lower() == 'true'
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 5))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', 30))
+REDIS_PIPELINE_CHUNK = int(os.environ.get('REDIS_PIPELINE_CHUNK', 1000))
+PHONE_HASH_CACHE_SIZE = int(os.environ.get('PHONE_HASH_CACHE_SIZE', 100000))
+LOCATION_EVICTION_INTERVAL = int(os.environ.get('LOCATION_EVICTION_INTERVAL', 60))
+LOCATION_EVICTION_BATCH = int(os.environ.get('LOCATION_EVICTION_BATCH', 1000))
 
 # Bait car API configuration
 BAIT_CAR_API_URL = os.environ.get('BAIT_CAR_API_URL', 'https://api.impd.gov/baitcars')
 BAIT_CAR_API_KEY = os.environ.get('BAIT_CAR_API_KEY')
+# The fleet is polled in the background and served from memory; if the
+# feed is down the last snapshot keeps being used, with an error logged
+# once it is older than BAIT_CAR_MAX_STALE seconds
+BAIT_CAR_REFRESH_INTERVAL = int(os.environ.get('BAIT_CAR_REFRESH_INTERVAL', 60))
+BAIT_CAR_MAX_STALE = int(os.environ.get('BAIT_CAR_MAX_STALE', 900))
+BAIT_CAR_TIMEOUT = float(os.environ.get('BAIT_CAR_TIMEOUT', 5))
 
 # NHTSA API configuration
 NHTSA_API_URL = os.environ.get('NHTSA_API_URL', 'https://vpic.nhtsa.dot.gov/api/vehicles')
+NHTSA_TIMEOUT = float(os.environ.get('NHTSA_TIMEOUT', 5))
+# VIN decodes never change, so they are cached in process and in Redis
+VIN_DECODE_CACHE_SIZE = int(os.environ.get('VIN_DECODE_CACHE_SIZE', 10000))
+VIN_DECODE_CACHE_TTL = int(os.environ.get('VIN_DECODE_CACHE_TTL', 24 * 3600))
+VIN_DECODE_REDIS_TTL = int(os.environ.get('VIN_DECODE_REDIS_TTL', 30 * 24 * 3600))
+# DecodeVINValuesBatch accepts at most 50 VINs per request
+VIN_DECODE_BATCH_SIZE = min(int(os.environ.get('VIN_DECODE_BATCH_SIZE', 50)), 50)
+
+# Background media processing (EXIF strip + face blur run off the webhook)
+MEDIA_WORKERS = int(os.environ.get('MEDIA_WORKERS', 2))
+MEDIA_JOB_MAX_ATTEMPTS = int(os.environ.get('MEDIA_JOB_MAX_ATTEMPTS', 3))
+MEDIA_JOB_LEASE_SECONDS = int(os.environ.get('MEDIA_JOB_LEASE_SECONDS', 300))
+# Seconds before the first retry of a failed job; doubles with each attempt
+MEDIA_JOB_RETRY_BACKOFF = float(os.environ.get('MEDIA_JOB_RETRY_BACKOFF', 30))
+MEDIA_POLL_INTERVAL = float(os.environ.get('MEDIA_POLL_INTERVAL', 1.0))
+
+# MMS media downloads
+MEDIA_MAX_BYTES = int(os.environ.get('MEDIA_MAX_BYTES', 20 * 1024 * 1024))
+MEDIA_CONNECT_TIMEOUT = float(os.environ.get('MEDIA_CONNECT_TIMEOUT', 3.05))
+MEDIA_READ_TIMEOUT = float(os.environ.get('MEDIA_READ_TIMEOUT', 10))
+MEDIA_POOL_SIZE = int(os.environ.get('MEDIA_POOL_SIZE', 20))
+MEDIA_FETCH_PARALLELISM = int(os.environ.get('MEDIA_FETCH_PARALLELISM', 10))
+
+# Image privacy pipeline. Face detection runs on a copy downscaled so its
+# longest side is at most FACE_DETECTION_MAX_DIMENSION pixels (0 disables).
+FACE_DETECTION_MAX_DIMENSION = int(os.environ.get('FACE_DETECTION_MAX_DIMENSION', 1280))
+JPEG_QUALITY = int(os.environ.get('JPEG_QUALITY', 90))
+
+# Attachments of a report are processed concurrently on a shared executor
+# ('thread' or 'process'), with a process-wide cap on images in flight and a
+# per-report cap so one large report can't starve the others
+IMAGE_EXECUTOR = os.environ.get('IMAGE_EXECUTOR', 'thread')
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', os.cpu_count() or 2))
+IMAGE_MAX_IN_FLIGHT = int(os.environ.get('IMAGE_MAX_IN_FLIGHT', 2 * (os.cpu_count() or 2)))
+IMAGE_PER_REPORT_PARALLELISM = int(os.environ.get('IMAGE_PER_REPORT_PARALLELISM', 4))
+
+# VIN OCR
+OCR_CACHE_SIZE = int(os.environ.get('OCR_CACHE_SIZE', 2048))
+OCR_MAX_REGIONS = int(os.environ.get('OCR_MAX_REGIONS', 3))
+# Only pass on VINs whose check digit is valid (always true for North
+# American vehicles), correcting at most VIN_MAX_CORRECTIONS ambiguous
+# characters (5/S, 8/B) per candidate; more corrections find more real VINs
+# in bad photos but also let more OCR noise through
+VIN_REQUIRE_CHECK_DIGIT = os.environ.get('VIN_REQUIRE_CHECK_DIGIT', 'True').lower() == 'true'
+VIN_MAX_CORRECTIONS = min(int(os.environ.get('VIN_MAX_CORRECTIONS', 2)), 4)
+
+# Local stolen-vehicle hotlist: a bulk file of VINs (one per line) plus a
+# directory of delta files, re-checked every STOLEN_HOTLIST_SYNC_INTERVAL
+# seconds. Leave STOLEN_HOTLIST_PATH empty to query the remote API for
+# every VIN.
+STOLEN_HOTLIST_PATH = os.environ.get('STOLEN_HOTLIST_PATH', '')
+STOLEN_HOTLIST_DELTA_DIR = os.environ.get('STOLEN_HOTLIST_DELTA_DIR', '')
+STOLEN_HOTLIST_SYNC_INTERVAL = int(os.environ.get('STOLEN_HOTLIST_SYNC_INTERVAL', 300))
+
+# Outbound call dispatch for RED / call mom: dialling happens on a
+# dedicated worker pool, retried with exponential backoff, and repeat
+# requests from the same number within CALL_DEDUPE_WINDOW seconds are
+# dropped. Calls taking longer than CALL_DIAL_SLO_MS from the text to
+# Twilio accepting the call are counted as SLO misses.
+CALL_DISPATCH_WORKERS = int(os.environ.get('CALL_DISPATCH_WORKERS', 4))
+CALL_MAX_ATTEMPTS = int(os.environ.get('CALL_MAX_ATTEMPTS', 4))
+CALL_RETRY_BACKOFF = float(os.environ.get('CALL_RETRY_BACKOFF', 0.5))
+CALL_DEDUPE_WINDOW = int(os.environ.get('CALL_DEDUPE_WINDOW', 60))
+CALL_DIAL_SLO_MS = int(os.environ.get('CALL_DIAL_SLO_MS', 2000))
+
+# Per-number rate limits on /sms, as (burst, seconds to refill the burst)
+# for each class of command. Report budgets are counted in attached
+# photos. Checked in Redis, or in-process while Redis is unreachable.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+RATE_LIMITS = {
+    'call': (int(os.environ.get('RATE_LIMIT_CALLS', 3)), 600),
+    'report': (int(os.environ.get('RATE_LIMIT_REPORT_PHOTOS', 20)), 3600),
+    'lookup': (int(os.environ.get('RATE_LIMIT_LOOKUPS', 30)), 60),
+}
+
+# Static TwiML replies are rendered once and served as cached bytes.
+# VOICE_TWIML_SOURCE picks the voice scripts: 'builtin' (rendered in
+# app.py) or 'templates' (templates/emergency.xml and
+# templates/family_emergency.xml).
+VOICE_TWIML_SOURCE = os.environ.get('VOICE_TWIML_SOURCE', 'builtin')
+TWIML_CACHE_MAX_ROOTS = int(os.environ.get('TWIML_CACHE_MAX_ROOTS', 16))
+
+# Async (ASGI) server mode: threads for blocking calls such as SQLite
+# writes, and the largest webhook body accepted
+ASGI_BLOCKING_THREADS = int(os.environ.get('ASGI_BLOCKING_THREADS', 64))
+ASGI_MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 64 * 1024))
 
 # Report retention period (in hours)
 REPORT_RETENTION_HOURS = 48
 
+# Expired reports are deleted in transactions of at most
+# RETENTION_CHUNK_SIZE rows, pausing RETENTION_CHUNK_PAUSE_MS between
+# chunks so other writers can take the SQLite lock.
+RETENTION_CHUNK_SIZE = int(os.environ.get('RETENTION_CHUNK_SIZE', 500))
+RETENTION_CHUNK_PAUSE_MS = float(os.environ.get('RETENTION_CHUNK_PAUSE_MS', 10))
+RETENTION_IMAGE_DELETE_BATCH = int(os.environ.get('RETENTION_IMAGE_DELETE_BATCH', 200))
+
+# Continuous retention: every RETENTION_TICK_SECONDS one process (the
+# holder of the leader lock, 'file' for workers on one host or 'redis'
+# across hosts) purges up to RETENTION_CHUNKS_PER_TICK chunks.
+RETENTION_SCHEDULER_ENABLED = os.environ.get('RETENTION_SCHEDULER_ENABLED', 'True').lower() == 'true'
+RETENTION_TICK_SECONDS = int(os.environ.get('RETENTION_TICK_SECONDS', 30))
+RETENTION_CHUNKS_PER_TICK = int(os.environ.get('RETENTION_CHUNKS_PER_TICK', 4))
+RETENTION_LEADER_LOCK = os.environ.get('RETENTION_LEADER_LOCK', 'file')
+RETENTION_LOCK_PATH = os.environ.get('RETENTION_LOCK_PATH', os.path.join(os.path.dirname(__file__), 'database', 'retention.lock'))
+RETENTION_LEADER_TTL = int(os.environ.get('RETENTION_LEADER_TTL', 90))
+
+# Report query API: candidate rows are read in batches of
+# REPORT_QUERY_BATCH_SIZE; a page holds at most REPORT_QUERY_MAX_LIMIT
+# reports (streamed results are not limited)
+REPORT_QUERY_BATCH_SIZE = int(os.environ.get('REPORT_QUERY_BATCH_SIZE', 500))
+REPORT_QUERY_MAX_LIMIT = int(os.environ.get('REPORT_QUERY_MAX_LIMIT', 500))
+
+# Bulk export (cron/export_reports.py and /export): rows are streamed in
+# batches of EXPORT_BATCH_SIZE. The columnar format is Parquet when pyarrow
+# is installed, gzipped CSV otherwise.
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 5000))
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(os.path.dirname(__file__), 'exports'))
+
 # Debug mode
 DEBUG_MODE = os.environ.get('DEBUG_MODE', 'False').lower() == 'true'
 
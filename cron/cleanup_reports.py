@@ -5,13 +5,20 @@ import sys
 # Add parent directory to path so we can import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.models import delete_old_reports
+from database.models import create_tables
+from database.retention import RetentionEngine
 
 if __name__ == "__main__":
     """Script to delete reports older than the retention period
     
-    This script can be run as a cron job:
+    The app purges continuously on its own (RETENTION_SCHEDULER_ENABLED);
+    with the scheduler disabled this script can be run as a cron job:
     0 * * * * /path/to/cleanup_reports.py  # Run hourly
     """
-    deleted_count = delete_old_reports()
-    print(f"Deleted {deleted_count} reports older than 48 hours.")
\ No newline at end of file
+    create_tables()
+    engine = RetentionEngine()
+    stats = engine.purge()
+    images_deleted = engine.delete_pending_images()
+    print(f"Deleted {stats.deleted} reports older than 48 hours and {images_deleted} images.")
+    print(f"{stats.chunks} chunks, {stats.rows_per_second:.0f} reports/s, "
+          f"longest lock hold {stats.max_lock_ms:.1f} ms.")
\ No newline at end of file
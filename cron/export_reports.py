@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import create_tables
+from database.export import export_snapshot, columnar_format
+from config import EXPORT_DIR
+
+if __name__ == "__main__":
+    """Script to snapshot reports and bait car logs for analysis
+    
+    Writes NDJSON and a columnar copy (Parquet, or gzipped CSV without
+    pyarrow) of every table. Reports are only kept for 48 hours, so run it
+    more often than that, e.g. as a cron job:
+    0 */12 * * * /path/to/export_reports.py --hours 12  # Every 12 hours
+    """
+    parser = argparse.ArgumentParser(description='Export reports and bait car logs')
+    parser.add_argument('--output-dir', default=EXPORT_DIR)
+    parser.add_argument('--format', choices=['ndjson', 'columnar', 'both'], default='both')
+    parser.add_argument('--hours', type=float, help='Only rows from the last N hours')
+    parser.add_argument('--since', help="Only rows at or after this UTC time ('YYYY-MM-DD HH:MM:SS')")
+    parser.add_argument('--until', help="Only rows before this UTC time ('YYYY-MM-DD HH:MM:SS')")
+    args = parser.parse_args()
+    
+    since = args.since
+    if args.hours is not None:
+        since = (datetime.now(timezone.utc) - timedelta(hours=args.hours)).strftime('%Y-%m-%d %H:%M:%S')
+    formats = {'ndjson': ('ndjson',), 'columnar': (None,), 'both': ('ndjson', None)}[args.format]
+    
+    create_tables()
+    for path, rows in export_snapshot(args.output_dir, formats, since, args.until):
+        print(f"Wrote {rows} rows to {path}")
+    if args.format != 'ndjson' and columnar_format() == 'csv':
+        print("pyarrow is not installed; the columnar export is gzipped CSV.")
@@ -0,0 +1,122 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from utils.metrics import metrics
+
+class GroupCommitWriter:
+    """Funnel database writes through one thread that commits them in batches
+    
+    SQLite allows a single writer at a time, so during spikes every request
+    thread queues on the write lock and pays for its own commit. Callers
+    instead submit a write unit (a function that takes a connection and
+    returns a result) and wait on a Future. The writer thread collects units
+    until max_batch_rows are queued or max_latency_ms has passed since the
+    first one, then runs them all in a single transaction.
+    
+    Each unit runs inside its own savepoint, so one failing unit is rolled
+    back and reported to its caller without affecting the rest of the batch.
+    """
+    
+    def __init__(self, transaction_factory, max_batch_rows, max_latency_ms):
+        """Create a writer
+        
+        Args:
+            transaction_factory (callable): Context manager factory that
+                yields a connection inside a transaction
+            max_batch_rows (int): Flush once this many units are queued
+            max_latency_ms (float): Flush once the oldest queued unit has
+                waited this long
+        """
+        self.transaction_factory = transaction_factory
+        self.max_batch_rows = max_batch_rows
+        self.max_latency_ms = max_latency_ms
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        
+        metrics.set_gauge('db.write_batch.max_rows', max_batch_rows)
+        metrics.set_gauge('db.write_batch.max_latency_ms', max_latency_ms)
+    
+    def start(self):
+        """Start the writer thread if it is not already running"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+                self._thread.start()
+    
+    def stop(self, timeout=5.0):
+        """Flush anything queued and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def submit(self, unit):
+        """Queue a write unit
+        
+        Returns:
+            Future: Resolves to the unit's return value once it is committed
+        """
+        future = Future()
+        self._queue.put((unit, future, time.perf_counter()))
+        return future
+    
+    def execute(self, unit):
+        """Queue a write unit and wait for it to be committed"""
+        return self.submit(unit).result()
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            
+            batch = [first]
+            deadline = time.perf_counter() + self.max_latency_ms / 1000
+            while len(batch) < self.max_batch_rows:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            self._flush(batch)
+    
+    def _flush(self, batch):
+        started = time.perf_counter()
+        results = []
+        try:
+            with self.transaction_factory() as conn:
+                for unit, future, queued_at in batch:
+                    conn.execute('SAVEPOINT write_unit')
+                    try:
+                        results.append((future, unit(conn), None))
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO write_unit')
+                        results.append((future, None, e))
+                    conn.execute('RELEASE write_unit')
+        except Exception as e:
+            # The commit itself failed, so nothing in the batch was written
+            for _, future, _ in batch:
+                future.set_exception(e)
+            metrics.incr('db.write_batch.failed_flushes')
+            return
+        
+        # Only hand results back once they are durable
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        
+        finished = time.perf_counter()
+        metrics.incr('db.write_batch.flushes')
+        metrics.observe('db.write_batch.rows', len(batch))
+        metrics.observe('db.write_batch.flush_ms', (finished - started) * 1000)
+        metrics.observe('db.write_batch.queue_wait_ms', (started - batch[0][2]) * 1000)
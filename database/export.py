@@ -0,0 +1,231 @@
+import io
+import os
+import csv
+import gzip
+import json
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from database.models import get_db_connection
+from config import EXPORT_BATCH_SIZE
+
+# Parquet output needs pyarrow; without it the columnar format falls back
+# to gzipped CSV
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+
+# Exported columns and their types. Image paths are server-local and stay out.
+EXPORT_TABLES = {
+    'reports': [
+        ('id', 'int'), ('report_text', 'string'), ('latitude', 'float'), ('longitude', 'float'),
+        ('timestamp', 'timestamp'), ('image_status', 'string'), ('processed_at', 'timestamp'),
+    ],
+    'bait_car_logs': [
+        ('id', 'int'), ('latitude', 'float'), ('longitude', 'float'),
+        ('notification_sent', 'bool'), ('timestamp', 'timestamp'),
+    ],
+}
+
+# File extension and MIME type per format
+EXPORT_FORMATS = {
+    'ndjson': ('.ndjson', 'application/x-ndjson'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'csv': ('.csv.gz', 'application/gzip'),
+}
+
+def columnar_format():
+    """The columnar format available here: 'parquet' with pyarrow, else 'csv' (gzipped)"""
+    return 'parquet' if pq is not None else 'csv'
+
+@contextmanager
+def read_snapshot():
+    """A standalone connection inside one read transaction
+    
+    Every query in the block sees the same WAL snapshot of the database.
+    Readers never block writers in WAL mode, so an export can run while
+    reports keep coming in (new ones just aren't part of it).
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN')
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+def iter_batches(conn, table, since=None, until=None, batch_size=EXPORT_BATCH_SIZE):
+    """Read a table in ID order, batch_size rows at a time
+    
+    Args:
+        conn (sqlite3.Connection): Connection from read_snapshot()
+        table (str): A key of EXPORT_TABLES
+        since (str): Only rows with timestamp >= since ('YYYY-MM-DD HH:MM:SS', UTC)
+        until (str): Only rows with timestamp < until
+    
+    Yields:
+        list: Row tuples in EXPORT_TABLES column order
+    """
+    columns = ', '.join(name for name, _ in EXPORT_TABLES[table])
+    conditions, params = [], []
+    # Unary + keeps the planner on the rowid scan; a timestamp index scan
+    # would need a sort of every matching row for ORDER BY id
+    if since is not None:
+        conditions.append('+timestamp >= ?')
+        params.append(since)
+    if until is not None:
+        conditions.append('+timestamp < ?')
+        params.append(until)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    
+    cursor = conn.execute(f'SELECT {columns} FROM {table}{where} ORDER BY id', params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+class NdjsonWriter:
+    """One JSON object per row"""
+    
+    def __init__(self, fileobj, columns):
+        self.fileobj = fileobj
+        self.names = [name for name, _ in columns]
+    
+    def write_batch(self, rows):
+        self.fileobj.write(''.join(json.dumps(dict(zip(self.names, row))) + '\n' for row in rows).encode())
+    
+    def close(self):
+        pass
+
+class CsvGzipWriter:
+    """Gzipped CSV with a header row"""
+    
+    def __init__(self, fileobj, columns):
+        self.gzip_file = gzip.GzipFile(fileobj=fileobj, mode='wb')
+        self.text = io.TextIOWrapper(self.gzip_file, encoding='utf-8', newline='')
+        self.writer = csv.writer(self.text)
+        self.writer.writerow([name for name, _ in columns])
+    
+    def write_batch(self, rows):
+        self.writer.writerows(rows)
+        self.text.flush()
+    
+    def close(self):
+        # Closes the gzip stream (writing its trailer) but not fileobj
+        self.text.close()
+
+class ParquetWriter:
+    """Parquet file with one row group per batch"""
+    
+    ARROW_TYPES = {'int': 'int64', 'float': 'float64', 'string': 'string', 'bool': 'bool_'}
+    
+    def __init__(self, fileobj, columns):
+        if pq is None:
+            raise RuntimeError('Parquet export needs pyarrow')
+        self.columns = columns
+        self.schema = pa.schema([
+            (name, pa.timestamp('s', tz='UTC') if kind == 'timestamp' else getattr(pa, self.ARROW_TYPES[kind])())
+            for name, kind in columns
+        ])
+        self.writer = pq.ParquetWriter(fileobj, self.schema, compression='zstd')
+    
+    def _array(self, values, kind, arrow_type):
+        if kind == 'timestamp':
+            return pc.strptime(pa.array(values, pa.string()), format='%Y-%m-%d %H:%M:%S', unit='s').cast(arrow_type)
+        if kind == 'bool':
+            values = [None if value is None else bool(value) for value in values]
+        return pa.array(values, arrow_type)
+    
+    def write_batch(self, rows):
+        arrays = [
+            self._array([row[i] for row in rows], kind, self.schema.field(i).type)
+            for i, (_, kind) in enumerate(self.columns)
+        ]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+    
+    def close(self):
+        self.writer.close()
+
+WRITERS = {'ndjson': NdjsonWriter, 'csv': CsvGzipWriter, 'parquet': ParquetWriter}
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back out in chunks"""
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._position
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_export(table, export_format, since=None, until=None, batch_size=EXPORT_BATCH_SIZE):
+    """Export a table as a stream of byte chunks (e.g. for an HTTP response)
+    
+    Only one batch is held in memory at a time, whatever the table size.
+    
+    Yields:
+        bytes: The next part of the file
+    """
+    with read_snapshot() as conn:
+        sink = _ChunkSink()
+        writer = WRITERS[export_format](sink, EXPORT_TABLES[table])
+        for rows in iter_batches(conn, table, since, until, batch_size):
+            writer.write_batch(rows)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+        writer.close()
+        yield sink.drain()
+
+def export_snapshot(output_dir, formats=('ndjson', None), since=None, until=None, batch_size=EXPORT_BATCH_SIZE):
+    """Write every exported table to files, all from one consistent snapshot
+    
+    Files are named <table>-<UTC time><extension> and written under a
+    temporary name first, so a half-written export is never mistaken for
+    a finished one.
+    
+    Args:
+        formats (tuple): Formats to write; None means columnar_format()
+    
+    Returns:
+        list: (path, rows written) for every file
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    formats = [columnar_format() if export_format is None else export_format for export_format in formats]
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    written = []
+    
+    with read_snapshot() as conn:
+        for table, columns in EXPORT_TABLES.items():
+            for export_format in formats:
+                path = os.path.join(output_dir, f'{table}-{stamp}{EXPORT_FORMATS[export_format][0]}')
+                temp_path = path + '.tmp'
+                count = 0
+                with open(temp_path, 'wb') as f:
+                    writer = WRITERS[export_format](f, columns)
+                    for rows in iter_batches(conn, table, since, until, batch_size):
+                        writer.write_batch(rows)
+                        count += len(rows)
+                    writer.close()
+                os.replace(temp_path, path)
+                written.append((path, count))
+    return written
@@ -1,80 +1,409 @@
 import sqlite3
 import json
 import os
-from datetime import datetime, timedelta
-from config import DATABASE_PATH, REPORT_RETENTION_HOURS
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from database.batching import GroupCommitWriter
+from config import (
+    DATABASE_PATH,
+    DB_BUSY_TIMEOUT_MS, DB_MMAP_SIZE, DB_CACHE_SIZE_KB,
+    WRITE_BATCHING_ENABLED, WRITE_BATCH_MAX_ROWS, WRITE_BATCH_MAX_LATENCY_MS, MEDIA_JOB_MAX_ATTEMPTS
+)
 
-def get_db_connection():
-    """Create a database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
+# Columns added to existing tables after the first release. create_tables()
+# adds any that are missing so older databases keep working.
+_ADDED_COLUMNS = {
+    'reports': [
+        ('image_status', "TEXT DEFAULT 'done'"),
+        ('processed_at', 'DATETIME'),
+    ],
+    'media_jobs': [
+        ('not_before', 'DATETIME'),
+    ],
+}
+
+# Per-thread connection pool. Each thread keeps one open connection per
+# (process, database path), so forked gunicorn workers never reuse a
+# connection inherited from the parent.
+_pool = threading.local()
+
+# Group-commit writer for high-volume inserts, created lazily per process
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+def _configure_connection(conn):
+    """Apply the pragmas every connection should run with"""
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}')
+    conn.execute(f'PRAGMA mmap_size={int(DB_MMAP_SIZE)}')
+    conn.execute(f'PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}')
+    conn.execute('PRAGMA temp_store=MEMORY')
     return conn
 
+def get_db_connection():
+    """Create a standalone database connection
+    
+    The caller owns the connection and must close it. Model functions use
+    the pooled connection from get_pooled_connection() instead.
+    """
+    conn = sqlite3.connect(DATABASE_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+    return _configure_connection(conn)
+
+def get_pooled_connection():
+    """Get this thread's persistent connection to the database
+    
+    The connection runs in autocommit mode; use transaction() to group
+    statements.
+    """
+    connections = getattr(_pool, 'connections', None)
+    if connections is None:
+        connections = _pool.connections = {}
+    
+    key = (os.getpid(), DATABASE_PATH)
+    conn = connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(DATABASE_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        connections[key] = _configure_connection(conn)
+    return conn
+
+def close_db_connections():
+    """Close the calling thread's pooled connections"""
+    connections = getattr(_pool, 'connections', None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+@contextmanager
+def transaction(immediate=False):
+    """Run a block of statements in one transaction on the pooled connection
+    
+    Commits when the block exits normally and rolls back if it raises.
+    Nested use joins the outer transaction.
+    
+    Args:
+        immediate (bool): Take the write lock when the transaction starts
+            instead of on the first write
+    """
+    conn = get_pooled_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    
+    conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+def get_writer():
+    """Get this process's group-commit writer, starting it if needed"""
+    global _writer, _writer_pid
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer = GroupCommitWriter(
+                lambda: transaction(immediate=True), WRITE_BATCH_MAX_ROWS, WRITE_BATCH_MAX_LATENCY_MS
+            )
+            _writer_pid = os.getpid()
+        _writer.start()
+        return _writer
+
+def _write(unit):
+    """Run a write unit, batched with other writers when batching is enabled
+    
+    Args:
+        unit (callable): Takes a connection, performs the writes and returns
+            the result to hand back to the caller
+    """
+    if WRITE_BATCHING_ENABLED:
+        return get_writer().execute(unit)
+    
+    with transaction() as conn:
+        return unit(conn)
+
+def _migrate_columns(conn):
+    """Add columns introduced after a database was first created"""
+    for table, columns in _ADDED_COLUMNS.items():
+        existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+        for name, definition in columns:
+            if name not in existing:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
+def _backfill_report_rtree(conn):
+    """Index reports stored before reports_rtree existed"""
+    if conn.execute('SELECT 1 FROM reports_rtree LIMIT 1').fetchone() is None:
+        conn.execute(
+            "INSERT INTO reports_rtree SELECT id, latitude, latitude, longitude, longitude, "
+            "strftime('%s', timestamp), strftime('%s', timestamp) FROM reports "
+            "WHERE typeof(latitude) = 'real' AND typeof(longitude) = 'real'"
+        )
+
 def create_tables():
     """Initialize database tables"""
-    conn = get_db_connection()
+    conn = get_pooled_connection()
     
     # Read schema file
     schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
     with open(schema_path, 'r') as f:
         conn.executescript(f.read())
     
-    conn.commit()
-    conn.close()
+    with transaction(immediate=True) as conn:
+        _migrate_columns(conn)
+        _backfill_report_rtree(conn)
 
 def save_report(report_text, image_paths, latitude, longitude):
     """Save anonymous crime report to database"""
-    conn = get_db_connection()
-    
     # Convert image paths to JSON string
     images_json = json.dumps(image_paths)
     
-    cursor = conn.execute(
-        'INSERT INTO reports (report_text, latitude, longitude, images) VALUES (?, ?, ?, ?)',
-        (report_text, latitude, longitude, images_json)
-    )
+    def insert_report(conn):
+        cursor = conn.execute(
+            'INSERT INTO reports (report_text, latitude, longitude, images) VALUES (?, ?, ?, ?)',
+            (report_text, latitude, longitude, images_json)
+        )
+        return cursor.lastrowid
     
-    report_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    return _write(insert_report)
+
+def save_pending_report(report_text, media_urls, latitude, longitude):
+    """Save a report whose images still need privacy processing
+    
+    The report row and its media job are written in one transaction so a
+    crash can never leave a report stuck in the 'processing' state without
+    a job to finish it.
     
-    return report_id
+    Returns:
+        int: The new report ID
+    """
+    def insert_report_and_job(conn):
+        cursor = conn.execute(
+            "INSERT INTO reports (report_text, latitude, longitude, images, image_status) "
+            "VALUES (?, ?, ?, ?, 'processing')",
+            (report_text, latitude, longitude, json.dumps([]))
+        )
+        report_id = cursor.lastrowid
+        
+        conn.execute(
+            'INSERT INTO media_jobs (report_id, media_urls) VALUES (?, ?)',
+            (report_id, json.dumps(media_urls))
+        )
+        return report_id
+    
+    return _write(insert_report_and_job)
 
-def delete_old_reports():
-    """Delete reports older than the retention period"""
-    conn = get_db_connection()
+def claim_media_job(lease_seconds, max_attempts=MEDIA_JOB_MAX_ATTEMPTS):
+    """Claim the oldest runnable media job for this worker
     
-    # Calculate cutoff time
-    cutoff_time = datetime.now() - timedelta(hours=REPORT_RETENTION_HOURS)
-    cutoff_str = cutoff_time.strftime('%Y-%m-%d %H:%M:%S')
+    A job is runnable if it is pending and its retry backoff has passed, or
+    if it has been running for longer than the lease (the worker that
+    claimed it most likely died) and has attempts left. A job whose last
+    attempt's lease ran out is marked failed instead.
     
-    # First get the reports to delete so we can clean up image files
-    cursor = conn.execute('SELECT images FROM reports WHERE timestamp < ?', (cutoff_str,))
-    reports = cursor.fetchall()
+    Args:
+        lease_seconds (float): How long a claim lasts
+        max_attempts (int): Attempts a job gets in total
     
-    # Delete image files
-    for report in reports:
-        if report['images']:
-            image_paths = json.loads(report['images'])
-            for path in image_paths:
-                if os.path.exists(path):
-                    os.remove(path)
+    Returns:
+        dict: The claimed job, or None if the queue is empty
+    """
+    now = datetime.now(timezone.utc)
+    lease_cutoff = (now - timedelta(seconds=lease_seconds)).strftime('%Y-%m-%d %H:%M:%S')
     
-    # Now delete the records
-    cursor = conn.execute('DELETE FROM reports WHERE timestamp < ?', (cutoff_str,))
-    deleted_count = cursor.rowcount
+    # Take the write lock up front so two workers cannot claim the same job
+    with transaction(immediate=True) as conn:
+        exhausted = conn.execute(
+            "SELECT id, report_id FROM media_jobs WHERE status = 'running' AND claimed_at < ? AND attempts >= ?",
+            (lease_cutoff, max_attempts)
+        ).fetchall()
+        for job in exhausted:
+            _give_up_media_job(conn, job['id'], job['report_id'], 'Lease expired on the last attempt')
+        
+        row = conn.execute(
+            "SELECT id, report_id, media_urls, attempts FROM media_jobs "
+            "WHERE (status = 'pending' AND (not_before IS NULL OR not_before <= ?)) "
+            "OR (status = 'running' AND claimed_at < ? AND attempts < ?) "
+            "ORDER BY id LIMIT 1",
+            (now.strftime('%Y-%m-%d %H:%M:%S'), lease_cutoff, max_attempts)
+        ).fetchone()
+        
+        if row is None:
+            return None
+        
+        # Release whatever an earlier attempt stored before it died
+        _release_dead_attempts(conn, row['id'])
+        
+        conn.execute(
+            "UPDATE media_jobs SET status = 'running', attempts = attempts + 1, "
+            "claimed_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (row['id'],)
+        )
     
-    conn.commit()
-    conn.close()
+    return {
+        'id': row['id'],
+        'report_id': row['report_id'],
+        'media_urls': json.loads(row['media_urls']),
+        'attempts': row['attempts'] + 1
+    }
+
+def complete_media_job(job_id, report_id, image_paths, attempt):
+    """Attach processed images to a report and mark its media job done
+    
+    Only the worker holding the job's current claim may finish it, and only
+    while the report still waits for its images.
     
-    return deleted_count
+    Args:
+        attempt (int): The claim's attempt number, as returned by claim_media_job()
+    
+    Returns:
+        bool: False if the report was purged, the job was reclaimed after its
+            lease ran out, or another attempt already finished it. The caller
+            then still holds the attempt's image references and must release
+            them (MediaStore.release_job).
+    """
+    with transaction(immediate=True) as conn:
+        claimed = conn.execute(
+            "UPDATE media_jobs SET status = 'done', last_error = NULL "
+            "WHERE id = ? AND status = 'running' AND attempts = ?",
+            (job_id, attempt)
+        ).rowcount
+        if not claimed:
+            return False
+        attached = conn.execute(
+            "UPDATE reports SET images = ?, image_status = 'done', processed_at = CURRENT_TIMESTAMP "
+            "WHERE id = ? AND image_status = 'processing'",
+            (json.dumps(image_paths), report_id)
+        ).rowcount
+        if not attached:
+            return False
+        # The report holds the references now
+        conn.execute('DELETE FROM media_job_blobs WHERE job_id = ? AND attempt = ?', (job_id, attempt))
+        return True
 
-def log_bait_car_notification(latitude, longitude):
-    """Log when a bait car notification is sent"""
-    conn = get_db_connection()
+def fail_media_job(job_id, report_id, error, attempt, retry, retry_delay=0):
+    """Record a failed media job attempt
+    
+    Like complete_media_job(), only the worker holding the job's current
+    claim may do this, so a worker whose lease ran out cannot requeue or
+    fail a job another worker has taken over.
+    
+    Args:
+        job_id (int): The media job that failed
+        report_id (int): The report the job belongs to
+        error (str): Description of the failure
+        attempt (int): The claim's attempt number, as returned by claim_media_job()
+        retry (bool): Put the job back in the queue instead of giving up
+        retry_delay (float): Seconds before a retried job may be claimed again
+    
+    Returns:
+        bool: False if the claim was no longer current and nothing changed
+    """
+    with transaction(immediate=True) as conn:
+        if retry:
+            not_before = (datetime.now(timezone.utc) + timedelta(seconds=retry_delay)).strftime('%Y-%m-%d %H:%M:%S')
+            return conn.execute(
+                "UPDATE media_jobs SET status = 'pending', last_error = ?, not_before = ? "
+                "WHERE id = ? AND status = 'running' AND attempts = ?",
+                (error, not_before, job_id, attempt)
+            ).rowcount > 0
+        claimed = conn.execute(
+            "SELECT 1 FROM media_jobs WHERE id = ? AND status = 'running' AND attempts = ?", (job_id, attempt)
+        ).fetchone()
+        if claimed is None:
+            return False
+        _give_up_media_job(conn, job_id, report_id, error)
+        return True
+
+def _give_up_media_job(conn, job_id, report_id, error):
+    """Mark a media job and its report failed inside the caller's transaction"""
+    conn.execute("UPDATE media_jobs SET status = 'failed', last_error = ? WHERE id = ?", (error, job_id))
     conn.execute(
-        'INSERT INTO bait_car_logs (latitude, longitude, notification_sent) VALUES (?, ?, ?)',
-        (latitude, longitude, True)
+        "UPDATE reports SET image_status = 'failed', processed_at = CURRENT_TIMESTAMP "
+        "WHERE id = ? AND image_status = 'processing'",
+        (report_id,)
     )
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    _release_dead_attempts(conn, job_id)
+
+def _release_dead_attempts(conn, job_id):
+    """Release references a job's earlier attempts took but never attached
+    
+    The files go to pending_image_deletes; the retention image deleter
+    unlinks them unless they were stored (and referenced) again by then.
+    """
+    conn.executemany('INSERT INTO pending_image_deletes (path) VALUES (?)',
+                     [(path,) for path in release_job_blob_refs(conn, [job_id])])
+
+def add_blob_ref(conn, path, digest, size, owner=None):
+    """Take a reference to a media store file inside the caller's transaction
+    
+    Args:
+        owner (tuple): (job ID, attempt) of the media job taking the
+            reference, recorded until the job attaches it to its report
+    """
+    conn.execute(
+        'INSERT INTO media_blobs (path, digest, size, refcount) VALUES (?, ?, ?, 1) '
+        'ON CONFLICT(path) DO UPDATE SET refcount = refcount + 1',
+        (path, digest, size)
+    )
+    if owner is not None:
+        conn.execute('INSERT INTO media_job_blobs (job_id, attempt, path) VALUES (?, ?, ?)', (*owner, path))
+
+def release_blob_refs(conn, paths):
+    """Drop one reference per path inside the caller's transaction
+    
+    Returns:
+        list: Paths nothing refers to anymore, including files that were
+            never tracked (stored before the media store existed)
+    """
+    unreferenced = []
+    for path in paths:
+        row = conn.execute(
+            'UPDATE media_blobs SET refcount = refcount - 1 WHERE path = ? RETURNING refcount', (path,)
+        ).fetchone()
+        if row is None or row['refcount'] <= 0:
+            conn.execute('DELETE FROM media_blobs WHERE path = ?', (path,))
+            unreferenced.append(path)
+    return unreferenced
+
+def release_job_blob_refs(conn, job_ids, attempt=None):
+    """Drop the references media jobs took for images they never attached
+    
+    Args:
+        job_ids (list): Media job IDs
+        attempt (int): Only release this attempt's references (default: every attempt)
+    
+    Returns:
+        list: Paths nothing refers to anymore
+    """
+    if not job_ids:
+        return []
+    query = f"DELETE FROM media_job_blobs WHERE job_id IN ({','.join('?' * len(job_ids))})"
+    params = list(job_ids)
+    if attempt is not None:
+        query += ' AND attempt = ?'
+        params.append(attempt)
+    rows = conn.execute(query + ' RETURNING path', params).fetchall()
+    return release_blob_refs(conn, [row['path'] for row in rows])
+
+def referenced_blob_paths(conn, paths):
+    """The subset of paths that are still referenced"""
+    if not paths:
+        return set()
+    rows = conn.execute(
+        f"SELECT path FROM media_blobs WHERE path IN ({','.join('?' * len(paths))})", list(paths)
+    ).fetchall()
+    return {row['path'] for row in rows}
+
+def log_bait_car_notification(latitude, longitude):
+    """Log when a bait car notification is sent"""
+    def insert_log(conn):
+        conn.execute(
+            'INSERT INTO bait_car_logs (latitude, longitude, notification_sent) VALUES (?, ?, ?)',
+            (latitude, longitude, True)
+        )
+    
+    _write(insert_log)
@@ -0,0 +1,114 @@
+import itertools
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from database.models import get_pooled_connection
+from utils.spatial_index import bounding_box, haversine_miles
+from config import REPORT_QUERY_BATCH_SIZE
+
+# Report columns returned by the query API (image paths stay private)
+REPORT_COLUMNS = ('id', 'report_text', 'latitude', 'longitude', 'timestamp', 'image_status')
+
+def _since(hours, now=None):
+    """Start of a "last N hours" window as (Unix seconds, CURRENT_TIMESTAMP string)"""
+    now = datetime.now(timezone.utc) if now is None else now
+    since = now - timedelta(hours=hours)
+    return int(since.timestamp()), since.strftime('%Y-%m-%d %H:%M:%S')
+
+def iter_reports_near(lat, lon, radius_miles, hours, before_id=None, now=None,
+                      batch_size=REPORT_QUERY_BATCH_SIZE):
+    """Stream reports within a radius from the last N hours, newest first
+    
+    Candidates come from reports_rtree (bounding box and time range), one
+    batch of batch_size per query: each query is bounded by LIMIT and by the
+    lowest ID of the previous batch, so SQLite keeps at most batch_size rows
+    in its top-N sorter. Exact distances are computed for a whole batch at
+    once with NumPy. Memory use does not depend on how many reports match.
+    
+    Args:
+        lat (float): Center latitude
+        lon (float): Center longitude
+        radius_miles (float): Search radius
+        hours (float): How far back to look
+        before_id (int): Only reports with a lower ID (pagination cursor)
+        now (datetime): Current time, in UTC (default: now)
+    
+    Yields:
+        dict: Report fields plus distance_miles
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_miles)
+    since_seconds, since_timestamp = _since(hours, now)
+    columns = ', '.join(f'r.{column}' for column in REPORT_COLUMNS)
+    before = before_id if before_id is not None else 2 ** 63 - 1
+    
+    while True:
+        # CROSS JOIN keeps the R*Tree as the outer loop; with ANALYZE stats
+        # the planner otherwise prefers a latitude range scan on
+        # idx_reports_location
+        rows = get_pooled_connection().execute(
+            f'SELECT {columns} FROM reports_rtree t CROSS JOIN reports r ON r.id = t.id '
+            'WHERE t.min_lat <= ? AND t.max_lat >= ? AND t.min_lon <= ? AND t.max_lon >= ? AND t.max_time >= ? '
+            'AND r.timestamp >= ? AND r.id < ? '
+            'ORDER BY r.id DESC LIMIT ?',
+            (max_lat, min_lat, max_lon, min_lon, since_seconds, since_timestamp, before, batch_size)
+        ).fetchall()
+        if not rows:
+            return
+        lats = np.fromiter((row['latitude'] for row in rows), dtype=np.float64, count=len(rows))
+        lons = np.fromiter((row['longitude'] for row in rows), dtype=np.float64, count=len(rows))
+        distances = haversine_miles(lat, lon, lats, lons)
+        for row, distance in zip(rows, distances):
+            if distance <= radius_miles:
+                report = dict(zip(REPORT_COLUMNS, row))
+                report['distance_miles'] = round(float(distance), 3)
+                yield report
+        if len(rows) < batch_size:
+            return
+        before = rows[-1]['id']
+
+def reports_near(lat, lon, radius_miles, hours, limit=100, before_id=None, now=None):
+    """One page of iter_reports_near
+    
+    The first query asks for exactly one page (plus one row to tell whether
+    there is a next page); more are only run if some candidates in the
+    bounding box turn out to be outside the radius.
+    
+    Returns:
+        tuple: (list of reports, before_id for the next page or None)
+    """
+    results = iter_reports_near(lat, lon, radius_miles, hours, before_id, now, batch_size=limit + 1)
+    page = list(itertools.islice(results, limit + 1))
+    results.close()
+    if len(page) > limit:
+        return page[:limit], page[limit - 1]['id']
+    return page, None
+
+def report_hotspots(min_lat, max_lat, min_lon, max_lon, hours, cell_degrees=0.01, limit=100, now=None):
+    """Count reports per grid cell inside a box, busiest cells first
+    
+    The grid starts at the box's south-west corner. Binning and counting
+    run in SQL over the reports_rtree candidates.
+    
+    Returns:
+        list: dicts with the cell's center latitude/longitude and its report count
+    """
+    since_seconds, since_timestamp = _since(hours, now)
+    rows = get_pooled_connection().execute(
+        'SELECT CAST((r.latitude - :min_lat) / :cell AS INTEGER) AS lat_cell, '
+        'CAST((r.longitude - :min_lon) / :cell AS INTEGER) AS lon_cell, COUNT(*) AS reports '
+        'FROM reports_rtree t CROSS JOIN reports r ON r.id = t.id '
+        'WHERE t.min_lat <= :max_lat AND t.max_lat >= :min_lat '
+        'AND t.min_lon <= :max_lon AND t.max_lon >= :min_lon AND t.max_time >= :since_seconds '
+        'AND r.latitude BETWEEN :min_lat AND :max_lat AND r.longitude BETWEEN :min_lon AND :max_lon '
+        'AND r.timestamp >= :since_timestamp '
+        'GROUP BY lat_cell, lon_cell ORDER BY reports DESC, lat_cell, lon_cell LIMIT :limit',
+        {'min_lat': min_lat, 'max_lat': max_lat, 'min_lon': min_lon, 'max_lon': max_lon, 'cell': cell_degrees,
+         'since_seconds': since_seconds, 'since_timestamp': since_timestamp, 'limit': limit}
+    ).fetchall()
+    return [
+        {
+            'latitude': round(min_lat + (row['lat_cell'] + 0.5) * cell_degrees, 6),
+            'longitude': round(min_lon + (row['lon_cell'] + 0.5) * cell_degrees, 6),
+            'count': row['reports']
+        }
+        for row in rows
+    ]
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from database.models import (
+    transaction, get_pooled_connection, release_blob_refs, release_job_blob_refs, referenced_blob_paths
+)
+from utils.metrics import metrics
+from config import (
+    REPORT_RETENTION_HOURS, RETENTION_CHUNK_SIZE, RETENTION_CHUNK_PAUSE_MS, RETENTION_IMAGE_DELETE_BATCH
+)
+
+# Outcome of one purge run. max_lock_ms is the longest time a single
+# chunk held the SQLite write lock.
+PurgeStats = namedtuple('PurgeStats', ['deleted', 'chunks', 'seconds', 'rows_per_second', 'max_lock_ms'])
+
+def retention_cutoff(retention_hours=REPORT_RETENTION_HOURS, now=None):
+    """Oldest timestamp that is still kept, in the format of CURRENT_TIMESTAMP (UTC)"""
+    now = datetime.now(timezone.utc) if now is None else now
+    return (now - timedelta(hours=retention_hours)).strftime('%Y-%m-%d %H:%M:%S')
+
+def expired_report_ids(cutoff, limit):
+    """IDs of the oldest reports older than cutoff (read from idx_reports_timestamp)"""
+    rows = get_pooled_connection().execute(
+        'SELECT id FROM reports WHERE timestamp < ? ORDER BY timestamp, id LIMIT ?', (cutoff, limit)
+    ).fetchall()
+    return [row['id'] for row in rows]
+
+def count_expired_reports(cutoff):
+    """Number of reports waiting to be purged"""
+    return get_pooled_connection().execute(
+        'SELECT COUNT(*) FROM reports WHERE timestamp < ?', (cutoff,)
+    ).fetchone()[0]
+
+def oldest_report_timestamp():
+    """Timestamp of the oldest stored report (from idx_reports_timestamp), or None"""
+    return get_pooled_connection().execute('SELECT MIN(timestamp) FROM reports').fetchone()[0]
+
+def purge_report_chunk(report_ids, cutoff):
+    """Delete one chunk of reports in a single short transaction
+    
+    The chunk's references to its images (and those still held by its
+    unfinished media jobs) are released in the same transaction, and files nothing else refers to are moved to
+    pending_image_deletes, so a crash at any point leaves every file either
+    still referenced or queued for deletion.
+    
+    Returns:
+        tuple: (reports deleted, seconds the write lock was held)
+    """
+    placeholders = ','.join('?' * len(report_ids))
+    with transaction(immediate=True) as conn:
+        locked_at = time.perf_counter()
+        # Re-check the cutoff: the IDs were read outside the transaction
+        rows = conn.execute(
+            f'SELECT id, images FROM reports WHERE id IN ({placeholders}) AND timestamp < ?',
+            (*report_ids, cutoff)
+        ).fetchall()
+        ids = [row['id'] for row in rows]
+        paths = [path for row in rows if row['images'] for path in json.loads(row['images'])]
+        if ids:
+            id_placeholders = ','.join('?' * len(ids))
+            # Photos resent in newer reports share their file and stay
+            unreferenced = release_blob_refs(conn, paths)
+            # Drop queued media work for the reports being deleted, with the
+            # references its attempts took but never attached
+            job_ids = [row['id'] for row in conn.execute(
+                f'SELECT id FROM media_jobs WHERE report_id IN ({id_placeholders})', ids
+            )]
+            unreferenced += release_job_blob_refs(conn, job_ids)
+            conn.executemany('INSERT INTO pending_image_deletes (path) VALUES (?)',
+                             [(path,) for path in unreferenced])
+            conn.execute(f'DELETE FROM media_jobs WHERE report_id IN ({id_placeholders})', ids)
+            conn.execute(f'DELETE FROM reports WHERE id IN ({id_placeholders})', ids)
+    return len(ids), time.perf_counter() - locked_at
+
+def claim_image_deletes(limit):
+    """Oldest queued image deletions as (id, path) rows"""
+    return get_pooled_connection().execute(
+        'SELECT id, path FROM pending_image_deletes ORDER BY id LIMIT ?', (limit,)
+    ).fetchall()
+
+def unlink_image_batch(rows):
+    """Unlink claimed image files and forget their queued deletions
+    
+    Runs under the write lock so a file whose bytes were stored again (and
+    referenced) since it was queued is kept instead.
+    
+    Returns:
+        int: Number of files deleted
+    """
+    deleted = 0
+    with transaction(immediate=True) as conn:
+        referenced = referenced_blob_paths(conn, {row['path'] for row in rows})
+        for row in rows:
+            if row['path'] in referenced:
+                continue
+            try:
+                os.remove(row['path'])
+                deleted += 1
+            except FileNotFoundError:
+                pass  # Already gone (e.g. deleted before a crash)
+            except OSError as e:
+                print(f"Error deleting image {row['path']}: {str(e)}")
+        delete_ids = [row['id'] for row in rows]
+        conn.execute(
+            f"DELETE FROM pending_image_deletes WHERE id IN ({','.join('?' * len(delete_ids))})", delete_ids
+        )
+    return deleted
+
+class RetentionEngine:
+    """Deletes expired reports in small chunks
+    
+    Each chunk is a short transaction over at most chunk_size report IDs,
+    picked oldest first through idx_reports_timestamp. The write lock is
+    released between chunks (with a short pause) so save_report and the
+    media workers never wait behind a whole purge.
+    
+    Image files are unlinked by a background thread from the durable
+    pending_image_deletes queue. A purge interrupted by a crash is simply
+    run again: the remaining reports are still expired, and files queued
+    for deletion are picked up by the next deleter.
+    """
+    
+    def __init__(self, retention_hours=REPORT_RETENTION_HOURS, chunk_size=RETENTION_CHUNK_SIZE,
+                 pause_ms=RETENTION_CHUNK_PAUSE_MS, image_batch=RETENTION_IMAGE_DELETE_BATCH):
+        self.retention_hours = retention_hours
+        self.chunk_size = chunk_size
+        self.pause_ms = pause_ms
+        self.image_batch = image_batch
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._deleter = None
+    
+    def purge(self, max_chunks=None, now=None):
+        """Delete expired reports
+        
+        Args:
+            max_chunks (int): Stop after this many chunks (default: until none are left)
+            now (datetime): Current time, in UTC (default: now)
+        
+        Returns:
+            PurgeStats: What was deleted and how long the lock was held
+        """
+        cutoff = retention_cutoff(self.retention_hours, now)
+        started = time.perf_counter()
+        deleted = chunks = 0
+        max_lock = 0.0
+        
+        while max_chunks is None or chunks < max_chunks:
+            report_ids = expired_report_ids(cutoff, self.chunk_size)
+            if not report_ids:
+                break
+            if chunks:
+                # Let writers waiting on the lock in before the next chunk
+                time.sleep(self.pause_ms / 1000)
+            
+            count, lock_seconds = purge_report_chunk(report_ids, cutoff)
+            deleted += count
+            chunks += 1
+            max_lock = max(max_lock, lock_seconds)
+            metrics.observe('retention.lock_hold_ms', lock_seconds * 1000)
+            metrics.incr('retention.reports_deleted', count)
+            self._wakeup.set()
+        
+        seconds = time.perf_counter() - started
+        return PurgeStats(deleted, chunks, seconds, deleted / seconds if seconds else 0.0, max_lock * 1000)
+    
+    def backlog(self, now=None):
+        """Number of expired reports not purged yet"""
+        return count_expired_reports(retention_cutoff(self.retention_hours, now))
+    
+    def lag_seconds(self, now=None):
+        """How long past its expiry the oldest stored report is (0 if none are expired)"""
+        oldest = oldest_report_timestamp()
+        if oldest is None:
+            return 0.0
+        now = datetime.now(timezone.utc) if now is None else now
+        expires_at = datetime.strptime(oldest, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc) \
+            + timedelta(hours=self.retention_hours)
+        return max(0.0, (now - expires_at).total_seconds())
+    
+    def delete_pending_images(self):
+        """Unlink every queued image file on the calling thread
+        
+        Returns:
+            int: Number of queued deletions processed
+        """
+        processed = 0
+        while True:
+            rows = claim_image_deletes(self.image_batch)
+            if not rows:
+                return processed
+            unlink_image_batch(rows)
+            processed += len(rows)
+            metrics.incr('retention.images_deleted', len(rows))
+    
+    def start_image_deleter(self, poll_interval=60):
+        """Unlink queued image files on a background thread
+        
+        The thread drains the queue at startup (finishing anything a crashed
+        process left behind), after every purged chunk, and every
+        poll_interval seconds.
+        """
+        if self._deleter is not None:
+            return
+        self._stopping.clear()
+        
+        def run():
+            while not self._stopping.is_set():
+                try:
+                    self.delete_pending_images()
+                except Exception as e:
+                    print(f"Error deleting expired images: {str(e)}")
+                self._wakeup.wait(poll_interval)
+                self._wakeup.clear()
+        
+        self._deleter = threading.Thread(target=run, name='retention-image-deleter', daemon=True)
+        self._deleter.start()
+    
+    def stop_image_deleter(self, timeout=5.0):
+        """Stop the background deleter thread"""
+        if self._deleter is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._deleter.join(timeout)
+        self._deleter = None
@@ -4,7 +4,9 @@ CREATE TABLE IF NOT EXISTS reports (
     latitude REAL,
     longitude REAL,
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-    images TEXT  -- JSON string of image paths
+    images TEXT,  -- JSON string of image paths
+    image_status TEXT DEFAULT 'done',  -- 'processing', 'done' or 'failed'
+    processed_at DATETIME  -- when background image processing finished
 );
 
 CREATE TABLE IF NOT EXISTS bait_car_logs (
@@ -15,5 +17,84 @@ CREATE TABLE IF NOT EXISTS bait_car_logs (
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Durable queue of media attachments waiting for privacy processing
+CREATE TABLE IF NOT EXISTS media_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_id INTEGER NOT NULL,
+    media_urls TEXT NOT NULL,  -- JSON list of Twilio media URLs
+    status TEXT NOT NULL DEFAULT 'pending',  -- 'pending', 'running', 'done' or 'failed'
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    claimed_at DATETIME,
+    not_before DATETIME,  -- A retried job waits until then before it can be claimed
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Image files of purged reports, waiting to be unlinked. Written in the
+-- same transaction as the report delete so no file is ever orphaned.
+CREATE TABLE IF NOT EXISTS pending_image_deletes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Content-addressed image files (see utils/media_store.py). refcount is
+-- the number of reports (and in-flight media jobs) holding the file; a
+-- file is only unlinked once nothing refers to it.
+CREATE TABLE IF NOT EXISTS media_blobs (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,  -- sha256 of the file contents
+    size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- References held by media job attempts whose images are not attached to
+-- their report yet. An attempt that dies, is reclaimed or whose report is
+-- purged has its references released from here instead of leaking them.
+CREATE TABLE IF NOT EXISTS media_job_blobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    attempt INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+
+-- Spatial index over reports: one point per located report, plus its
+-- timestamp in Unix seconds as a third dimension. Kept in sync by the
+-- triggers below. R*Tree coordinates are 32-bit floats rounded outwards,
+-- so matches are candidates to re-check against the reports row. Reports
+-- without (numeric) coordinates are not indexed.
+CREATE VIRTUAL TABLE IF NOT EXISTS reports_rtree USING rtree(
+    id,
+    min_lat, max_lat,
+    min_lon, max_lon,
+    min_time, max_time
+);
+
+CREATE TRIGGER IF NOT EXISTS reports_rtree_insert AFTER INSERT ON reports
+WHEN typeof(new.latitude) = 'real' AND typeof(new.longitude) = 'real'
+BEGIN
+    INSERT INTO reports_rtree VALUES (
+        new.id, new.latitude, new.latitude, new.longitude, new.longitude,
+        strftime('%s', new.timestamp), strftime('%s', new.timestamp)
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS reports_rtree_update AFTER UPDATE OF latitude, longitude, timestamp ON reports
+BEGIN
+    DELETE FROM reports_rtree WHERE id = old.id;
+    INSERT INTO reports_rtree
+    SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude,
+           strftime('%s', new.timestamp), strftime('%s', new.timestamp)
+    WHERE typeof(new.latitude) = 'real' AND typeof(new.longitude) = 'real';
+END;
+
+CREATE TRIGGER IF NOT EXISTS reports_rtree_delete AFTER DELETE ON reports
+BEGIN
+    DELETE FROM reports_rtree WHERE id = old.id;
+END;
+
 CREATE INDEX IF NOT EXISTS idx_reports_timestamp ON reports(timestamp);
-CREATE INDEX IF NOT EXISTS idx_reports_location ON reports(latitude, longitude);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_reports_location ON reports(latitude, longitude);
+CREATE INDEX IF NOT EXISTS idx_media_jobs_status ON media_jobs(status, id);
+CREATE INDEX IF NOT EXISTS idx_media_job_blobs_job ON media_job_blobs(job_id, attempt);
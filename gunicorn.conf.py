@@ -0,0 +1,12 @@
+# Gunicorn configuration
+# Run with: gunicorn -c gunicorn.conf.py app:app
+import time
+
+def post_fork(server, worker):
+    """Load the face detector in each worker before it takes requests"""
+    from utils.cv_models import warm_models
+    
+    started = time.perf_counter()
+    warm_models()
+    server.log.info("Worker %s warmed CV models in %.1f ms",
+                    worker.pid, (time.perf_counter() - started) * 1000)
@@ -0,0 +1,19 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from database import models
+
+class DatabaseTestCase(unittest.TestCase):
+    """Base for tests that run against a fresh database in a temporary directory"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db_patch = patch.object(models, 'DATABASE_PATH', os.path.join(self.tmpdir.name, 'test.db'))
+        self.db_patch.start()
+        self.addCleanup(self.db_patch.stop)
+        models.create_tables()
+        # Cleanups run after the subclass tearDown, so workers are stopped first
+        self.addCleanup(models.close_db_connections)
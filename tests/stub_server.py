@@ -0,0 +1,61 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubServer:
+    """Local HTTP server standing in for an upstream API in tests
+    
+    Routes map a request path to a function that takes the request handler
+    (with the request body in `handler.body`) and returns
+    (status, headers, body). Every request is recorded in
+    `requests` as (method, path, headers, body).
+    """
+    
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.body = self.rfile.read(length) if length else b''
+                path = self.path.split('?', 1)[0]
+                stub.requests.append((self.command, self.path, dict(self.headers), body))
+                
+                route = stub.routes.get(path)
+                if route is None:
+                    status, headers, payload = 404, {}, b'not found'
+                else:
+                    status, headers, payload = route(self)
+                
+                self.send_response(status)
+                if 'Content-Length' not in headers and 'Transfer-Encoding' not in headers:
+                    headers = dict(headers, **{'Content-Length': str(len(payload))})
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if callable(payload):
+                    payload(self.wfile)
+                else:
+                    self.wfile.write(payload)
+            
+            do_GET = _handle
+            do_POST = _handle
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
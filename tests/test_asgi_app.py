@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock, AsyncMock
+from urllib.parse import urlencode
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asgi_app
+from app import app as flask_app
+
+async def call(path, data=None, method='POST', body=None):
+    """Send one request straight to the ASGI app; returns (status, body)"""
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'scheme': 'http',
+        'root_path': '', 'server': ('testserver', 80), 'headers': [(b'host', b'bot.example.org')]
+    }
+    body = urlencode(data or {}).encode() if body is None else body
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+    
+    async def receive():
+        return messages.pop(0)
+    
+    async def send(message):
+        sent.append(message)
+    
+    await asgi_app.app(scope, receive, send)
+    return sent[0]['status'], sent[1]['body'].decode()
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+class AsgiAppTestCase(unittest.TestCase):
+    """Test cases for the async webhook server mode"""
+    
+    def setUp(self):
+        self.media = MagicMock()
+        self.media.fetch = AsyncMock(return_value=b'jpeg bytes')
+        patcher = patch.multiple(asgi_app.services, media=self.media, ocr_executor=ThreadPoolExecutor(2))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        dispatcher_patcher = patch('asgi_app.call_dispatcher')
+        self.dispatcher = dispatcher_patcher.start()
+        self.addCleanup(dispatcher_patcher.stop)
+        # The burst tests send far more than one number's budget
+        limiter_patcher = patch.object(asgi_app.rate_limiter, 'enabled', False)
+        limiter_patcher.start()
+        self.addCleanup(limiter_patcher.stop)
+    
+    def test_voice_twiml_matches_flask(self):
+        """Test the call TwiML is identical in both server modes"""
+        client = flask_app.test_client()
+        for path in ('/emergency_call', '/family_call'):
+            status, body = run(call(path))
+            expected = client.post(path, base_url='http://bot.example.org').data.decode()
+            
+            self.assertEqual(status, 200)
+            self.assertEqual(body, expected)
+    
+    def test_red_queues_emergency_call(self):
+        """Test RED hands the call to the dispatcher"""
+        status, body = run(call('/sms', {'Body': 'RED', 'From': '+13175551234'}))
+        
+        self.assertEqual(status, 200)
+        self.assertIn('Initiating emergency call', body)
+        self.dispatcher.dispatch.assert_called_once_with(
+            '+13175551234', 'http://bot.example.org/emergency_call', asgi_app.EMERGENCY_PRIORITY)
+    
+    @patch('asgi_app.check_stolen_status')
+    @patch('asgi_app.extract_vin_from_bytes')
+    def test_check_vin(self, mock_extract, mock_check):
+        """Test the photo is fetched asynchronously and OCR'd off the loop"""
+        mock_extract.return_value = "1HGCM82633A004352"
+        mock_check.return_value = {'is_stolen': True, 'vin': "1HGCM82633A004352"}
+        
+        _, body = run(call('/sms', {
+            'Body': 'check vin', 'NumMedia': '1',
+            'MediaUrl0': 'https://example.com/vin.jpg', 'MediaContentType0': 'image/jpeg'
+        }))
+        
+        self.assertIn('REPORTED STOLEN', body)
+        self.media.fetch.assert_awaited_once_with('https://example.com/vin.jpg')
+        mock_extract.assert_called_once_with(b'jpeg bytes')
+    
+    def test_unknown_command_and_routes(self):
+        """Test help text, unknown paths and oversized bodies"""
+        self.assertIn('Commands', run(call('/sms', {'Body': 'hello'}))[1])
+        self.assertEqual(run(call('/nope'))[0], 404)
+        self.assertEqual(run(call('/sms', body=b'x' * (asgi_app.ASGI_MAX_BODY_BYTES + 1)))[0], 413)
+    
+    def test_concurrent_webhooks_share_one_loop(self):
+        """Test slow photo downloads overlap instead of queueing"""
+        async def slow_fetch(url):
+            await asyncio.sleep(0.2)
+            return b'jpeg bytes'
+        self.media.fetch = slow_fetch
+        
+        async def burst():
+            return await asyncio.gather(*[call('/sms', {
+                'Body': 'check vin', 'NumMedia': '1',
+                'MediaUrl0': f'https://example.com/{i}.jpg', 'MediaContentType0': 'image/jpeg'
+            }) for i in range(100)])
+        
+        started = time.perf_counter()
+        with patch('asgi_app.extract_vin_from_bytes', return_value=None):
+            results = run(burst())
+        
+        self.assertTrue(all(status == 200 for status, _ in results))
+        self.assertLess(time.perf_counter() - started, 1.5)
@@ -1,6 +1,8 @@
 import unittest
 import os
 import sys
+import json
+import time
 from unittest.mock import patch, MagicMock
 
 # Add parent directory to path so we can import our modules
@@ -8,6 +10,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app
 from utils.bait_car_api import get_nearby_bait_cars, calculate_distance
+from utils.spatial_index import GridIndex
+from utils.bait_car_fleet import BaitCarFleet
+from tests.stub_server import StubServer
 
 class BaitCarTestCase(unittest.TestCase):
     """Test cases for bait car functionality"""
@@ -26,6 +31,38 @@ class BaitCarTestCase(unittest.TestCase):
         distance = calculate_distance(39.768, -86.158, 39.768, -86.158)
         self.assertAlmostEqual(distance, 0, delta=0.01)
     
+    def test_grid_index_matches_linear_scan(self):
+        """Test the spatial index finds the same cars as checking every one"""
+        index = GridIndex()
+        cars = {}
+        for i in range(200):
+            lat = 39.70 + (i * 0.0007) % 0.14
+            lon = -86.22 + (i * 0.0013) % 0.14
+            cars[i] = (lat, lon, None)
+        index.sync(cars)
+        
+        expected = sorted(
+            car_id for car_id, (lat, lon, _) in cars.items()
+            if calculate_distance(39.768, -86.158, lat, lon) <= 1.0
+        )
+        results = index.query(39.768, -86.158, 1.0)
+        
+        self.assertEqual(sorted(car_id for car_id, _, _ in results), expected)
+        distances = [distance for _, _, distance in results]
+        self.assertEqual(distances, sorted(distances))
+    
+    def test_grid_index_incremental_sync(self):
+        """Test moved and removed cars are reflected after a feed update"""
+        index = GridIndex()
+        index.sync({'a': (39.768, -86.158, None), 'b': (39.764, -86.173, None)})
+        
+        # Car a drives away and car b goes off the feed
+        changed = index.sync({'a': (39.900, -86.000, None)})
+        
+        self.assertEqual(changed, 2)
+        self.assertEqual(index.query(39.768, -86.158, 2.0), [])
+        self.assertEqual([car_id for car_id, _, _ in index.query(39.900, -86.000, 0.1)], ['a'])
+    
     @patch('utils.bait_car_api.get_nearby_bait_cars')
     def test_bait_car_nearby(self, mock_get_nearby_bait_cars):
         """Test bait car detection when one is nearby"""
@@ -84,4 +121,86 @@ class BaitCarTestCase(unittest.TestCase):
         response = self.app.post('/sms', data=test_data)
         
         # Check response
-        self.assertIn(b'Location information is needed', response.data)
\ No newline at end of file
+        self.assertIn(b'Location information is needed', response.data)
+def fleet_feed(cars, etag='"v1"', last_modified='Tue, 10 Oct 2026 10:00:00 GMT'):
+    """Route serving a fleet feed that honours conditional requests"""
+    def route(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        headers = {'Content-Type': 'application/json', 'ETag': etag, 'Last-Modified': last_modified}
+        return 200, headers, json.dumps(cars).encode()
+    return route
+
+class BaitCarFleetTestCase(unittest.TestCase):
+    """Test cases for the background-refreshed bait car fleet snapshot"""
+    
+    def setUp(self):
+        self.cars = [
+            {"id": "bc-1", "lat": 39.768, "lon": -86.158, "active": True},
+            {"id": "bc-2", "lat": 39.764, "lon": -86.173, "active": False}
+        ]
+        self.server = StubServer({'/baitcars': fleet_feed(self.cars)})
+        self.server.__enter__()
+        self.fleet = BaitCarFleet(url=self.server.url + '/baitcars', api_key='secret', refresh_interval=60)
+    
+    def tearDown(self):
+        self.fleet.session.close()
+        self.server.__exit__(None, None, None)
+    
+    def test_refresh_loads_active_cars(self):
+        """Test the feed is fetched with the API key and indexed"""
+        self.assertTrue(self.fleet.refresh())
+        
+        self.assertEqual([car_id for car_id, _, _ in self.fleet.query(39.768, -86.158, 2.0)], ['bc-1'])
+        self.assertEqual(self.server.requests[0][2]['Authorization'], 'Bearer secret')
+    
+    def test_refresh_only_touches_changed_cars(self):
+        """Test a refresh with one moved car re-indexes only that car's cells"""
+        cars = [{"id": f"bc-{i}", "lat": 39.70 + i * 0.02, "lon": -86.158, "active": True} for i in range(20)]
+        self.fleet.replace(cars)
+        before = self.fleet.snapshot.index
+        
+        moved = [dict(car) for car in cars]
+        moved[0].update(lat=39.95, lon=-86.00)
+        self.fleet.replace(moved)
+        after = self.fleet.snapshot.index
+        
+        old_cell, new_cell = before._cell(39.70, -86.158), after._cell(39.95, -86.00)
+        for cell, members in before._cells.items():
+            if cell != old_cell:
+                self.assertIs(after._cells[cell], members)
+        self.assertNotIn(old_cell, after._cells)
+        self.assertEqual(after._cells[new_cell], {'bc-0'})
+        # The previous snapshot still answers with the old position
+        self.assertEqual([car_id for car_id, _, _ in before.query(39.70, -86.158, 0.1)], ['bc-0'])
+        self.assertEqual([car_id for car_id, _, _ in after.query(39.95, -86.00, 0.1)], ['bc-0'])
+    
+    def test_unchanged_feed_keeps_snapshot(self):
+        """Test a 304 revalidates the snapshot without rebuilding it"""
+        self.fleet.refresh()
+        snapshot = self.fleet.snapshot
+        
+        self.assertFalse(self.fleet.refresh())
+        self.assertIs(self.fleet.snapshot.index, snapshot.index)
+        self.assertGreaterEqual(self.fleet.snapshot.fetched_at, snapshot.fetched_at)
+        headers = self.server.requests[1][2]
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(headers['If-Modified-Since'], 'Tue, 10 Oct 2026 10:00:00 GMT')
+    
+    def test_upstream_down_serves_last_snapshot(self):
+        """Test queries keep working from the old snapshot while the feed fails"""
+        self.fleet.refresh()
+        self.server.routes['/baitcars'] = lambda handler: (503, {}, b'unavailable')
+        
+        self.assertFalse(self.fleet.refresh())
+        self.assertEqual(len(self.fleet.query(39.768, -86.158, 2.0)), 1)
+    
+    def test_stale_query_revalidates_in_background(self):
+        """Test a query on a stale snapshot answers at once and refreshes behind it"""
+        self.assertEqual(self.fleet.query(39.768, -86.158, 2.0), [])
+        
+        deadline = time.time() + 2
+        while not self.fleet.query(39.768, -86.158, 2.0) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.fleet.query(39.768, -86.158, 2.0)), 1)
+        self.assertEqual(len(self.server.requests), 1)
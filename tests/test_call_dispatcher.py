@@ -0,0 +1,108 @@
+import unittest
+import os
+import sys
+import time
+import threading
+from unittest.mock import patch, MagicMock
+from twilio.base.exceptions import TwilioRestException
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from utils.call_dispatcher import CallDispatcher, EMERGENCY_PRIORITY, FAMILY_PRIORITY
+from utils.metrics import metrics
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+class CallDispatcherTestCase(unittest.TestCase):
+    """Test cases for the outbound call dispatcher"""
+    
+    def setUp(self):
+        metrics.reset()
+        self.client = MagicMock()
+        self.dispatcher = CallDispatcher(self.client, num_workers=1, max_attempts=3, backoff=0.01,
+                                         dedupe_window=60, from_number='+13175550000')
+        self.addCleanup(self.dispatcher.stop)
+    
+    def test_call_is_placed(self):
+        """Test a queued call is dialled and its latency recorded"""
+        self.dispatcher.start()
+        
+        self.assertTrue(self.dispatcher.dispatch('+13175551234', 'http://bot/emergency_call'))
+        
+        self.assertTrue(wait_for(lambda: self.client.calls.create.called))
+        self.client.calls.create.assert_called_once_with(
+            to='+13175551234', from_='+13175550000', url='http://bot/emergency_call')
+        self.assertTrue(wait_for(lambda: 'calls.enqueue_to_dial_ms' in metrics.snapshot()['timings']))
+    
+    def test_repeat_red_is_deduped(self):
+        """Test repeated texts from one number only place one call"""
+        self.dispatcher.start()
+        
+        results = [self.dispatcher.dispatch('+13175551234', 'http://bot/emergency_call') for _ in range(5)]
+        self.assertTrue(self.dispatcher.dispatch('+13175559999', 'http://bot/emergency_call'))
+        self.assertTrue(self.dispatcher.dispatch('+13175551234', 'http://bot/family_call', FAMILY_PRIORITY))
+        
+        self.assertEqual(results, [True, False, False, False, False])
+        self.assertTrue(wait_for(lambda: self.client.calls.create.call_count == 3))
+        self.assertEqual(metrics.snapshot()['counters']['calls.deduped'], 4)
+    
+    def test_server_error_is_retried(self):
+        """Test a Twilio 5xx is retried with backoff"""
+        self.client.calls.create.side_effect = [
+            TwilioRestException(503, 'https://api.twilio.com', 'Service Unavailable'),
+            MagicMock()
+        ]
+        self.dispatcher.start()
+        
+        self.dispatcher.dispatch('+13175551234', 'http://bot/emergency_call')
+        
+        self.assertTrue(wait_for(lambda: metrics.snapshot()['counters'].get('calls.placed') == 1))
+        self.assertEqual(self.client.calls.create.call_count, 2)
+        self.assertEqual(metrics.snapshot()['counters']['calls.retries'], 1)
+    
+    def test_client_error_is_not_retried(self):
+        """Test an invalid number fails without retrying"""
+        self.client.calls.create.side_effect = TwilioRestException(400, 'https://api.twilio.com', 'Invalid To')
+        self.dispatcher.start()
+        
+        self.dispatcher.dispatch('+1000', 'http://bot/emergency_call')
+        
+        self.assertTrue(wait_for(lambda: metrics.snapshot()['counters'].get('calls.failed') == 1))
+        self.assertEqual(self.client.calls.create.call_count, 1)
+    
+    def test_emergency_calls_go_first(self):
+        """Test queued emergency calls are dialled before family calls"""
+        self.dispatcher.dispatch('+13175550001', 'http://bot/family_call', FAMILY_PRIORITY)
+        self.dispatcher.dispatch('+13175550002', 'http://bot/emergency_call', EMERGENCY_PRIORITY)
+        self.dispatcher.start()
+        
+        self.assertTrue(wait_for(lambda: self.client.calls.create.call_count == 2))
+        order = [c.kwargs['to'] for c in self.client.calls.create.call_args_list]
+        self.assertEqual(order, ['+13175550002', '+13175550001'])
+    
+    def test_sms_reply_does_not_wait_for_twilio(self):
+        """Test /sms replies before the call is placed"""
+        release = threading.Event()
+        self.client.calls.create.side_effect = lambda **kwargs: release.wait(5)
+        self.dispatcher.start()
+        self.addCleanup(release.set)
+        
+        with patch('app.call_dispatcher', self.dispatcher):
+            started = time.perf_counter()
+            response = app.test_client().post('/sms', data={'Body': 'RED', 'From': '+13175551234'})
+            elapsed = time.perf_counter() - started
+        
+        self.assertIn(b'emergency call', response.data)
+        self.assertLess(elapsed, 1.0)
+        self.assertTrue(wait_for(lambda: self.client.calls.create.called))
+
+if __name__ == '__main__':
+    unittest.main()
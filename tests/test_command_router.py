@@ -0,0 +1,79 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, sms_router
+from utils.command_router import CommandRouter, CommandMatch
+
+class CommandRouterTestCase(unittest.TestCase):
+    """Test cases for SMS command classification"""
+    
+    def test_keywords_match_whole_words(self):
+        """Test 'red' no longer matches inside other words"""
+        for text in ("I'm so bored", "prices reduced today", "credit card stolen", "Fred says hi"):
+            self.assertIsNone(sms_router.classify(text))
+        
+        for text in ("RED", "red!", "Red help me", "please RED now", "help.red"):
+            self.assertEqual(sms_router.classify(text).name, 'emergency')
+    
+    def test_priority_and_media(self):
+        """Test emergency wins and media commands need attachments"""
+        self.assertEqual(sms_router.classify("report red car", has_media=True).name, 'emergency')
+        self.assertEqual(sms_router.classify("check vin, also report it", has_media=True).name, 'report')
+        self.assertEqual(sms_router.classify("Call  Mom").name, 'family_call')
+        self.assertEqual(sms_router.classify("any bait car here?").name, 'bait_cars')
+        
+        # Without a photo, report and check vin fall through
+        self.assertIsNone(sms_router.classify("report broken window"))
+        self.assertEqual(sms_router.classify("report bait cars").name, 'bait_cars')
+    
+    def test_argument_is_text_around_keyword(self):
+        """Test the argument keeps the rest of the message"""
+        match = sms_router.classify("Report Broken window on Main St", has_media=True)
+        self.assertEqual(match, CommandMatch('report', 'Broken window on Main St'))
+        self.assertEqual(sms_router.classify("suspicious van report", has_media=True).argument, 'suspicious van')
+    
+    def test_decorator_registration(self):
+        """Test handlers are registered and dispatched by decorator"""
+        router = CommandRouter()
+        
+        @router.command('hello', r'hi|hello')
+        def hello(message, replies):
+            replies.append(('hello', message.argument))
+        
+        @router.default
+        def fallback(message, replies):
+            replies.append(('default', message.body))
+        
+        replies = []
+        router.dispatch({'Body': ' Hello there '}, 'http://bot/', replies)
+        router.dispatch({'Body': 'nothing'}, 'http://bot/', replies)
+        self.assertEqual(replies, [('hello', 'there'), ('default', 'nothing')])
+        
+        with self.assertRaises(ValueError):
+            router.command('hello', r'hey')
+        with self.assertRaises(KeyError):
+            router.handler('missing')
+    
+    def test_shared_definitions(self):
+        """Test a second router reuses the command definitions"""
+        router = CommandRouter(sms_router.commands)
+        
+        self.assertEqual([command.name for command in router.commands],
+                         [command.name for command in sms_router.commands])
+        self.assertEqual(router.classify("RED").name, 'emergency')
+    
+    @patch('app.call_dispatcher')
+    def test_bored_does_not_call(self, mock_dispatcher):
+        """Test a message containing 'bored' gets help, not an emergency call"""
+        response = app.test_client().post('/sms', data={'Body': "I'm bored", 'From': '+13175551234'})
+        
+        mock_dispatcher.dispatch.assert_not_called()
+        self.assertIn(b'Commands', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
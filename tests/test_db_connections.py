@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import models
+from tests import DatabaseTestCase
+
+class TransactionTestCase(DatabaseTestCase):
+    """Test cases for pooled connections and transaction()"""
+    
+    def setUp(self):
+        super().setUp()
+    
+    def _report_count(self):
+        return models.get_pooled_connection().execute('SELECT COUNT(*) FROM reports').fetchone()[0]
+    
+    def test_raising_block_rolls_back(self):
+        """Test nothing from a block that raises is committed"""
+        with self.assertRaises(ValueError):
+            with models.transaction() as conn:
+                conn.execute("INSERT INTO reports (report_text) VALUES ('lost')")
+                raise ValueError('abort')
+        
+        self.assertEqual(self._report_count(), 0)
+        self.assertFalse(models.get_pooled_connection().in_transaction)
+    
+    def test_nested_block_joins_outer_transaction(self):
+        """Test an inner block commits and rolls back with the outer one"""
+        with models.transaction() as outer:
+            outer.execute("INSERT INTO reports (report_text) VALUES ('outer')")
+            with models.transaction(immediate=True) as inner:
+                self.assertIs(inner, outer)
+                inner.execute("INSERT INTO reports (report_text) VALUES ('inner')")
+            # Leaving the inner block must not commit
+            self.assertTrue(outer.in_transaction)
+        self.assertEqual(self._report_count(), 2)
+        
+        with self.assertRaises(ValueError):
+            with models.transaction() as outer:
+                outer.execute("INSERT INTO reports (report_text) VALUES ('outer')")
+                with models.transaction() as inner:
+                    inner.execute("INSERT INTO reports (report_text) VALUES ('inner')")
+                raise ValueError('abort')
+        self.assertEqual(self._report_count(), 2)
+    
+    def test_connection_per_thread(self):
+        """Test each thread gets its own connection and keeps reusing it"""
+        main = models.get_pooled_connection()
+        self.assertIs(models.get_pooled_connection(), main)
+        
+        seen = []
+        def worker():
+            seen.append(models.get_pooled_connection())
+            seen.append(models.get_pooled_connection())
+            models.close_db_connections()
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        
+        self.assertIs(seen[0], seen[1])
+        self.assertIsNot(seen[0], main)
+    
+    def test_connection_per_process(self):
+        """Test a forked worker never reuses the parent's connection"""
+        parent = models.get_pooled_connection()
+        
+        with patch.object(models.os, 'getpid', return_value=os.getpid() + 1):
+            child = models.get_pooled_connection()
+            self.assertIs(models.get_pooled_connection(), child)
+        
+        self.assertIsNot(child, parent)
+        self.assertIs(models.get_pooled_connection(), parent)
+
+if __name__ == '__main__':
+    unittest.main()
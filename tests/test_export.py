@@ -0,0 +1,128 @@
+import unittest
+import os
+import io
+import sys
+import csv
+import gzip
+import json
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from database import models
+from database import export
+from database.export import stream_export, export_snapshot
+from tests import DatabaseTestCase
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+class ExportTestCase(DatabaseTestCase):
+    """Test cases for the streaming bulk export"""
+    
+    def setUp(self):
+        super().setUp()
+        with models.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO reports (report_text, latitude, longitude, timestamp, images) VALUES (?, ?, ?, ?, ?)',
+                [(f'report {i}', 39.768, -86.158, f'2026-01-01 {i:02d}:00:00', '["/secret/path.jpg"]')
+                 for i in range(10)]
+            )
+            conn.execute('INSERT INTO bait_car_logs (latitude, longitude, notification_sent) VALUES (?, ?, ?)',
+                         (39.768, -86.158, True))
+    
+    def _ndjson(self, chunks):
+        return [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+    
+    def test_ndjson_stream_in_batches(self):
+        """Test every row is exported, a batch per chunk, without image paths"""
+        chunks = list(stream_export('reports', 'ndjson', batch_size=3))
+        rows = self._ndjson(chunks)
+        
+        self.assertEqual(len([chunk for chunk in chunks if chunk]), 4)
+        self.assertEqual([row['report_text'] for row in rows], [f'report {i}' for i in range(10)])
+        self.assertNotIn('images', rows[0])
+    
+    def test_time_window(self):
+        """Test since is inclusive and until exclusive"""
+        rows = self._ndjson(stream_export('reports', 'ndjson', since='2026-01-01 03:00:00',
+                                          until='2026-01-01 06:00:00'))
+        self.assertEqual([row['report_text'] for row in rows], ['report 3', 'report 4', 'report 5'])
+    
+    def test_gzip_csv(self):
+        """Test the CSV fallback is one gzip stream with a header"""
+        with patch.object(export, 'pq', None):
+            self.assertEqual(export.columnar_format(), 'csv')
+        data = gzip.decompress(b''.join(stream_export('bait_car_logs', 'csv', batch_size=1)))
+        rows = list(csv.reader(io.StringIO(data.decode())))
+        
+        self.assertEqual(rows[0], ['id', 'latitude', 'longitude', 'notification_sent', 'timestamp'])
+        self.assertEqual(rows[1][:4], ['1', '39.768', '-86.158', '1'])
+    
+    @unittest.skipUnless(pq, 'pyarrow is not installed')
+    def test_parquet_row_group_per_batch(self):
+        """Test Parquet output has typed columns and one row group per batch"""
+        parquet = pq.ParquetFile(io.BytesIO(b''.join(stream_export('reports', 'parquet', batch_size=4))))
+        table = parquet.read()
+        
+        self.assertEqual(parquet.num_row_groups, 3)
+        self.assertEqual(table.num_rows, 10)
+        self.assertEqual(str(table.schema.field('latitude').type), 'double')
+        self.assertEqual(table.column('timestamp')[5].as_py().hour, 5)
+    
+    def test_stream_reads_one_snapshot_without_blocking_writers(self):
+        """Test rows written mid-export neither wait for it nor show up in it"""
+        stream = stream_export('reports', 'ndjson', batch_size=2)
+        chunks = [next(stream)]
+        
+        # The export's read transaction is open; writers still go through
+        models.save_report('late report', [], None, None)
+        chunks.extend(stream)
+        
+        self.assertEqual(len(self._ndjson(chunks)), 10)
+        self.assertEqual(len(self._ndjson(stream_export('reports', 'ndjson'))), 11)
+    
+    def test_snapshot_files(self):
+        """Test the export command's files are complete and no temp files remain"""
+        output_dir = os.path.join(self.tmpdir.name, 'exports')
+        written = export_snapshot(output_dir, formats=('ndjson', 'csv'))
+        
+        self.assertEqual(sorted(rows for _, rows in written), [1, 1, 10, 10])
+        self.assertEqual(len(os.listdir(output_dir)), 4)
+        self.assertFalse(any(name.endswith('.tmp') for name in os.listdir(output_dir)))
+
+class ExportEndpointTestCase(DatabaseTestCase):
+    """Test cases for the /export route"""
+    
+    def setUp(self):
+        super().setUp()
+        self.env_patch = patch.dict(os.environ, {'ADMIN_KEY': 'secret'})
+        self.env_patch.start()
+        self.app = app.test_client()
+        models.save_report('broken window', [], 39.768, -86.158)
+    
+    def tearDown(self):
+        self.env_patch.stop()
+    
+    def test_export_route(self):
+        """Test the route streams an attachment and validates its parameters"""
+        self.assertEqual(self.app.get('/export?table=reports').status_code, 401)
+        self.assertEqual(self.app.get('/export?key=secret&table=users').status_code, 400)
+        self.assertEqual(self.app.get('/export?key=secret&since=yesterday').status_code, 400)
+        
+        response = self.app.get('/export?key=secret&table=reports&since=2000-01-01')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('reports.ndjson', response.headers['Content-Disposition'])
+        self.assertEqual(json.loads(response.get_data(as_text=True))['report_text'], 'broken window')
+        
+        with patch('app.pq', None):
+            self.assertEqual(self.app.get('/export?key=secret&format=parquet').status_code, 400)
+            response = self.app.get('/export?key=secret&format=csv')
+        self.assertIn(b'broken window', gzip.decompress(response.get_data()))
+
+if __name__ == '__main__':
+    unittest.main()
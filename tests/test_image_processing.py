@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+from io import BytesIO
+from unittest.mock import patch
+import numpy as np
+import cv2
+from PIL import Image
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import models
+from utils.cv_models import ModelRegistry, model_registry
+from utils.image_processing import blur_faces, process_image, detect_faces
+from utils.media_store import media_store
+from utils.metrics import metrics
+from tests import DatabaseTestCase
+
+class ModelRegistryTestCase(unittest.TestCase):
+    """Test cases for cached computer-vision models"""
+    
+    def test_model_loaded_once_for_sequential_use(self):
+        """Test repeated checkouts reuse the same loaded model"""
+        registry = ModelRegistry(loaders={'model': object})
+        
+        with registry.checkout('model') as first:
+            pass
+        with registry.checkout('model') as second:
+            pass
+        
+        self.assertIs(first, second)
+        self.assertEqual(registry.loaded_count('model'), 1)
+    
+    def test_concurrent_checkouts_get_separate_instances(self):
+        """Test two threads never share a model instance at the same time"""
+        registry = ModelRegistry(loaders={'model': object})
+        both_checked_out = threading.Barrier(2)
+        seen = []
+        
+        def use_model():
+            with registry.checkout('model') as model:
+                seen.append(model)
+                both_checked_out.wait(timeout=5)
+        
+        threads = [threading.Thread(target=use_model) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertIsNot(seen[0], seen[1])
+        self.assertEqual(registry.loaded_count('model'), 2)
+    
+    def test_blur_faces_uses_warmed_detector(self):
+        """Test blur_faces reuses the warmed detector and records detection time"""
+        model_registry.warm()
+        metrics.reset()
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            image_path = os.path.join(tmpdir, 'photo.jpg')
+            cv2.imwrite(image_path, np.full((120, 160, 3), 128, dtype=np.uint8))
+            
+            self.assertEqual(blur_faces(image_path), image_path)
+        
+        timings = metrics.snapshot()['timings']
+        self.assertEqual(timings['cv.face_cascade.detect_ms']['count'], 1)
+        self.assertNotIn('cv.face_cascade.load_ms', timings)
+
+
+class ProcessImageTestCase(DatabaseTestCase):
+    """Test cases for the single-decode privacy pipeline"""
+    
+    def setUp(self):
+        super().setUp()
+    
+    def _jpeg_with_exif(self, width, height):
+        exif = Image.Exif()
+        exif[0x010F] = 'TestCam'  # Camera make
+        data = BytesIO()
+        Image.fromarray(np.full((height, width, 3), 90, dtype=np.uint8)).save(data, 'JPEG', exif=exif)
+        return data.getvalue()
+    
+    def test_process_image_strips_metadata(self):
+        """Test the saved photo keeps its pixels but loses its EXIF"""
+        jpeg = self._jpeg_with_exif(400, 300)
+        self.assertEqual(Image.open(BytesIO(jpeg)).getexif()[0x010F], 'TestCam')
+        
+        with patch('utils.image_processing.download_image', return_value=BytesIO(jpeg)), \
+                patch.object(media_store, 'root', self.tmpdir.name):
+            output_path = process_image('https://example.com/photo.jpg')
+        
+        saved = Image.open(output_path)
+        self.assertEqual(saved.size, (400, 300))
+        self.assertEqual(dict(saved.getexif()), {})
+    
+    def test_detect_faces_scales_boxes_back(self):
+        """Test boxes found on the downscaled copy map to full-size coordinates"""
+        class FakeCascade:
+            def detectMultiScale(self, gray, scale_factor, min_neighbors):
+                self.shape = gray.shape
+                return [(10, 20, 30, 40)]
+        
+        fake = FakeCascade()
+        registry = ModelRegistry(loaders={'face_cascade': lambda: fake})
+        image = np.zeros((3000, 4000, 3), dtype=np.uint8)
+        
+        with patch('utils.image_processing.model_registry', registry):
+            faces = detect_faces(image, max_dimension=1000)
+        
+        self.assertEqual(fake.shape, (750, 1000))
+        self.assertEqual(faces, [(40, 80, 120, 160)])
@@ -0,0 +1,83 @@
+import unittest
+import os
+import sys
+import time
+import requests
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.stub_server import StubServer
+from utils.media_fetcher import MediaFetcher, MediaTooLargeError
+
+def serve(body, delay=0, headers=None):
+    def route(handler):
+        time.sleep(delay)
+        return 200, headers or {'Content-Type': 'image/jpeg'}, body
+    return route
+
+def serve_chunked(chunks):
+    def write(wfile):
+        for chunk in chunks:
+            wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        wfile.write(b'0\r\n\r\n')
+    
+    def route(handler):
+        return 200, {'Transfer-Encoding': 'chunked'}, write
+    return route
+
+class MediaFetcherTestCase(unittest.TestCase):
+    """Test cases for size-capped, pooled media downloads"""
+    
+    def setUp(self):
+        self.server = StubServer({
+            '/photo.jpg': serve(b'x' * 1000),
+            '/huge.jpg': serve(b'x' * 5000),
+            '/huge-chunked.jpg': serve_chunked([b'x' * 1000] * 5),
+            '/slow.jpg': serve(b'x' * 10, delay=1.0),
+            '/gone.jpg': lambda handler: (404, {}, b'gone'),
+        })
+        for i in range(10):
+            self.server.routes[f'/attachment{i}.jpg'] = serve(bytes([i]) * 100, delay=0.2)
+        self.server.__enter__()
+        self.fetcher = MediaFetcher(max_bytes=2000, connect_timeout=1, read_timeout=0.3)
+    
+    def tearDown(self):
+        self.fetcher.session.close()
+        self.server.__exit__(None, None, None)
+    
+    def test_fetch(self):
+        """Test a normal attachment is returned in full"""
+        self.assertEqual(self.fetcher.fetch(self.server.url + '/photo.jpg'), b'x' * 1000)
+    
+    def test_declared_size_over_cap(self):
+        """Test a Content-Length over the cap is rejected before reading"""
+        with self.assertRaises(MediaTooLargeError):
+            self.fetcher.fetch(self.server.url + '/huge.jpg')
+    
+    def test_streamed_size_over_cap(self):
+        """Test a chunked body is cut off once it passes the cap"""
+        with self.assertRaises(MediaTooLargeError):
+            self.fetcher.fetch(self.server.url + '/huge-chunked.jpg')
+    
+    def test_read_timeout(self):
+        """Test a stalled host times out instead of hanging"""
+        with self.assertRaises(requests.Timeout):
+            self.fetcher.fetch(self.server.url + '/slow.jpg')
+    
+    def test_http_error(self):
+        """Test HTTP errors are raised"""
+        with self.assertRaises(requests.HTTPError):
+            self.fetcher.fetch(self.server.url + '/gone.jpg')
+    
+    def test_fetch_all_is_concurrent_and_ordered(self):
+        """Test ten attachments download in parallel and keep their order"""
+        urls = [f'{self.server.url}/attachment{i}.jpg' for i in range(10)]
+        
+        started = time.perf_counter()
+        bodies = self.fetcher.fetch_all(urls)
+        elapsed = time.perf_counter() - started
+        
+        self.assertEqual(bodies, [bytes([i]) * 100 for i in range(10)])
+        # Sequential downloads would take at least 2 seconds
+        self.assertLess(elapsed, 1.0)
@@ -0,0 +1,323 @@
+import unittest
+import os
+import sys
+import json
+import time
+import threading
+from unittest.mock import patch, MagicMock
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import models
+from database.retention import purge_report_chunk, claim_image_deletes, unlink_image_batch
+from utils.media_pipeline import MediaPipeline
+from utils.media_store import media_store
+from utils.attachment_executor import AttachmentExecutor
+from tests import DatabaseTestCase
+
+def fake_fetcher():
+    """Media fetcher stand-in whose bodies are the URLs' file names"""
+    fetcher = MagicMock()
+    fetcher.fetch_all.side_effect = lambda urls: [url.rsplit('/', 1)[-1].encode() for url in urls]
+    return fetcher
+
+class MediaPipelineTestCase(DatabaseTestCase):
+    """Test cases for background media processing"""
+    
+    def setUp(self):
+        super().setUp()
+        self.pipeline = MediaPipeline(num_workers=2, max_attempts=2, poll_interval=0.05, retry_backoff=0)
+        self.fetcher_patch = patch('utils.media_pipeline.media_fetcher', fake_fetcher())
+        self.fetcher_patch.start()
+    
+    def tearDown(self):
+        self.pipeline.stop()
+        self.fetcher_patch.stop()
+    
+    def _get_report(self, report_id):
+        conn = models.get_db_connection()
+        row = conn.execute('SELECT * FROM reports WHERE id = ?', (report_id,)).fetchone()
+        conn.close()
+        return row
+    
+    def _wait_for_status(self, report_id, status, timeout=5.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            report = self._get_report(report_id)
+            if report['image_status'] == status:
+                return report
+            time.sleep(0.02)
+        self.fail(f"Report {report_id} never reached status {status}")
+    
+    @patch('utils.media_pipeline.process_image_bytes')
+    def test_report_saved_before_processing(self, mock_process):
+        """Test the report is stored as processing before any image work runs"""
+        report_id = self.pipeline.submit_report('broken window', ['https://example.com/a.jpg'], '39.768', '-86.158')
+        
+        report = self._get_report(report_id)
+        self.assertEqual(report['image_status'], 'processing')
+        self.assertEqual(json.loads(report['images']), [])
+        self.assertIsNone(report['processed_at'])
+        mock_process.assert_not_called()
+    
+    @patch('utils.media_pipeline.process_image_bytes')
+    def test_workers_attach_processed_images(self, mock_process):
+        """Test workers process every image and mark the report done"""
+        mock_process.side_effect = lambda body, owner: '/uploads/' + body.decode()
+        
+        self.pipeline.start()
+        report_id = self.pipeline.submit_report(
+            'suspicious van', ['https://example.com/a.jpg', 'https://example.com/b.jpg'], None, None
+        )
+        
+        report = self._wait_for_status(report_id, 'done')
+        self.assertEqual(json.loads(report['images']), ['/uploads/a.jpg', '/uploads/b.jpg'])
+        self.assertIsNotNone(report['processed_at'])
+    
+    @patch('utils.media_pipeline.process_image_bytes')
+    def test_failed_job_is_retried_then_marked_failed(self, mock_process):
+        """Test a job that keeps failing is retried and then given up on"""
+        mock_process.side_effect = IOError('corrupt image')
+        
+        report_id = self.pipeline.submit_report('test', ['https://example.com/a.jpg'], None, None)
+        self.pipeline.run_pending()
+        
+        self._wait_for_status(report_id, 'failed')
+        self.assertGreaterEqual(mock_process.call_count, 2)
+    
+    @patch('utils.media_pipeline.process_image_bytes')
+    def test_failed_job_waits_out_its_backoff(self, mock_process):
+        """Test a retried job can't be claimed again until its backoff has passed"""
+        mock_process.side_effect = IOError('corrupt image')
+        pipeline = MediaPipeline(num_workers=1, max_attempts=3, retry_backoff=600)
+        
+        report_id = pipeline.submit_report('test', ['https://example.com/a.jpg'], None, None)
+        self.assertEqual(pipeline.run_pending(), 1)
+        self.assertIsNone(models.claim_media_job(lease_seconds=300))
+        self.assertEqual(self._get_report(report_id)['image_status'], 'processing')
+        
+        conn = models.get_db_connection()
+        conn.execute("UPDATE media_jobs SET not_before = datetime('now', '-1 second')")
+        conn.commit()
+        conn.close()
+        
+        self.assertEqual(pipeline.run_pending(), 1)
+        self.assertEqual(mock_process.call_count, 2)
+    
+    @patch('utils.media_pipeline.process_image_bytes')
+    def test_expired_lease_is_reclaimed(self, mock_process):
+        """Test a job claimed by a worker that died is picked up again"""
+        mock_process.return_value = '/uploads/a.jpg'
+        
+        report_id = self.pipeline.submit_report('test', ['https://example.com/a.jpg'], None, None)
+        
+        # Simulate a worker that claimed the job and then crashed
+        self.assertIsNotNone(models.claim_media_job(lease_seconds=300))
+        self.assertIsNone(models.claim_media_job(lease_seconds=300))
+        
+        conn = models.get_db_connection()
+        conn.execute("UPDATE media_jobs SET claimed_at = datetime('now', '-10 minutes')")
+        conn.commit()
+        conn.close()
+        
+        self.pipeline.run_pending()
+        self._wait_for_status(report_id, 'done')
+    
+    def _expire_leases(self):
+        with models.transaction() as conn:
+            conn.execute("UPDATE media_jobs SET claimed_at = '2000-01-01 00:00:00'")
+    
+    def test_stale_worker_cannot_fail_reclaimed_job(self):
+        """Test a worker whose lease ran out can't requeue or fail the job another worker holds"""
+        report_id = self.pipeline.submit_report('test', ['https://example.com/a.jpg'], None, None)
+        stale = models.claim_media_job(lease_seconds=60, max_attempts=3)
+        self._expire_leases()
+        current = models.claim_media_job(lease_seconds=60, max_attempts=3)
+        
+        self.assertFalse(models.fail_media_job(stale['id'], report_id, 'timeout', stale['attempts'], retry=True))
+        self.assertFalse(models.fail_media_job(stale['id'], report_id, 'timeout', stale['attempts'], retry=False))
+        
+        self.assertEqual(self._get_report(report_id)['image_status'], 'processing')
+        self.assertTrue(models.complete_media_job(current['id'], report_id, [], current['attempts']))
+        self.assertEqual(self._get_report(report_id)['image_status'], 'done')
+    
+    def test_expired_last_attempt_is_not_reclaimed(self):
+        """Test a job whose final attempt's lease ran out is failed instead of run again"""
+        report_id = self.pipeline.submit_report('test', ['https://example.com/a.jpg'], None, None)
+        self.assertIsNotNone(models.claim_media_job(lease_seconds=60, max_attempts=1))
+        self._expire_leases()
+        
+        self.assertIsNone(models.claim_media_job(lease_seconds=60, max_attempts=1))
+        self.assertEqual(self._get_report(report_id)['image_status'], 'failed')
+    
+    @patch('utils.media_pipeline.process_image_bytes')
+    def test_attachment_order_is_preserved(self, mock_process):
+        """Test images finishing out of order are still saved in arrival order"""
+        def process(body, owner):
+            # Earlier attachments take longer
+            time.sleep(0.01 * (10 - int(body.decode().split('.')[0])))
+            return '/uploads/' + body.decode()
+        mock_process.side_effect = process
+        
+        urls = [f'https://example.com/{i}.jpg' for i in range(10)]
+        report_id = self.pipeline.submit_report('many photos', urls, None, None)
+        self.pipeline.run_pending()
+        
+        report = self._wait_for_status(report_id, 'done')
+        self.assertEqual(json.loads(report['images']), [f'/uploads/{i}.jpg' for i in range(10)])
+    
+    @patch('utils.media_pipeline.process_image_bytes')
+    def test_partial_failure_cleans_up(self, mock_process):
+        """Test processed images are removed when another attachment fails"""
+        written = []
+        
+        def process(body, owner):
+            if body == b'bad.jpg':
+                raise ValueError('Could not decode image')
+            written.append(media_store.put(body, owner=owner))
+            return written[-1]
+        mock_process.side_effect = process
+        
+        report_id = self.pipeline.submit_report(
+            'test', ['https://example.com/ok.jpg', 'https://example.com/bad.jpg'], None, None
+        )
+        with patch.object(media_store, 'root', os.path.join(self.tmpdir.name, 'uploads')):
+            self.pipeline.run_pending()
+        
+        self._wait_for_status(report_id, 'failed')
+        self.assertEqual(len(written), 2)
+        self.assertFalse(os.path.exists(written[0]))
+        self.assertEqual(self._blob_count(), 0)
+    
+    def _blob_count(self):
+        return models.get_pooled_connection().execute('SELECT COUNT(*) FROM media_blobs').fetchone()[0]
+    
+    @patch('utils.media_pipeline.process_image_bytes')
+    def test_report_purged_mid_job_releases_images(self, mock_process):
+        """Test images of a report purged while its job runs are not left behind"""
+        report_id = self.pipeline.submit_report('test', ['https://example.com/a.jpg'], None, None)
+        stored = []
+        
+        def process(body, owner):
+            stored.append(media_store.put(body, owner=owner))
+            # Retention purges the report before the job finishes
+            purge_report_chunk([report_id], '9999-01-01 00:00:00')
+            return stored[-1]
+        mock_process.side_effect = process
+        
+        with patch.object(media_store, 'root', os.path.join(self.tmpdir.name, 'uploads')):
+            self.pipeline.run_pending()
+        unlink_image_batch(claim_image_deletes(100))
+        
+        self.assertEqual(self._blob_count(), 0)
+        self.assertFalse(os.path.exists(stored[0]))
+    
+    @patch('utils.media_pipeline.process_image_bytes')
+    def test_worker_dying_between_put_and_complete(self, mock_process):
+        """Test a dead attempt's references are released on reclaim, so purging frees the file"""
+        mock_process.side_effect = lambda body, owner: media_store.put(body, owner=owner)
+        report_id = self.pipeline.submit_report('test', ['https://example.com/a.jpg'], None, None)
+        
+        with patch.object(media_store, 'root', os.path.join(self.tmpdir.name, 'uploads')):
+            # A worker stores the image, then dies before attaching it
+            dead = models.claim_media_job(lease_seconds=60)
+            path = media_store.put(b'a.jpg', owner=(dead['id'], dead['attempts']))
+            with models.transaction() as conn:
+                conn.execute("UPDATE media_jobs SET claimed_at = '2000-01-01 00:00:00'")
+            
+            self.pipeline.run_pending()
+            self.assertEqual(json.loads(self._wait_for_status(report_id, 'done')['images']), [path])
+            unlink_image_batch(claim_image_deletes(100))
+            self.assertTrue(os.path.exists(path))
+            
+            purge_report_chunk([report_id], '9999-01-01 00:00:00')
+            unlink_image_batch(claim_image_deletes(100))
+        
+        self.assertEqual(self._blob_count(), 0)
+        self.assertFalse(os.path.exists(path))
+    
+    def test_purge_releases_dead_attempt(self):
+        """Test purging a report frees images its never-reclaimed job stored"""
+        report_id = self.pipeline.submit_report('test', ['https://example.com/a.jpg'], None, None)
+        
+        with patch.object(media_store, 'root', os.path.join(self.tmpdir.name, 'uploads')):
+            dead = models.claim_media_job(lease_seconds=60)
+            path = media_store.put(b'a.jpg', owner=(dead['id'], dead['attempts']))
+            
+            purge_report_chunk([report_id], '9999-01-01 00:00:00')
+            unlink_image_batch(claim_image_deletes(100))
+        
+        self.assertEqual(self._blob_count(), 0)
+        self.assertFalse(os.path.exists(path))
+    
+    @patch('utils.media_pipeline.process_image_bytes')
+    def test_reclaimed_job_finished_once(self, mock_process):
+        """Test a worker whose lease ran out does not attach (or leak) its images"""
+        report_id = self.pipeline.submit_report('test', ['https://example.com/a.jpg'], None, None)
+        stale_job = models.claim_media_job(lease_seconds=60)
+        mock_process.side_effect = media_store.put
+        
+        with patch.object(media_store, 'root', os.path.join(self.tmpdir.name, 'uploads')):
+            # The lease runs out and another worker finishes the job
+            with models.transaction() as conn:
+                conn.execute("UPDATE media_jobs SET claimed_at = '2000-01-01 00:00:00'")
+            self.pipeline.run_pending()
+            # Then the first worker finishes too
+            self.pipeline._run_job(stale_job)
+        
+        report = self._get_report(report_id)
+        self.assertEqual(len(json.loads(report['images'])), 1)
+        self.assertEqual(self._blob_count(), 1)
+        refcount = models.get_pooled_connection().execute('SELECT refcount FROM media_blobs').fetchone()[0]
+        self.assertEqual(refcount, 1)
+
+
+class AttachmentExecutorTestCase(unittest.TestCase):
+    """Test cases for the bounded attachment executor"""
+    
+    def _track_concurrency(self, executor, calls, items_per_call):
+        running = [0]
+        peak = [0]
+        lock = threading.Lock()
+        
+        def work(item):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return item
+        
+        threads = [
+            threading.Thread(target=executor.map, args=(work, list(range(items_per_call))))
+            for _ in range(calls)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return peak[0]
+    
+    def test_per_report_limit(self):
+        """Test one report never runs more than its share at once"""
+        executor = AttachmentExecutor(kind='thread', max_workers=8, max_in_flight=8, per_call_limit=3)
+        self.assertEqual(self._track_concurrency(executor, calls=1, items_per_call=10), 3)
+        executor.shutdown()
+    
+    def test_global_limit(self):
+        """Test concurrent reports together stay under the process-wide cap"""
+        executor = AttachmentExecutor(kind='thread', max_workers=8, max_in_flight=4, per_call_limit=3)
+        self.assertLessEqual(self._track_concurrency(executor, calls=4, items_per_call=6), 4)
+        executor.shutdown()
+    
+    def test_process_pool_preserves_order_and_errors(self):
+        """Test the process pool returns results and exceptions in item order"""
+        executor = AttachmentExecutor(kind='process', max_workers=2, max_in_flight=4, per_call_limit=4)
+        results = executor.map(int, ['1', 'x', '3'])
+        executor.shutdown()
+        
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], 3)
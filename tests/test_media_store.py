@@ -0,0 +1,103 @@
+import unittest
+import os
+import sys
+import json
+import hashlib
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import models
+from database.retention import RetentionEngine
+from utils.media_store import MediaStore
+from tests import DatabaseTestCase
+
+class MediaStoreTestCase(DatabaseTestCase):
+    """Test cases for the content-addressed media store"""
+    
+    def setUp(self):
+        super().setUp()
+        self.root = os.path.join(self.tmpdir.name, 'uploads')
+        self.store = MediaStore(self.root)
+    
+    def _refcount(self, path):
+        row = models.get_pooled_connection().execute(
+            'SELECT refcount FROM media_blobs WHERE path = ?', (path,)
+        ).fetchone()
+        return row['refcount'] if row else 0
+    
+    def _stored_files(self):
+        return [os.path.join(directory, name) for directory, _, names in os.walk(self.root) for name in names]
+    
+    def _add_report(self, image_paths, age_hours):
+        timestamp = (datetime.now(timezone.utc) - timedelta(hours=age_hours)).strftime('%Y-%m-%d %H:%M:%S')
+        with models.transaction() as conn:
+            conn.execute('INSERT INTO reports (report_text, timestamp, images) VALUES (?, ?, ?)',
+                         ('test', timestamp, json.dumps(image_paths)))
+    
+    def test_identical_bytes_stored_once(self):
+        """Test a resent photo reuses the sharded file and adds a reference"""
+        digest = hashlib.sha256(b'photo').hexdigest()
+        
+        first = self.store.put(b'photo')
+        second = self.store.put(b'photo')
+        
+        self.assertEqual(first, second)
+        self.assertEqual(first, os.path.join(self.root, digest[:2], digest[2:4], digest + '.jpg'))
+        self.assertEqual(self._stored_files(), [first])
+        self.assertEqual(self._refcount(first), 2)
+        with open(first, 'rb') as f:
+            self.assertEqual(f.read(), b'photo')
+    
+    def test_discard_keeps_shared_files(self):
+        """Test a file is deleted only when its last reference goes"""
+        path = self.store.put(b'photo')
+        self.store.put(b'photo')
+        
+        self.assertEqual(self.store.discard([path]), 0)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.store.discard([path]), 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self._refcount(path), 0)
+    
+    def test_failed_write_leaves_nothing_behind(self):
+        """Test an interrupted write leaves neither the file nor a temp file"""
+        with patch('utils.media_store.os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.store.put(b'photo')
+        
+        self.assertEqual(self._stored_files(), [])
+        self.assertEqual(self._refcount(self.store.path_for(hashlib.sha256(b'photo').hexdigest())), 0)
+    
+    def test_retention_unlinks_only_unreferenced_blobs(self):
+        """Test purging a report keeps files a newer report still uses"""
+        shared = self.store.put(b'shared')
+        only_old = self.store.put(b'only old')
+        self._add_report([shared, only_old], age_hours=49)
+        self._add_report([self.store.put(b'shared')], age_hours=1)
+        engine = RetentionEngine(retention_hours=48, pause_ms=0)
+        
+        self.assertEqual(engine.purge().deleted, 1)
+        engine.delete_pending_images()
+        
+        self.assertTrue(os.path.exists(shared))
+        self.assertFalse(os.path.exists(only_old))
+        self.assertEqual(self._refcount(shared), 1)
+    
+    def test_queued_delete_skips_restored_blob(self):
+        """Test a file stored again after it was queued for deletion is kept"""
+        path = self.store.put(b'photo')
+        self._add_report([path], age_hours=49)
+        engine = RetentionEngine(retention_hours=48, pause_ms=0)
+        engine.purge()
+        
+        # The same photo arrives again before the deleter runs
+        self.assertEqual(self.store.put(b'photo'), path)
+        engine.delete_pending_images()
+        
+        self.assertTrue(os.path.exists(path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import os
+import sys
+import time
+from unittest.mock import patch, MagicMock
+import redis
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+from app import app, twiml_cache, THROTTLED_REPLY
+from utils.rate_limiter import RateLimiter
+from utils.redis_manager import RedisManager
+from utils.metrics import metrics
+
+LIMITS = {'call': (3, 600), 'report': (5, 3600), 'lookup': (30, 60)}
+
+@unittest.skipUnless(fakeredis, 'fakeredis is not installed')
+class RedisRateLimitTestCase(unittest.TestCase):
+    """Test cases for the Redis token bucket"""
+    
+    def setUp(self):
+        self.fake = fakeredis.FakeRedis()
+        self.manager = RedisManager(redis_client=self.fake)
+    
+    def test_bucket_empties_and_refills(self):
+        """Test a burst is allowed, then refilled at the configured rate"""
+        now = time.time()
+        taken = [self.manager.take_tokens('call', '+13175551234', 3, 600, now=now) for _ in range(4)]
+        self.assertEqual(taken, [True, True, True, False])
+        
+        # One token comes back every 200 seconds
+        self.assertFalse(self.manager.take_tokens('call', '+13175551234', 3, 600, now=now + 100))
+        self.assertTrue(self.manager.take_tokens('call', '+13175551234', 3, 600, now=now + 300))
+    
+    def test_keys_are_hashed_and_expire(self):
+        """Test buckets are keyed on the hashed number and expire"""
+        self.manager.take_tokens('report', '+1 (317) 555-1234', 5, 3600, cost=2)
+        
+        keys = [key.decode() for key in self.fake.keys('ratelimit:*')]
+        self.assertEqual(keys, ['ratelimit:report:' + self.manager._hash_phone_number('+13175551234')])
+        self.assertGreater(self.fake.pttl(keys[0]), 0)
+    
+    def test_budgets_are_per_class(self):
+        """Test spending one class doesn't touch another"""
+        limiter = RateLimiter(self.manager, LIMITS)
+        for _ in range(3):
+            self.assertTrue(limiter.allow('+13175551234', 'call'))
+        
+        self.assertFalse(limiter.allow('+13175551234', 'call'))
+        self.assertTrue(limiter.allow('+13175551234', 'lookup'))
+        self.assertTrue(limiter.allow('+13175559999', 'call'))
+        self.assertTrue(limiter.allow('+13175551234', 'unlimited'))
+
+class RateLimiterFallbackTestCase(unittest.TestCase):
+    """Test cases for limiting without Redis"""
+    
+    def setUp(self):
+        metrics.reset()
+    
+    def test_falls_back_to_local_buckets(self):
+        """Test a Redis outage switches to in-process buckets"""
+        manager = MagicMock()
+        manager.take_tokens.side_effect = redis.ConnectionError('down')
+        limiter = RateLimiter(manager, LIMITS)
+        
+        results = [limiter.allow('+13175551234', 'call') for _ in range(4)]
+        
+        self.assertEqual(results, [True, True, True, False])
+        # Redis is not retried on every request while it is down
+        self.assertEqual(manager.take_tokens.call_count, 1)
+        self.assertEqual(metrics.snapshot()['counters']['rate_limit.local_checks'], 4)
+        self.assertEqual(metrics.snapshot()['counters']['rate_limit.throttled.call'], 1)
+    
+    def test_oversized_cost_drains_bucket(self):
+        """Test a request costing more than the burst passes once"""
+        limiter = RateLimiter(None, LIMITS)
+        
+        self.assertTrue(limiter.allow('+13175551234', 'report', cost=10))
+        self.assertFalse(limiter.allow('+13175551234', 'report', cost=1))
+    
+    def test_throttled_report_skips_media(self):
+        """Test an over-budget report is rejected before its photos are queued"""
+        limiter = RateLimiter(None, LIMITS)
+        data = {
+            'Body': 'report car break-in', 'From': '+13175551234', 'NumMedia': '3',
+            'MediaUrl0': 'https://example.com/0.jpg', 'MediaContentType0': 'image/jpeg',
+            'MediaUrl1': 'https://example.com/1.jpg', 'MediaContentType1': 'image/jpeg',
+            'MediaUrl2': 'https://example.com/2.jpg', 'MediaContentType2': 'image/jpeg'
+        }
+        client = app.test_client()
+        
+        with patch('app.rate_limiter', limiter), patch('app.media_pipeline') as mock_pipeline:
+            mock_pipeline.submit_report.return_value = 'abc123'
+            first = client.post('/sms', data=data)
+            second = client.post('/sms', data=data)
+        
+        self.assertIn(b'abc123', first.data)
+        self.assertEqual(second.data, twiml_cache.message(THROTTLED_REPLY))
+        mock_pipeline.submit_report.assert_called_once()
+    
+    @patch('app.check_stolen_status', return_value={'is_stolen': False})
+    @patch('app.extract_vin', return_value="1HGCM82633A004352")
+    def test_multi_photo_check_vin_costs_one(self, mock_extract, mock_check):
+        """Test a check vin with several photos spends one lookup, not one per photo"""
+        limiter = RateLimiter(None, {'lookup': (2, 3600)})
+        data = {
+            'Body': 'check vin', 'From': '+13175551234', 'NumMedia': '3',
+            'MediaUrl0': 'https://example.com/0.jpg', 'MediaContentType0': 'image/jpeg',
+            'MediaUrl1': 'https://example.com/1.jpg', 'MediaContentType1': 'image/jpeg',
+            'MediaUrl2': 'https://example.com/2.jpg', 'MediaContentType2': 'image/jpeg'
+        }
+        client = app.test_client()
+        
+        with patch('app.rate_limiter', limiter):
+            replies = [client.post('/sms', data=data).data for _ in range(3)]
+        
+        self.assertNotEqual(replies[1], twiml_cache.message(THROTTLED_REPLY))
+        self.assertEqual(replies[2], twiml_cache.message(THROTTLED_REPLY))
+        self.assertEqual(mock_check.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+import time
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+from utils.redis_manager import RedisManager, USER_LOCATIONS_KEY, USER_LOCATION_EXPIRY_KEY
+
+@unittest.skipUnless(fakeredis, 'fakeredis is not installed')
+class RedisManagerTestCase(unittest.TestCase):
+    """Test cases for the Redis location index"""
+    
+    def setUp(self):
+        self.manager = RedisManager(redis_client=fakeredis.FakeRedis())
+    
+    def test_users_in_area(self):
+        """Test only users inside the radius are returned, as hashes"""
+        # Monument Circle and White River State Park are about 0.9 miles apart
+        self.manager.cache_user_location('+1 (317) 555-1234', 39.768, -86.158)
+        self.manager.cache_user_location('+13175559999', 39.764, -86.173)
+        
+        users = self.manager.get_users_in_area(39.768, -86.158, radius_miles=0.5)
+        
+        self.assertEqual(users, [self.manager._hash_phone_number('+13175551234')])
+        self.assertEqual(len(self.manager.get_users_in_area(39.768, -86.158, radius_miles=2)), 2)
+    
+    def test_expired_users_are_filtered(self):
+        """Test users past their TTL are not returned even before eviction"""
+        self.manager.cache_user_location('+13175551234', 39.768, -86.158, ttl=60)
+        
+        with patch('utils.redis_manager.time.time', return_value=time.time() + 120):
+            self.assertEqual(self.manager.get_users_in_area(39.768, -86.158), [])
+    
+    def test_evict_stale_locations(self):
+        """Test eviction removes only expired users, in batches"""
+        for i in range(25):
+            self.manager.cache_user_location(f'+1317555{i:04d}', 39.768, -86.158, ttl=10)
+        self.manager.cache_user_location('+13175559999', 39.768, -86.158, ttl=3600)
+        
+        evicted = self.manager.evict_stale_locations(batch_size=10, now=time.time() + 60)
+        
+        self.assertEqual(evicted, 25)
+        self.assertEqual(self.manager.redis.zcard(USER_LOCATIONS_KEY), 1)
+        self.assertEqual(self.manager.redis.zcard(USER_LOCATION_EXPIRY_KEY), 1)
+    
+    def test_cache_user_locations_batch(self):
+        """Test a batch larger than one pipeline chunk is fully written"""
+        updates = [(f'+1317555{i:04d}', 39.768, -86.158) for i in range(250)]
+        
+        written = self.manager.cache_user_locations(updates, chunk_size=100)
+        
+        self.assertEqual(written, 250)
+        self.assertEqual(self.manager.redis.zcard(USER_LOCATIONS_KEY), 250)
+        self.assertEqual(self.manager.redis.zcard(USER_LOCATION_EXPIRY_KEY), 250)
+        self.assertEqual(len(self.manager.redis.keys('user:location:*')), 250)
+    
+    def test_hash_phone_number_ignores_formatting(self):
+        """Test formatted and bare numbers hash the same"""
+        self.assertEqual(
+            self.manager._hash_phone_number('+1 (317) 555-1234'),
+            self.manager._hash_phone_number('13175551234')
+        )
@@ -0,0 +1,187 @@
+import unittest
+import os
+import sys
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from database import models
+from database.report_queries import iter_reports_near, reports_near, report_hotspots
+from utils.spatial_index import haversine_miles
+from tests import DatabaseTestCase
+
+# Monument Circle, Indianapolis
+CENTER = (39.768, -86.158)
+
+class ReportQueriesTestCase(DatabaseTestCase):
+    """Test cases for the spatial report query API"""
+    
+    def setUp(self):
+        super().setUp()
+        self.now = datetime.now(timezone.utc)
+    
+    def _add_report(self, lat, lon, age_hours=1):
+        timestamp = (self.now - timedelta(hours=age_hours)).strftime('%Y-%m-%d %H:%M:%S')
+        with models.transaction() as conn:
+            return conn.execute(
+                'INSERT INTO reports (report_text, latitude, longitude, timestamp, images) VALUES (?, ?, ?, ?, ?)',
+                ('test', lat, lon, timestamp, '[]')
+            ).lastrowid
+    
+    def _indexed_ids(self):
+        rows = models.get_pooled_connection().execute('SELECT id FROM reports_rtree ORDER BY id').fetchall()
+        return [row['id'] for row in rows]
+    
+    def _grid(self):
+        """Reports every 0.005 degrees around the center, 1 and 30 hours old"""
+        ids = []
+        for i in range(-10, 11):
+            for j in range(-10, 11):
+                for age in (1, 30):
+                    ids.append(self._add_report(CENTER[0] + i * 0.005, CENTER[1] + j * 0.005, age))
+        return ids
+    
+    def test_index_follows_inserts_updates_and_deletes(self):
+        """Test the triggers keep reports_rtree in sync with reports"""
+        located = self._add_report(*CENTER)
+        self._add_report(None, None)
+        self.assertEqual(self._indexed_ids(), [located])
+        
+        with models.transaction() as conn:
+            conn.execute('UPDATE reports SET latitude = 40.0 WHERE id = ?', (located,))
+        self.assertEqual(len(list(iter_reports_near(*CENTER, 1, 48))), 0)
+        self.assertEqual(len(list(iter_reports_near(40.0, CENTER[1], 1, 48))), 1)
+        
+        with models.transaction() as conn:
+            conn.execute('DELETE FROM reports WHERE id = ?', (located,))
+        self.assertEqual(self._indexed_ids(), [])
+    
+    def test_existing_reports_are_backfilled(self):
+        """Test create_tables indexes reports stored before the index existed"""
+        report_id = self._add_report(*CENTER)
+        with models.transaction() as conn:
+            conn.execute('DELETE FROM reports_rtree')
+        
+        models.create_tables()
+        
+        self.assertEqual(self._indexed_ids(), [report_id])
+    
+    def test_radius_and_time_window_match_a_scan(self):
+        """Test the indexed query returns exactly what a full scan would"""
+        self._grid()
+        rows = models.get_pooled_connection().execute('SELECT * FROM reports').fetchall()
+        cutoff = (self.now - timedelta(hours=24)).strftime('%Y-%m-%d %H:%M:%S')
+        expected = {
+            row['id'] for row in rows
+            if row['timestamp'] >= cutoff
+            and haversine_miles(*CENTER, row['latitude'], row['longitude']) <= 1.5
+        }
+        
+        found = list(iter_reports_near(*CENTER, 1.5, 24, now=self.now, batch_size=7))
+        
+        self.assertEqual({report['id'] for report in found}, expected)
+        self.assertEqual([report['id'] for report in found], sorted(expected, reverse=True))
+        self.assertTrue(all(report['distance_miles'] <= 1.5 for report in found))
+        self.assertNotIn('images', found[0])
+    
+    def test_pages_cover_every_match_once(self):
+        """Test following the before cursor walks through all matches"""
+        self._grid()
+        everything = [report['id'] for report in iter_reports_near(*CENTER, 1, 48, now=self.now)]
+        
+        seen = []
+        before = None
+        while True:
+            page, before = reports_near(*CENTER, 1, 48, limit=10, before_id=before, now=self.now)
+            seen.extend(report['id'] for report in page)
+            if before is None:
+                break
+        
+        self.assertEqual(seen, everything)
+    
+    def test_queries_are_bounded(self):
+        """Test every candidate query carries a LIMIT, so SQLite never sorts all matches"""
+        self._grid()
+        statements = []
+        conn = models.get_pooled_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            page, _ = reports_near(*CENTER, 1, 48, limit=10, now=self.now)
+            streamed = list(iter_reports_near(*CENTER, 1, 48, now=self.now, batch_size=50))
+        finally:
+            conn.set_trace_callback(None)
+        
+        queries = [sql for sql in statements if 'reports_rtree' in sql]
+        self.assertEqual(len(page), 10)
+        self.assertGreater(len(streamed), 50)
+        self.assertTrue(queries)
+        self.assertTrue(all('LIMIT' in sql for sql in queries))
+    
+    def test_hotspots_count_reports_per_cell(self):
+        """Test grid cells are counted in SQL, busiest first"""
+        for _ in range(3):
+            self._add_report(39.7705, -86.1555)
+        self._add_report(39.7805, -86.1555)
+        self._add_report(39.7805, -86.1555, age_hours=30)
+        
+        cells = report_hotspots(39.76, 39.79, -86.16, -86.15, 24, cell_degrees=0.01, now=self.now)
+        
+        self.assertEqual(cells, [
+            {'latitude': 39.775, 'longitude': -86.155, 'count': 3},
+            {'latitude': 39.785, 'longitude': -86.155, 'count': 1},
+        ])
+
+class ReportQueryEndpointTestCase(DatabaseTestCase):
+    """Test cases for the report query routes"""
+    
+    def setUp(self):
+        super().setUp()
+        self.env_patch = patch.dict(os.environ, {'ADMIN_KEY': 'secret'})
+        self.env_patch.start()
+        self.app = app.test_client()
+        with models.transaction() as conn:
+            conn.executemany('INSERT INTO reports (report_text, latitude, longitude, images) VALUES (?, ?, ?, ?)',
+                             [(f'report {i}', CENTER[0] + i * 0.001, CENTER[1], '[]') for i in range(5)])
+    
+    def tearDown(self):
+        self.env_patch.stop()
+    
+    def test_requires_admin_key(self):
+        """Test the routes reject missing or wrong keys, and any key while ADMIN_KEY is unset"""
+        self.assertEqual(self.app.get('/reports/near?lat=39.768&lon=-86.158').status_code, 401)
+        self.assertEqual(self.app.get('/reports/near?lat=39.768&lon=-86.158&key=wrong').status_code, 401)
+        with patch.dict(os.environ, {'ADMIN_KEY': ''}):
+            self.assertEqual(self.app.get('/reports/hotspots?lat=39.768&lon=-86.158&key=').status_code, 401)
+    
+    def test_paginated_and_streamed_results(self):
+        """Test pages with a cursor and the NDJSON stream return the same reports"""
+        response = self.app.get('/reports/near?key=secret&lat=39.768&lon=-86.158&radius=1&limit=3')
+        first = response.get_json()
+        self.assertEqual(len(first['reports']), 3)
+        second = self.app.get(
+            f"/reports/near?key=secret&lat=39.768&lon=-86.158&radius=1&limit=3&before={first['before']}"
+        ).get_json()
+        self.assertIsNone(second['before'])
+        
+        response = self.app.get('/reports/near?key=secret&lat=39.768&lon=-86.158&radius=1&stream=1')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        streamed = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(streamed, first['reports'] + second['reports'])
+    
+    def test_hotspots_and_bad_parameters(self):
+        """Test hotspot counts and 400s for malformed queries"""
+        response = self.app.get('/reports/hotspots?key=secret&lat=39.768&lon=-86.158&radius=2&cell=1')
+        self.assertEqual([cell['count'] for cell in response.get_json()['cells']], [5])
+        
+        self.assertEqual(self.app.get('/reports/near?key=secret&lat=north&lon=-86.158').status_code, 400)
+        self.assertEqual(self.app.get('/reports/hotspots?key=secret&south=39').status_code, 400)
+        for limit in ('0', '-1', 'ten'):
+            self.assertEqual(self.app.get(f'/reports/near?key=secret&lat=39.768&lon=-86.158&limit={limit}').status_code, 400)
+            self.assertEqual(self.app.get(f'/reports/hotspots?key=secret&lat=39.768&lon=-86.158&limit={limit}').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import os
+import sys
+import json
+import time
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import models
+from database.retention import RetentionEngine
+from tests import DatabaseTestCase
+
+class RetentionTestCase(DatabaseTestCase):
+    """Test cases for the chunked retention purge"""
+    
+    def setUp(self):
+        super().setUp()
+        self.engine = RetentionEngine(retention_hours=48, chunk_size=3, pause_ms=0)
+    
+    def _add_report(self, age_hours, num_images=1):
+        paths = []
+        for _ in range(num_images):
+            fd, path = tempfile.mkstemp(suffix='.jpg', dir=self.tmpdir.name)
+            os.close(fd)
+            paths.append(path)
+        timestamp = (datetime.now(timezone.utc) - timedelta(hours=age_hours)).strftime('%Y-%m-%d %H:%M:%S')
+        with models.transaction() as conn:
+            cursor = conn.execute(
+                'INSERT INTO reports (report_text, timestamp, images) VALUES (?, ?, ?)',
+                ('test', timestamp, json.dumps(paths))
+            )
+            conn.execute('INSERT INTO media_jobs (report_id, media_urls) VALUES (?, ?)', (cursor.lastrowid, '[]'))
+        return cursor.lastrowid, paths
+    
+    def _count(self, table):
+        return models.get_pooled_connection().execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    
+    def test_purges_expired_reports_in_chunks(self):
+        """Test only expired reports are deleted, a chunk at a time"""
+        expired = [self._add_report(49, num_images=2) for _ in range(10)]
+        fresh_id, fresh_paths = self._add_report(47)
+        
+        self.assertEqual(self.engine.backlog(), 10)
+        stats = self.engine.purge()
+        
+        self.assertEqual((stats.deleted, stats.chunks), (10, 4))
+        self.assertGreater(stats.max_lock_ms, 0)
+        self.assertEqual(self._count('reports'), 1)
+        self.assertEqual(self._count('media_jobs'), 1)
+        self.assertEqual(self.engine.backlog(), 0)
+        
+        # Files are queued, then unlinked separately
+        self.assertEqual(self._count('pending_image_deletes'), 20)
+        self.assertEqual(self.engine.delete_pending_images(), 20)
+        self.assertFalse(any(os.path.exists(path) for _, paths in expired for path in paths))
+        self.assertTrue(os.path.exists(fresh_paths[0]))
+        self.assertEqual(self._count('pending_image_deletes'), 0)
+    
+    def test_max_chunks_bounds_a_run(self):
+        """Test a run can be limited to a few chunks"""
+        for _ in range(10):
+            self._add_report(49)
+        
+        stats = self.engine.purge(max_chunks=2)
+        
+        self.assertEqual(stats.deleted, 6)
+        self.assertEqual(self.engine.backlog(), 4)
+    
+    def test_failed_chunk_rolls_back(self):
+        """Test a crash mid-chunk leaves reports and files untouched"""
+        report_id, paths = self._add_report(49)
+        
+        # Fail after the chunk's rows are read, inside the transaction
+        with patch('database.retention.json.loads', side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                self.engine.purge()
+        
+        self.assertEqual(self._count('reports'), 1)
+        self.assertEqual(self._count('pending_image_deletes'), 0)
+        self.assertTrue(os.path.exists(paths[0]))
+        
+        # Running again finishes the job
+        self.assertEqual(self.engine.purge().deleted, 1)
+    
+    def test_queued_deletes_survive_restart(self):
+        """Test files queued before a crash are deleted by the next deleter"""
+        _, paths = self._add_report(49, num_images=3)
+        self.engine.purge()
+        
+        # A new engine (as after a restart) finds the queued deletions
+        engine = RetentionEngine(chunk_size=3, pause_ms=0)
+        engine.start_image_deleter(poll_interval=0.05)
+        self.addCleanup(engine.stop_image_deleter)
+        
+        deadline = time.time() + 5
+        while any(os.path.exists(path) for path in paths) and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+if __name__ == '__main__':
+    unittest.main()
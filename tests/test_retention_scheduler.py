@@ -0,0 +1,121 @@
+import unittest
+import os
+import sys
+import json
+import time
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+from database import models
+from database.retention import RetentionEngine
+from utils.retention_scheduler import FileLeaderLock, RedisLeaderLock, RetentionScheduler
+from utils.metrics import metrics
+from tests import DatabaseTestCase
+
+class LeaderLockTestCase(unittest.TestCase):
+    """Test cases for retention leader election"""
+    
+    def test_file_lock_has_one_holder(self):
+        """Test only one holder of the lock file is leader"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'retention.lock')
+            first, second = FileLeaderLock(path), FileLeaderLock(path)
+            
+            self.assertTrue(first.acquire())
+            self.assertFalse(second.acquire())
+            self.assertTrue(first.acquire())
+            
+            first.release()
+            self.assertTrue(second.acquire())
+            second.release()
+    
+    @unittest.skipUnless(fakeredis, 'fakeredis is not installed')
+    def test_redis_lock_renews_and_expires(self):
+        """Test the Redis lock is renewed by its holder and taken over once it expires"""
+        client = fakeredis.FakeRedis()
+        first, second = RedisLeaderLock(client, ttl=0.2), RedisLeaderLock(client, ttl=0.2)
+        
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        self.assertTrue(first.acquire())
+        
+        # The leader stops renewing
+        time.sleep(0.3)
+        self.assertTrue(second.acquire())
+        self.assertFalse(first.acquire())
+        
+        # Releasing someone else's lock is a no-op
+        first.release()
+        self.assertFalse(first.acquire())
+        second.release()
+        self.assertTrue(first.acquire())
+
+class RetentionSchedulerTestCase(DatabaseTestCase):
+    """Test cases for continuous retention ticks"""
+    
+    def setUp(self):
+        metrics.reset()
+        super().setUp()
+        self.engine = RetentionEngine(retention_hours=48, chunk_size=2, pause_ms=0)
+    
+    def _add_reports(self, count, age_hours):
+        timestamp = (datetime.now(timezone.utc) - timedelta(hours=age_hours)).strftime('%Y-%m-%d %H:%M:%S')
+        with models.transaction() as conn:
+            conn.executemany('INSERT INTO reports (report_text, timestamp, images) VALUES (?, ?, ?)',
+                             [('test', timestamp, json.dumps([]))] * count)
+    
+    def test_leader_purges_a_bounded_batch(self):
+        """Test a tick purges at most chunks_per_tick chunks and reports backlog and lag"""
+        self._add_reports(10, age_hours=50)
+        lock = MagicMock()
+        lock.acquire.return_value = True
+        scheduler = RetentionScheduler(self.engine, lock, chunks_per_tick=3)
+        
+        stats = scheduler.tick()
+        
+        self.assertEqual(stats.deleted, 6)
+        gauges = metrics.snapshot()['gauges']
+        self.assertEqual(gauges['retention.leader'], 1)
+        self.assertEqual(gauges['retention.backlog'], 4)
+        self.assertAlmostEqual(gauges['retention.lag_seconds'], 2 * 3600, delta=60)
+        
+        scheduler.tick()
+        gauges = metrics.snapshot()['gauges']
+        self.assertEqual(gauges['retention.backlog'], 0)
+        self.assertEqual(gauges['retention.lag_seconds'], 0)
+    
+    def test_followers_do_not_purge(self):
+        """Test a process without the lock leaves the data alone"""
+        self._add_reports(3, age_hours=50)
+        lock = MagicMock()
+        lock.acquire.return_value = False
+        
+        self.assertIsNone(RetentionScheduler(self.engine, lock).tick())
+        self.assertEqual(self.engine.backlog(), 3)
+        self.assertEqual(metrics.snapshot()['gauges']['retention.leader'], 0)
+    
+    def test_scheduler_ticks_in_background(self):
+        """Test start() purges without any request coming in"""
+        self._add_reports(3, age_hours=50)
+        scheduler = RetentionScheduler(self.engine, FileLeaderLock(os.path.join(self.tmpdir.name, 'lock')),
+                                       tick_seconds=0.05)
+        scheduler.start()
+        try:
+            deadline = time.time() + 5
+            while self.engine.backlog() and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            scheduler.stop()
+        self.assertEqual(self.engine.backlog(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
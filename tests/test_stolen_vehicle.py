@@ -1,14 +1,21 @@
 import unittest
 import os
 import sys
+import time
+import shutil
+import tempfile
 from unittest.mock import patch, MagicMock
+import cv2
+import numpy as np
 
 # Add parent directory to path so we can import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app
-from utils.ocr import extract_vin, validate_vin
+from utils.ocr import extract_vin, validate_vin, extract_vin_from_bytes, find_vin_regions, preprocess_image, ocr_cache
+from utils.vin_check import check_digit, has_valid_check_digit, best_vin
 from utils.stolen_vehicle_api import check_stolen_status
+from utils.stolen_hotlist import StolenHotlist
 
 class StolenVehicleCheckTestCase(unittest.TestCase):
     """Test cases for stolen vehicle check functionality"""
@@ -112,4 +119,201 @@ class StolenVehicleCheckTestCase(unittest.TestCase):
         response = self.app.post('/sms', data=test_data)
         
         # Check response
-        self.assertIn(b'Could not detect a VIN', response.data)
\ No newline at end of file
+        self.assertIn(b'Could not detect a VIN', response.data)
+
+
+def vin_plate_photo(vin="1HGCM82633A004352", background=180):
+    """Synthetic photo of a VIN plate on a dashboard, as JPEG bytes"""
+    img = np.full((900, 1200, 3), background, dtype=np.uint8)
+    cv2.rectangle(img, (150, 400), (1050, 480), (255, 255, 255), -1)
+    cv2.putText(img, vin, (170, 460), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (0, 0, 0), 3)
+    cv2.circle(img, (300, 200), 80, (40, 40, 40), -1)
+    return cv2.imencode('.jpg', img)[1].tobytes()
+
+class VinOcrEngineTestCase(unittest.TestCase):
+    """Test cases for the staged VIN OCR engine"""
+    
+    def setUp(self):
+        ocr_cache.clear()
+    
+    def test_finds_vin_plate_region(self):
+        """Test the region detector crops the VIN line"""
+        img = cv2.imdecode(np.frombuffer(vin_plate_photo(), np.uint8), cv2.IMREAD_COLOR)
+        regions = find_vin_regions(preprocess_image(img))
+        
+        self.assertGreaterEqual(len(regions), 1)
+        height, width = regions[0].shape
+        self.assertGreater(width / height, 5)
+    
+    @patch('utils.ocr.pytesseract.image_to_string')
+    def test_region_hit_skips_full_image_ocr(self, mock_ocr):
+        """Test a VIN read from the cropped region stops further OCR passes"""
+        mock_ocr.return_value = "1HGCM82633A004352\n"
+        
+        self.assertEqual(extract_vin_from_bytes(vin_plate_photo()), "1HGCM82633A004352")
+        self.assertEqual(mock_ocr.call_count, 1)
+    
+    @patch('utils.ocr.pytesseract.image_to_string')
+    def test_falls_back_to_full_image(self, mock_ocr):
+        """Test whole-image OCR runs when the regions hold no VIN"""
+        def ocr(image, config):
+            return "1HGCM82633A004352" if '--psm 6' in config else "DASHBOARD"
+        mock_ocr.side_effect = ocr
+        
+        self.assertEqual(extract_vin_from_bytes(vin_plate_photo()), "1HGCM82633A004352")
+        self.assertTrue(any('--psm 6' in call.kwargs['config'] for call in mock_ocr.call_args_list))
+    
+    @patch('utils.ocr.pytesseract.image_to_string')
+    def test_resent_photo_hits_cache(self, mock_ocr):
+        """Test identical and recompressed resends skip OCR entirely"""
+        mock_ocr.return_value = "1HGCM82633A004352"
+        photo = vin_plate_photo()
+        extract_vin_from_bytes(photo)
+        calls = mock_ocr.call_count
+        
+        # Same bytes
+        self.assertEqual(extract_vin_from_bytes(photo), "1HGCM82633A004352")
+        # Same photo recompressed by the carrier
+        img = cv2.imdecode(np.frombuffer(photo, np.uint8), cv2.IMREAD_COLOR)
+        recompressed = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 70])[1].tobytes()
+        self.assertEqual(extract_vin_from_bytes(recompressed), "1HGCM82633A004352")
+        
+        self.assertEqual(mock_ocr.call_count, calls)
+    
+    @patch('utils.ocr.pytesseract.image_to_string')
+    def test_different_photo_misses_cache(self, mock_ocr):
+        """Test a different photo is not served another photo's VIN"""
+        mock_ocr.return_value = "1HGCM82633A004352"
+        extract_vin_from_bytes(vin_plate_photo())
+        
+        mock_ocr.return_value = "JH4KA8268MC000000"
+        self.assertEqual(
+            extract_vin_from_bytes(vin_plate_photo("JH4KA8268MC000000", background=90)),
+            "JH4KA8268MC000000"
+        )
+    
+    @patch('utils.ocr.pytesseract.image_to_string')
+    def test_ocr_noise_is_not_a_vin(self, mock_ocr):
+        """Test 17-character noise without a valid check digit is rejected"""
+        mock_ocr.return_value = "ABCDEFGH123456789"
+        
+        self.assertIsNone(extract_vin_from_bytes(vin_plate_photo()))
+
+class VinCheckDigitTestCase(unittest.TestCase):
+    """Test cases for VIN check digits and OCR candidate ranking"""
+    
+    def test_check_digit(self):
+        """Test the ISO 3779 check digit calculation"""
+        self.assertEqual(check_digit("1HGCM82633A004352"), "3")
+        self.assertEqual(check_digit("1M8GDM9AXKP042788"), "X")
+        self.assertIsNone(check_digit("1HGCM82633A00435I"))
+        
+        self.assertTrue(has_valid_check_digit("1M8GDM9AXKP042788"))
+        self.assertFalse(has_valid_check_digit("1HGCM82633A123456"))
+    
+    def test_corrects_ocr_confusions(self):
+        """Test O/I are fixed and the right 5/S, 8/B reading is chosen"""
+        self.assertEqual(best_vin("VIN: 1HGCMB2633AOO4352"), "1HGCM82633A004352")
+        self.assertEqual(best_vin("1HGCM82633A0O43S2"), "1HGCM82633A004352")
+        self.assertEqual(best_vin("IM8GDM9AXKP042788"), "1M8GDM9AXKP042788")
+    
+    def test_picks_single_best_candidate(self):
+        """Test the valid VIN wins over surrounding text and split lines"""
+        self.assertEqual(best_vin("MADE IN USA 1HGCM82633A004352 GVWR 2000KG"), "1HGCM82633A004352")
+        self.assertEqual(best_vin("1HGCM826\n33A004352"), "1HGCM82633A004352")
+    
+    def test_require_check_digit(self):
+        """Test format-only candidates are only used when allowed"""
+        self.assertIsNone(best_vin("1HGCM82633A123456"))
+        self.assertEqual(best_vin("1HGCM82633A123456", require_check_digit=False), "1HGCM82633A123456")
+
+class StolenHotlistTestCase(unittest.TestCase):
+    """Test cases for the local stolen-vehicle hotlist"""
+    
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.bulk_path = os.path.join(self.tmp, 'hotlist.txt')
+        self.delta_dir = os.path.join(self.tmp, 'deltas')
+        os.mkdir(self.delta_dir)
+        self.write(self.bulk_path, "1HGCM82633A004352\n1M8GDM9AXKP042788,2023-05-15\nNOT A VIN\n", age=60)
+        self.hotlist = StolenHotlist(self.bulk_path, self.delta_dir)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+    
+    def write(self, path, text, age=0):
+        with open(path, 'w') as f:
+            f.write(text)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+    
+    def test_load_and_lookup(self):
+        """Test bulk VINs are found and others are not"""
+        self.hotlist.load()
+        
+        self.assertEqual(len(self.hotlist), 2)
+        self.assertTrue(self.hotlist.contains("1HGCM82633A004352"))
+        self.assertTrue(self.hotlist.contains("1m8gdm9axkp042788"))
+        self.assertFalse(self.hotlist.contains("JH4KA8268MC000000"))
+        self.assertFalse(self.hotlist.contains("1HGCM82633A00435I"))
+    
+    def test_delta_updates(self):
+        """Test delta files add and remove VINs, each applied once"""
+        self.hotlist.load()
+        self.write(os.path.join(self.delta_dir, '0001.delta'), "+JH4KA8268MC000000\n-1HGCM82633A004352\n")
+        self.write(os.path.join(self.delta_dir, '.0002.delta'), "+1FTFW1ET5DFC10312\n")
+        
+        self.assertTrue(self.hotlist.sync())
+        self.assertTrue(self.hotlist.contains("JH4KA8268MC000000"))
+        self.assertFalse(self.hotlist.contains("1HGCM82633A004352"))
+        self.assertFalse(self.hotlist.contains("1FTFW1ET5DFC10312"))
+        self.assertFalse(self.hotlist.sync())
+    
+    def test_replaced_bulk_file_reloads(self):
+        """Test a new bulk file replaces the list and skips older deltas"""
+        self.write(os.path.join(self.delta_dir, '0001.delta'), "+JH4KA8268MC000000\n", age=30)
+        self.hotlist.sync()
+        self.assertTrue(self.hotlist.contains("JH4KA8268MC000000"))
+        
+        self.write(self.bulk_path, "1FTFW1ET5DFC10312\n")
+        self.assertTrue(self.hotlist.sync())
+        self.assertEqual(len(self.hotlist), 1)
+        self.assertFalse(self.hotlist.contains("JH4KA8268MC000000"))
+    
+    @patch('utils.stolen_vehicle_api.query_stolen_status')
+    def test_remote_lookup_only_on_hit(self, mock_query):
+        """Test check_stolen_status answers misses locally"""
+        self.hotlist.load()
+        mock_query.return_value = {'is_stolen': True, 'vin': "1HGCM82633A004352"}
+        
+        with patch('utils.stolen_vehicle_api.stolen_hotlist', self.hotlist):
+            self.assertFalse(check_stolen_status("JH4KA8268MC000000")['is_stolen'])
+            mock_query.assert_not_called()
+            
+            self.assertTrue(check_stolen_status("1HGCM82633A004352")['is_stolen'])
+            mock_query.assert_called_once_with("1HGCM82633A004352", True)
+    
+    @patch('utils.stolen_vehicle_api.get_vehicle_details', return_value={'make': 'HONDA'})
+    @patch('utils.stolen_vehicle_api.random.random', return_value=0.99)
+    def test_hotlist_hit_is_always_stolen(self, mock_random, mock_details):
+        """Test a hotlist hit stays stolen even when the remote lookup says otherwise"""
+        self.hotlist.load()
+        
+        with patch('utils.stolen_vehicle_api.stolen_hotlist', self.hotlist):
+            result = check_stolen_status("1HGCM82633A004352")
+        
+        self.assertTrue(result['is_stolen'])
+        self.assertEqual(result['last_checked'], 'hotlist')
+        self.assertEqual(result['vehicle_details'], {'make': 'HONDA'})
+        self.assertIn('instructions', result)
+    
+    @patch('utils.stolen_vehicle_api.get_vehicle_details')
+    def test_details_skipped_when_not_needed(self, mock_details):
+        """Test with_details=False never decodes the VIN, on a hit or a miss"""
+        self.hotlist.load()
+        
+        with patch('utils.stolen_vehicle_api.stolen_hotlist', self.hotlist):
+            self.assertTrue(check_stolen_status("1HGCM82633A004352", with_details=False)['is_stolen'])
+            self.assertFalse(check_stolen_status("JH4KA8268MC000000", with_details=False)['is_stolen'])
+        
+        mock_details.assert_not_called()
@@ -0,0 +1,72 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+from twilio.twiml.messaging_response import MessagingResponse
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, twiml_cache, emergency_call_twiml, HELP_REPLY
+from utils.twiml_cache import TwimlCache, template_renderer, TEMPLATE_DIR
+
+class TwimlCacheTestCase(unittest.TestCase):
+    """Test cases for pre-rendered TwiML responses"""
+    
+    def test_static_messages_are_prerendered(self):
+        """Test registered replies are served as the same bytes"""
+        cache = TwimlCache()
+        cache.add_messages("Stay safe.")
+        resp = MessagingResponse()
+        resp.message("Stay safe.")
+        
+        self.assertEqual(cache.message("Stay safe."), str(resp).encode())
+        self.assertIs(cache.message("Stay safe."), cache.message("Stay safe."))
+        # Unregistered replies are still rendered
+        self.assertIn(b'Report ID 42', cache.message("Report ID 42"))
+    
+    def test_voice_cached_per_url_root(self):
+        """Test voice scripts render once per URL root"""
+        render = MagicMock(side_effect=lambda url_root: f'<Response><Play>{url_root}a.mp3</Play></Response>')
+        cache = TwimlCache(max_roots=2)
+        cache.add_voice('call', render)
+        
+        first = cache.voice('call', 'http://a/')
+        self.assertIs(cache.voice('call', 'http://a/'), first)
+        self.assertIn(b'http://b/a.mp3', cache.voice('call', 'http://b/'))
+        self.assertEqual(render.call_count, 2)
+        
+        # Past max_roots, new roots are rendered but not kept
+        cache.voice('call', 'http://c/')
+        cache.voice('call', 'http://c/')
+        self.assertEqual(render.call_count, 4)
+        
+        with self.assertRaises(KeyError):
+            cache.voice('missing', 'http://a/')
+    
+    def test_template_files(self):
+        """Test voice scripts can be served from templates/"""
+        cache = TwimlCache()
+        cache.add_voice('emergency_call', template_renderer(os.path.join(TEMPLATE_DIR, 'emergency.xml')))
+        with open(os.path.join(TEMPLATE_DIR, 'emergency.xml'), 'rb') as f:
+            expected = f.read()
+        
+        with patch('app.twiml_cache', cache):
+            response = app.test_client().post('/emergency_call')
+        
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.mimetype, 'text/xml')
+    
+    def test_routes_serve_cached_bytes(self):
+        """Test the Flask routes return the pre-rendered responses"""
+        client = app.test_client()
+        
+        voice = client.post('/emergency_call', base_url='http://bot.example.org')
+        self.assertEqual(voice.data.decode(), emergency_call_twiml('http://bot.example.org/'))
+        
+        sms = client.post('/sms', data={'Body': 'hello'})
+        self.assertEqual(sms.data, twiml_cache.message(HELP_REPLY))
+        self.assertEqual(sms.mimetype, 'text/xml')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+import json
+import time
+import threading
+from urllib.parse import parse_qs
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+from tests.stub_server import StubServer
+from utils.redis_manager import RedisManager
+from utils.vin_decoder import VinDecoder, UNKNOWN_VEHICLE
+
+VEHICLES = {
+    '1HGCM82633A004352': ('HONDA', 'Accord', '2003'),
+    '1M8GDM9AXKP042788': ('MOTOR COACH INDUSTRIES', 'D4500', '1989'),
+}
+
+def decode_result(vin):
+    make, model, year = VEHICLES.get(vin, ('', '', ''))
+    return {'VIN': vin, 'Make': make, 'Model': model, 'ModelYear': year, 'BodyClass': 'Sedan/Saloon'}
+
+def nhtsa_routes(delay=0):
+    def decode(handler):
+        time.sleep(delay)
+        vin = handler.path.split('?', 1)[0].rsplit('/', 1)[1]
+        return 200, {'Content-Type': 'application/json'}, json.dumps({'Results': [decode_result(vin)]}).encode()
+    
+    def decode_batch(handler):
+        vins = parse_qs(handler.body.decode())['data'][0].split(';')
+        return 200, {'Content-Type': 'application/json'}, json.dumps({'Results': [decode_result(vin) for vin in vins]}).encode()
+    
+    routes = {f'/DecodeVinValues/{vin}': decode for vin in VEHICLES}
+    routes['/DecodeVINValuesBatch/'] = decode_batch
+    return routes
+
+@unittest.skipUnless(fakeredis, 'fakeredis is not installed')
+class VinDecoderTestCase(unittest.TestCase):
+    """Test cases for cached, coalesced NHTSA VIN decoding"""
+    
+    def setUp(self):
+        self.server = StubServer(nhtsa_routes(delay=0.2))
+        self.server.__enter__()
+        self.redis_manager = RedisManager(redis_client=fakeredis.FakeRedis())
+        self.decoder = VinDecoder(base_url=self.server.url, redis_manager=self.redis_manager)
+    
+    def tearDown(self):
+        self.decoder.session.close()
+        self.server.__exit__(None, None, None)
+    
+    def upstream_requests(self):
+        return len(self.server.requests)
+    
+    def test_decode_is_cached_in_process(self):
+        """Test a decode is fetched once and then served locally"""
+        details = self.decoder.decode("1HGCM82633A004352")
+        
+        self.assertEqual(details['make'], 'Honda')
+        self.assertEqual(details['model'], 'Accord')
+        self.assertEqual(details['year'], 2003)
+        self.assertEqual(self.decoder.decode("1hgcm82633a004352"), details)
+        self.assertEqual(self.upstream_requests(), 1)
+        self.assertEqual(self.decoder.stats()['local_hits'], 1)
+    
+    def test_redis_tier_is_shared(self):
+        """Test another worker's decoder finds the decode in Redis"""
+        self.decoder.decode("1HGCM82633A004352")
+        other = VinDecoder(base_url=self.server.url, redis_manager=self.redis_manager)
+        
+        self.assertEqual(other.decode("1HGCM82633A004352")['make'], 'Honda')
+        self.assertEqual(self.upstream_requests(), 1)
+        self.assertEqual(other.stats()['redis_hits'], 1)
+    
+    def test_concurrent_lookups_are_coalesced(self):
+        """Test simultaneous checks of one VIN make a single upstream call"""
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.decoder.decode("1HGCM82633A004352")))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(self.upstream_requests(), 1)
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(result['make'] == 'Honda' for result in results))
+        self.assertEqual(self.decoder.stats()['hit_rate'], 0.9)
+    
+    def test_batch_decode(self):
+        """Test bulk decodes use DecodeVINValuesBatch, 50 VINs per request"""
+        vins = list(VEHICLES) + [f"1FTFW1ET5DFC{i:05d}" for i in range(58)]
+        decoded = self.decoder.decode_many(vins)
+        
+        self.assertEqual(len(decoded), 60)
+        self.assertEqual(decoded['1M8GDM9AXKP042788']['year'], 1989)
+        posts = [request for request in self.server.requests if request[0] == 'POST']
+        self.assertEqual(len(posts), 2)
+        self.assertEqual(self.upstream_requests(), 2)
+    
+    def test_upstream_failure_is_not_cached(self):
+        """Test an NHTSA outage returns unknown details and is retried later"""
+        broken = VinDecoder(base_url=self.server.url + '/missing', redis_manager=self.redis_manager)
+        self.assertEqual(broken.decode("1HGCM82633A004352"), UNKNOWN_VEHICLE)
+        
+        self.assertEqual(self.decoder.decode("1HGCM82633A004352")['make'], 'Honda')
@@ -0,0 +1,79 @@
+import unittest
+import os
+import sys
+import threading
+
+# Add parent directory to path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import models
+from database.batching import GroupCommitWriter
+from utils.metrics import metrics
+from tests import DatabaseTestCase
+
+class GroupCommitWriterTestCase(DatabaseTestCase):
+    """Test cases for batched report writes"""
+
+    def setUp(self):
+        super().setUp()
+        self.writer = GroupCommitWriter(lambda: models.transaction(immediate=True), max_batch_rows=50, max_latency_ms=20)
+        self.writer.start()
+
+    def tearDown(self):
+        self.writer.stop()
+
+    def _insert(self, text):
+        def unit(conn):
+            return conn.execute('INSERT INTO reports (report_text) VALUES (?)', (text,)).lastrowid
+        return unit
+
+    def test_execute_returns_row_id(self):
+        """Test callers get their own report ID back"""
+        first = self.writer.execute(self._insert('first'))
+        second = self.writer.execute(self._insert('second'))
+        self.assertEqual(second, first + 1)
+
+    def test_concurrent_writes_share_a_commit(self):
+        """Test writes submitted together are flushed in one batch"""
+        metrics.reset()
+        futures = [self.writer.submit(self._insert(f'report {i}')) for i in range(30)]
+        ids = [future.result(timeout=5) for future in futures]
+
+        self.assertEqual(len(set(ids)), 30)
+        self.assertEqual(metrics.snapshot()['counters']['db.write_batch.flushes'], 1)
+
+    def test_failing_unit_does_not_affect_batch(self):
+        """Test one bad write is rolled back alone"""
+        def bad_unit(conn):
+            conn.execute('INSERT INTO reports (report_text) VALUES (?)', ('half written',))
+            raise ValueError('bad write')
+
+        good = self.writer.submit(self._insert('good'))
+        bad = self.writer.submit(bad_unit)
+
+        self.assertIsNotNone(good.result(timeout=5))
+        with self.assertRaises(ValueError):
+            bad.result(timeout=5)
+
+        conn = models.get_db_connection()
+        texts = [row['report_text'] for row in conn.execute('SELECT report_text FROM reports')]
+        conn.close()
+        self.assertEqual(texts, ['good'])
+
+    def test_save_report_from_many_threads(self):
+        """Test save_report hands every thread a distinct report ID"""
+        ids = []
+        lock = threading.Lock()
+
+        def save():
+            report_id = models.save_report('threaded', [], None, None)
+            with lock:
+                ids.append(report_id)
+
+        threads = [threading.Thread(target=save) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(ids)), 20)
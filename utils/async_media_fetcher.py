@@ -0,0 +1,55 @@
+import aiohttp
+from utils.media_fetcher import MediaTooLargeError, CHUNK_SIZE
+from config import (
+    TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN,
+    MEDIA_MAX_BYTES, MEDIA_CONNECT_TIMEOUT, MEDIA_READ_TIMEOUT, MEDIA_POOL_SIZE
+)
+
+class AsyncMediaFetcher:
+    """asyncio counterpart of MediaFetcher for the ASGI server
+
+    Same size cap and timeouts, on one pooled aiohttp session. Create it
+    inside the running event loop and close it on shutdown.
+    """
+
+    def __init__(self, max_bytes=MEDIA_MAX_BYTES, connect_timeout=MEDIA_CONNECT_TIMEOUT,
+                 read_timeout=MEDIA_READ_TIMEOUT, pool_size=MEDIA_POOL_SIZE, auth=None):
+        self.max_bytes = max_bytes
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_size),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+            auth=aiohttp.BasicAuth(*auth) if auth else None
+        )
+
+    async def fetch(self, url):
+        """Download one attachment
+
+        Returns:
+            bytes: The response body
+
+        Raises:
+            MediaTooLargeError: If the body is larger than max_bytes
+            aiohttp.ClientError: On network errors or HTTP errors
+            asyncio.TimeoutError: If the host stalls
+        """
+        async with self.session.get(url) as response:
+            response.raise_for_status()
+
+            if response.content_length is not None and response.content_length > self.max_bytes:
+                raise MediaTooLargeError(f"Media is {response.content_length} bytes, limit is {self.max_bytes}")
+
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    raise MediaTooLargeError(f"Media exceeds limit of {self.max_bytes} bytes")
+            return bytes(body)
+
+    async def close(self):
+        await self.session.close()
+
+def create_async_media_fetcher():
+    """AsyncMediaFetcher with the same Twilio credentials as media_fetcher"""
+    return AsyncMediaFetcher(
+        auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN) if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN else None
+    )
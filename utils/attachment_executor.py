@@ -0,0 +1,86 @@
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import IMAGE_EXECUTOR, IMAGE_WORKERS, IMAGE_MAX_IN_FLIGHT, IMAGE_PER_REPORT_PARALLELISM
+
+class AttachmentExecutor:
+    """Bounded executor for processing the attachments of many reports
+    
+    Every report's attachments run concurrently, but within two limits:
+    a process-wide cap on images in flight (max_in_flight) and a per-call
+    cap (per_call_limit) so one report with ten photos cannot take every
+    slot while other reports wait.
+    
+    kind='thread' runs work on a thread pool; OpenCV releases the GIL while
+    decoding, detecting, blurring and encoding, so threads already spread
+    that work across cores. kind='process' runs it on a process pool
+    started with forkserver; use it only when the main module is safe to
+    re-import (e.g. under gunicorn).
+    """
+    
+    def __init__(self, kind=IMAGE_EXECUTOR, max_workers=IMAGE_WORKERS,
+                 max_in_flight=IMAGE_MAX_IN_FLIGHT, per_call_limit=IMAGE_PER_REPORT_PARALLELISM):
+        self.kind = kind
+        self.max_workers = max_workers
+        self.per_call_limit = per_call_limit
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.kind == 'process':
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload(['utils.image_processing'])
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='attachment')
+            return self._executor
+    
+    def map(self, fn, items):
+        """Run fn over items concurrently, preserving order
+        
+        Every item is attempted even if some fail, so the caller can clean
+        up after the ones that succeeded.
+        
+        Returns:
+            list: For each item, either fn's result or the exception it raised
+        """
+        executor = self._get_executor()
+        results = [None] * len(items)
+        pending = deque(enumerate(items))
+        in_flight = {}
+        
+        while pending or in_flight:
+            while pending and len(in_flight) < self.per_call_limit:
+                index, item = pending.popleft()
+                # Wait for a free process-wide slot
+                self._slots.acquire()
+                try:
+                    future = executor.submit(fn, item)
+                except BaseException:
+                    self._slots.release()
+                    raise
+                future.add_done_callback(lambda _: self._slots.release())
+                in_flight[future] = index
+            
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                error = future.exception()
+                results[index] = error if error is not None else future.result()
+        
+        return results
+    
+    def shutdown(self):
+        """Stop the worker pool"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+# Shared by every media worker in the process, so the caps are global
+attachment_executor = AttachmentExecutor()
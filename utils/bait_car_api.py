@@ -6,6 +6,37 @@ import random
 from datetime import datetime
 from config import BAIT_CAR_API_URL, BAIT_CAR_API_KEY
 from database.models import log_bait_car_notification
+from utils.bait_car_fleet import BaitCarFleet
+
+# Bait car fleet (this would come from the IMPD API in production)
+# Indianapolis downtown area roughly spans from 39.75 to 39.78 latitude
+# and -86.18 to -86.15 longitude
+BAIT_CAR_HOTSPOTS = [
+    {"id": "bc-1", "lat": 39.768, "lon": -86.158, "active": True},  # Near Monument Circle
+    {"id": "bc-2", "lat": 39.764, "lon": -86.173, "active": True},  # Near White River State Park
+    {"id": "bc-3", "lat": 39.779, "lon": -86.148, "active": False}, # Near Mass Ave
+    {"id": "bc-4", "lat": 39.754, "lon": -86.142, "active": True},  # Near Fountain Square
+    {"id": "bc-5", "lat": 39.773, "lon": -86.178, "active": True}   # Near IUPUI
+]
+
+# The fleet is served from an in-memory snapshot. With an API key it is kept
+# fresh from IMPD's feed; without one the hotspots above are used.
+bait_car_fleet = BaitCarFleet(
+    url=BAIT_CAR_API_URL if BAIT_CAR_API_KEY else None,
+    initial_cars=() if BAIT_CAR_API_KEY else BAIT_CAR_HOTSPOTS
+)
+
+def update_bait_car_index(cars):
+    """Replace the fleet with a new list of cars
+    
+    Args:
+        cars (list): Bait car dicts with id, lat, lon and active keys
+    
+    Returns:
+        int: Number of active cars now indexed
+    """
+    bait_car_fleet.replace(cars)
+    return len(bait_car_fleet.snapshot.index)
 
 # This is a mock implementation. In production, this would connect to the IMPD API
 def get_nearby_bait_cars(user_lat, user_lon, radius_miles=0.5):
@@ -20,39 +51,21 @@ def get_nearby_bait_cars(user_lat, user_lon, radius_miles=0.5):
         list: List of bait cars in the vicinity, or empty list if none found
     """
     try:
-        # In a real implementation, this would make an API call to IMPD's bait car system
-        # For example:
-        # headers = {'Authorization': f'Bearer {BAIT_CAR_API_KEY}'}
-        # params = {'latitude': user_lat, 'longitude': user_lon, 'radius': radius_miles}
-        # response = requests.get(BAIT_CAR_API_URL, headers=headers, params=params)
-        # data = response.json()
-        
-        # For this project, we'll generate mock data
-        # Indianapolis downtown area roughly spans from 39.75 to 39.78 latitude
-        # and -86.18 to -86.15 longitude
-        
-        # Define bait car hotspots (these would come from the API in production)
-        bait_car_hotspots = [
-            {"lat": 39.768, "lon": -86.158, "active": True},  # Near Monument Circle
-            {"lat": 39.764, "lon": -86.173, "active": True},  # Near White River State Park
-            {"lat": 39.779, "lon": -86.148, "active": False}, # Near Mass Ave
-            {"lat": 39.754, "lon": -86.142, "active": True},  # Near Fountain Square
-            {"lat": 39.773, "lon": -86.178, "active": True}   # Near IUPUI
-        ]
+        # The fleet snapshot is refreshed from IMPD in the background, so no
+        # request is made per message
         
-        # Calculate which bait cars are within the radius
+        # Look up the active cars within the radius, nearest first
         nearby_cars = []
-        for car in bait_car_hotspots:
-            if car["active"] and calculate_distance(user_lat, user_lon, car["lat"], car["lon"]) <= radius_miles:
-                # Add some randomized details to make it more realistic
-                car_details = {
-                    "latitude": car["lat"],
-                    "longitude": car["lon"],
-                    "timestamp": datetime.now().isoformat(),
-                    "vehicle_type": random.choice(["Sedan", "SUV", "Pickup", "Compact"]),
-                    "distance_miles": round(calculate_distance(user_lat, user_lon, car["lat"], car["lon"]), 2)
-                }
-                nearby_cars.append(car_details)
+        for _, car, distance in bait_car_fleet.query(user_lat, user_lon, radius_miles):
+            # Add some randomized details to make it more realistic
+            car_details = {
+                "latitude": car["lat"],
+                "longitude": car["lon"],
+                "timestamp": datetime.now().isoformat(),
+                "vehicle_type": random.choice(["Sedan", "SUV", "Pickup", "Compact"]),
+                "distance_miles": round(distance, 2)
+            }
+            nearby_cars.append(car_details)
         
         # If we found nearby bait cars, log this notification
         if nearby_cars:
@@ -0,0 +1,138 @@
+import time
+import threading
+from collections import namedtuple
+import requests
+from utils.spatial_index import GridIndex
+from utils.metrics import metrics
+from config import (
+    BAIT_CAR_API_URL, BAIT_CAR_API_KEY, BAIT_CAR_REFRESH_INTERVAL, BAIT_CAR_MAX_STALE, BAIT_CAR_TIMEOUT
+)
+
+# One immutable view of the fleet. Queries read whichever snapshot is
+# current; refreshes build a new one and swap the reference, so a query
+# never sees a half-updated fleet.
+FleetSnapshot = namedtuple('FleetSnapshot', ['cars', 'index', 'fetched_at', 'etag', 'last_modified'])
+
+def build_snapshot(cars, etag=None, last_modified=None, previous=None):
+    """Index the active cars of a fleet feed
+    
+    With a previous snapshot its index is copied and only the cars that
+    were added, moved, changed or dropped are re-indexed.
+    
+    Args:
+        cars (list): Bait car dicts with id, lat, lon and active keys
+        previous (FleetSnapshot): Snapshot the new one replaces
+    """
+    cars = tuple(dict(car) for car in cars)
+    index = previous.index.copy() if previous is not None else GridIndex()
+    index.sync({car['id']: (car['lat'], car['lon'], car) for car in cars if car.get('active', True)})
+    return FleetSnapshot(cars, index, time.time(), etag, last_modified)
+
+class BaitCarFleet:
+    """In-memory bait car fleet, refreshed from the IMPD feed in the background
+    
+    Every query is answered from the current snapshot. The feed is polled
+    every refresh_interval seconds with If-None-Match/If-Modified-Since, so
+    an unchanged fleet costs a 304 and no re-indexing. If the feed is down
+    the last good snapshot keeps being served (stale-while-revalidate) and
+    its age is reported through the bait_car_fleet.age_seconds gauge.
+    
+    Without a poller thread, a query against a snapshot older than
+    refresh_interval starts one refresh in the background and still returns
+    immediately.
+    """
+    
+    def __init__(self, url=BAIT_CAR_API_URL, api_key=BAIT_CAR_API_KEY, refresh_interval=BAIT_CAR_REFRESH_INTERVAL,
+                 max_stale=BAIT_CAR_MAX_STALE, timeout=BAIT_CAR_TIMEOUT, initial_cars=()):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers['Authorization'] = f'Bearer {api_key}'
+        self.snapshot = build_snapshot(initial_cars)
+        if url:
+            # Not confirmed by the feed yet, so the first query revalidates
+            self.snapshot = self.snapshot._replace(fetched_at=0)
+        self._last_attempt = 0
+        self._refresh_lock = threading.Lock()
+        self._poller = None
+    
+    def age(self):
+        """Seconds since the current snapshot was confirmed fresh"""
+        return time.time() - self.snapshot.fetched_at
+    
+    def replace(self, cars):
+        """Swap in a fleet from somewhere other than the feed"""
+        self.snapshot = build_snapshot(cars, previous=self.snapshot)
+    
+    def refresh(self):
+        """Poll the feed once; on failure the current snapshot is kept
+        
+        Returns:
+            bool: True if a new fleet was loaded
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return False  # Another thread is already refreshing
+        try:
+            self._last_attempt = time.time()
+            current = self.snapshot
+            headers = {}
+            if current.etag:
+                headers['If-None-Match'] = current.etag
+            if current.last_modified:
+                headers['If-Modified-Since'] = current.last_modified
+            
+            try:
+                response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+                if response.status_code == 304:
+                    self.snapshot = current._replace(fetched_at=time.time())
+                    metrics.incr('bait_car_fleet.not_modified')
+                    return False
+                response.raise_for_status()
+                feed = response.json()
+                cars = feed['cars'] if isinstance(feed, dict) else feed
+                self.snapshot = build_snapshot(cars, response.headers.get('ETag'),
+                                               response.headers.get('Last-Modified'), previous=current)
+                metrics.incr('bait_car_fleet.updates')
+                return True
+            except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+                metrics.incr('bait_car_fleet.errors')
+                if self.age() > self.max_stale:
+                    print(f"Error refreshing bait car fleet (serving {int(self.age())}s old data): {str(e)}")
+                return False
+        finally:
+            metrics.set_gauge('bait_car_fleet.age_seconds', round(self.age(), 1))
+            self._refresh_lock.release()
+    
+    def query(self, lat, lon, radius_miles):
+        """Active cars within the radius, nearest first
+        
+        Returns:
+            list: (car_id, car, distance_miles) tuples
+        """
+        if self._should_revalidate():
+            self._last_attempt = time.time()
+            threading.Thread(target=self.refresh, name='bait-car-refresh', daemon=True).start()
+        return self.snapshot.index.query(lat, lon, radius_miles)
+    
+    def _should_revalidate(self):
+        # The poller thread keeps the snapshot fresh when it is running
+        if self._poller is not None or not self.url:
+            return False
+        now = time.time()
+        return now - self._last_attempt > self.refresh_interval and now - self.snapshot.fetched_at > self.refresh_interval
+    
+    def start(self):
+        """Poll the feed every refresh_interval seconds on a background thread"""
+        if self._poller is not None or not self.url:
+            return
+        
+        def run():
+            while True:
+                self.refresh()
+                time.sleep(self.refresh_interval)
+        
+        self._poller = threading.Thread(target=run, name='bait-car-poller', daemon=True)
+        self._poller.start()
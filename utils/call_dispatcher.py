@@ -0,0 +1,148 @@
+import os
+import time
+import queue
+import itertools
+import threading
+from collections import namedtuple
+from twilio.base.exceptions import TwilioRestException
+from utils.redis_manager import hash_phone_number
+from utils.metrics import metrics
+from config import (
+    TWILIO_PHONE_NUMBER, CALL_DISPATCH_WORKERS, CALL_MAX_ATTEMPTS, CALL_RETRY_BACKOFF,
+    CALL_DEDUPE_WINDOW, CALL_DIAL_SLO_MS
+)
+
+# Lower numbers are dialled first
+EMERGENCY_PRIORITY = 0
+FAMILY_PRIORITY = 1
+
+CallJob = namedtuple('CallJob', ['to', 'url', 'priority', 'enqueued_at', 'attempt'])
+
+def is_retryable(error):
+    """Twilio rate limits, server errors and network failures are retried;
+    anything else (e.g. an invalid number) will fail the same way again"""
+    if isinstance(error, TwilioRestException):
+        return error.status == 429 or error.status >= 500
+    return True
+
+class CallDispatcher:
+    """Places outbound Twilio calls off the webhook thread
+    
+    /sms queues the call and replies straight away; a dedicated pool of
+    workers dials in priority order (emergency calls before family calls).
+    Failed attempts are retried with exponential backoff, and repeat texts
+    from the same number for the same call within dedupe_window seconds
+    are dropped so a panicked user sending RED five times gets one call.
+    
+    The time from queueing to Twilio accepting the call is recorded as
+    calls.enqueue_to_dial_ms; calls slower than CALL_DIAL_SLO_MS are also
+    counted in calls.slo_missed.
+    
+    Worker threads don't survive a fork, so a forked server worker starts
+    its own pool on its first dispatch.
+    """
+    
+    def __init__(self, client, num_workers=CALL_DISPATCH_WORKERS, max_attempts=CALL_MAX_ATTEMPTS,
+                 backoff=CALL_RETRY_BACKOFF, dedupe_window=CALL_DEDUPE_WINDOW, from_number=TWILIO_PHONE_NUMBER):
+        self.client = client
+        self.num_workers = num_workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.dedupe_window = dedupe_window
+        self.from_number = from_number
+        self._queue = queue.PriorityQueue()
+        # Tie-breaker so jobs of equal priority keep arrival order
+        self._sequence = itertools.count()
+        self._recent = {}
+        self._recent_lock = threading.Lock()
+        self._threads = []
+        self._pid = os.getpid()
+    
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._queue = queue.PriorityQueue()
+            self._recent_lock = threading.Lock()
+            self._threads = []
+            self._pid = os.getpid()
+            self.start()
+    
+    def start(self):
+        """Start the dialling workers (safe to call more than once)"""
+        if self._threads:
+            return
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'call-dispatcher-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self, timeout=5.0):
+        """Stop the workers once the calls already queued are placed"""
+        for _ in self._threads:
+            self._queue.put((float('inf'), next(self._sequence), None))
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+    
+    def dispatch(self, to, url, priority=EMERGENCY_PRIORITY):
+        """Queue an outbound call
+        
+        Args:
+            to (str): Number to call
+            url (str): TwiML URL for the call
+            priority (int): EMERGENCY_PRIORITY or FAMILY_PRIORITY
+        
+        Returns:
+            bool: False if the same call was already queued within the dedupe window
+        """
+        self._check_fork()
+        now = time.monotonic()
+        key = (hash_phone_number(to), url)
+        with self._recent_lock:
+            last = self._recent.get(key)
+            if last is not None and now - last < self.dedupe_window:
+                metrics.incr('calls.deduped')
+                return False
+            self._recent[key] = now
+            # Forget old entries so the table doesn't grow without bound
+            if len(self._recent) > 1024:
+                self._recent = {k: t for k, t in self._recent.items() if now - t < self.dedupe_window}
+        
+        self._enqueue(CallJob(to, url, priority, now, 1))
+        return True
+    
+    def _enqueue(self, job):
+        self._queue.put((job.priority, next(self._sequence), job))
+        metrics.set_gauge('calls.queue_depth', self._queue.qsize())
+    
+    def _worker_loop(self):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            self._dial(job)
+    
+    def _dial(self, job):
+        started = time.monotonic()
+        try:
+            self.client.calls.create(to=job.to, from_=self.from_number, url=job.url)
+        except Exception as e:
+            metrics.observe('calls.attempt_ms', (time.monotonic() - started) * 1000)
+            if job.attempt < self.max_attempts and is_retryable(e):
+                metrics.incr('calls.retries')
+                delay = self.backoff * 2 ** (job.attempt - 1)
+                retry = job._replace(attempt=job.attempt + 1)
+                timer = threading.Timer(delay, self._enqueue, args=(retry,))
+                timer.daemon = True
+                timer.start()
+            else:
+                metrics.incr('calls.failed')
+                print(f"Error placing call after {job.attempt} attempt(s): {str(e)}")
+            return
+        
+        now = time.monotonic()
+        metrics.observe('calls.attempt_ms', (now - started) * 1000)
+        latency_ms = (now - job.enqueued_at) * 1000
+        metrics.observe('calls.enqueue_to_dial_ms', latency_ms)
+        metrics.incr('calls.placed')
+        if latency_ms > CALL_DIAL_SLO_MS:
+            metrics.incr('calls.slo_missed')
@@ -0,0 +1,180 @@
+import re
+from collections import namedtuple
+
+# A command definition. phrase is a regex for the keyword(s); it is
+# matched on word boundaries and case-insensitively, so 'red' matches
+# "RED!" but not "bored". Commands with a lower priority win when a
+# message contains several; needs_media commands are skipped for
+# messages without attachments. rate_class names the per-number budget
+# the command spends from (see utils.rate_limiter).
+Command = namedtuple('Command', ['name', 'phrase', 'priority', 'needs_media', 'rate_class'], defaults=(None,))
+
+# The classified message: the matched command and the text around the
+# keyword (e.g. the details of a report).
+CommandMatch = namedtuple('CommandMatch', ['name', 'argument'])
+
+# An incoming SMS, parsed once from Twilio's webhook fields. image_urls
+# holds only the image attachments.
+SmsMessage = namedtuple('SmsMessage', [
+    'body', 'argument', 'from_number', 'media_count', 'image_urls', 'latitude', 'longitude', 'url_root'
+])
+
+def parse_sms(values, url_root, argument=''):
+    """Build an SmsMessage from the webhook form fields
+    
+    Args:
+        values: request.values, or a dict of the same fields
+        url_root (str): Base URL of this server, ending in '/'
+        argument (str): Command argument from CommandRouter.classify
+    """
+    media_count = int(values.get('NumMedia', 0))
+    image_urls = [
+        values.get(f'MediaUrl{i}') for i in range(media_count)
+        if (values.get(f'MediaContentType{i}') or '').startswith('image/')
+    ]
+    return SmsMessage(values.get('Body', '').strip(), argument, values.get('From', ''), media_count,
+                      image_urls, values.get('Latitude'), values.get('Longitude'), url_root)
+
+class CommandRouter:
+    """Classifies SMS bodies into commands and calls their handlers
+    
+    All command phrases are compiled into one regex alternation, so a
+    message is classified in a single scan no matter how many commands
+    are registered. Handlers are registered with decorators:
+        
+        router = CommandRouter()
+        
+        @router.command('emergency', r'red', priority=0)
+        def emergency(message): ...
+        
+        @router.default
+        def help(message): ...
+    
+    A second router can share the definitions and register its own
+    handlers, e.g. coroutines for the async server:
+        
+        async_router = CommandRouter(router.commands)
+        
+        @async_router.handler('emergency')
+        async def emergency(message): ...
+    """
+    
+    def __init__(self, commands=()):
+        """Create a router
+        
+        Args:
+            commands (iterable): Command definitions to start with (no handlers)
+        """
+        self._commands = {}
+        self._handlers = {}
+        self._default = None
+        self._pattern = None
+        for command in commands:
+            self._define(command)
+    
+    @property
+    def commands(self):
+        """Command definitions, highest priority first"""
+        return sorted(self._commands.values(), key=lambda command: command.priority)
+    
+    def _define(self, command):
+        if command.name in self._commands:
+            raise ValueError(f"Command {command.name!r} is already defined")
+        if not command.name.isidentifier():
+            raise ValueError(f"Command name {command.name!r} must be a valid identifier")
+        self._commands[command.name] = command
+        self._pattern = None
+    
+    def command(self, name, phrase, priority=None, needs_media=False, rate_class=None):
+        """Decorator defining a command and registering its handler
+        
+        Args:
+            name (str): Command name
+            phrase (str): Regex for the keyword; spaces match any whitespace
+            priority (int): Lower wins; defaults to registration order
+            needs_media (bool): Only match messages with attachments
+            rate_class (str): Rate limit budget the command spends from
+        """
+        if priority is None:
+            priority = len(self._commands)
+        self._define(Command(name, phrase, priority, needs_media, rate_class))
+        return self.handler(name)
+    
+    def handler(self, name):
+        """Decorator registering the handler for an already defined command"""
+        if name not in self._commands:
+            raise KeyError(f"Unknown command {name!r}")
+        
+        def register(func):
+            self._handlers[name] = func
+            return func
+        return register
+    
+    def default(self, func):
+        """Decorator registering the handler for messages matching no command"""
+        self._default = func
+        return func
+    
+    def _compile(self):
+        alternatives = []
+        for command in self.commands:
+            phrase = r'\s+'.join(command.phrase.split(' '))
+            alternatives.append(rf'(?P<{command.name}>\b(?:{phrase})\b)')
+        self._pattern = re.compile('|'.join(alternatives), re.IGNORECASE)
+        return self._pattern
+    
+    def classify(self, text, has_media=False):
+        """Find the command in a message
+        
+        Args:
+            text (str): Message body
+            has_media (bool): Whether the message has attachments
+        
+        Returns:
+            CommandMatch: The command and its argument, or None if no command matches
+        """
+        pattern = self._pattern or self._compile()
+        best, best_match = None, None
+        for match in pattern.finditer(text):
+            command = self._commands[match.lastgroup]
+            if command.needs_media and not has_media:
+                continue
+            if best is None or command.priority < best.priority:
+                best, best_match = command, match
+        if best is None:
+            return None
+        argument = f"{text[:best_match.start()].rstrip()} {text[best_match.end():].lstrip()}".strip()
+        return CommandMatch(best.name, argument)
+    
+    def route(self, values, url_root):
+        """Classify a webhook without calling its handler
+        
+        Lets the caller check the sender (e.g. rate limits) before the
+        handler starts any work.
+        
+        Args:
+            values: Webhook form fields (see parse_sms)
+            url_root (str): Base URL of this server
+        
+        Returns:
+            tuple: (handler, SmsMessage, Command), with Command None for the default handler
+        """
+        message = parse_sms(values, url_root)
+        match = self.classify(message.body, message.media_count > 0)
+        if match is None:
+            return self._default, message, None
+        return self._handlers[match.name], message._replace(argument=match.argument), self._commands[match.name]
+    
+    def dispatch(self, values, url_root, *args):
+        """Classify a webhook and call the matching handler
+        
+        Args:
+            values: Webhook form fields (see parse_sms)
+            url_root (str): Base URL of this server
+            *args: Passed to the handler after the SmsMessage
+        
+        Returns:
+            The handler's return value
+        """
+        handler, message, _ = self.route(values, url_root)
+        return handler(message, *args)
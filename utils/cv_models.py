@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+import cv2
+from utils.metrics import metrics
+
+FACE_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+def _load_face_cascade():
+    face_cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
+    if face_cascade.empty():
+        raise RuntimeError(f"Could not load face detector from {FACE_CASCADE_PATH}")
+    return face_cascade
+
+class ModelRegistry:
+    """Per-process cache of loaded computer-vision models
+    
+    Loading a model (e.g. parsing the Haar cascade XML) costs far more than
+    a single detection on a downscaled photo, so models are loaded once and
+    reused. OpenCV detectors are not safe to share between threads, so each
+    model is kept as a small pool of instances: a thread checks one out,
+    uses it and returns it. A new instance is only loaded when every
+    existing one is busy, so a process ends up with one instance per
+    concurrent user of the model.
+    
+    Instances are never shared across a fork; a forked worker starts with
+    an empty registry.
+    """
+    
+    def __init__(self, loaders=None):
+        """Create a registry
+        
+        Args:
+            loaders (dict): Maps model name to a function that loads it
+        """
+        self.loaders = loaders if loaders is not None else {'face_cascade': _load_face_cascade}
+        self._lock = threading.Lock()
+        self._free = {}
+        self._loaded = {}
+        self._pid = os.getpid()
+    
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._free = {}
+            self._loaded = {}
+            self._pid = os.getpid()
+    
+    def _acquire(self, name):
+        with self._lock:
+            self._check_fork()
+            free = self._free.setdefault(name, [])
+            if free:
+                return free.pop()
+        
+        # Load outside the lock so other threads can keep checking out models
+        started = time.perf_counter()
+        model = self.loaders[name]()
+        metrics.observe(f'cv.{name}.load_ms', (time.perf_counter() - started) * 1000)
+        metrics.incr(f'cv.{name}.loads')
+        
+        with self._lock:
+            self._loaded[name] = self._loaded.get(name, 0) + 1
+        return model
+    
+    def _release(self, name, model):
+        with self._lock:
+            self._check_fork()
+            self._free.setdefault(name, []).append(model)
+    
+    @contextmanager
+    def checkout(self, name):
+        """Borrow a loaded model for the duration of a with block"""
+        model = self._acquire(name)
+        try:
+            yield model
+        finally:
+            self._release(name, model)
+    
+    def warm(self, names=None):
+        """Load one instance of each model ahead of the first request"""
+        for name in names or self.loaders:
+            with self.checkout(name):
+                pass
+    
+    def loaded_count(self, name):
+        """Number of instances of a model loaded in this process"""
+        with self._lock:
+            self._check_fork()
+            return self._loaded.get(name, 0)
+
+# Shared registry for the whole process
+model_registry = ModelRegistry()
+
+def warm_models():
+    """Preload every model, e.g. from a gunicorn post_fork hook"""
+    model_registry.warm()
@@ -1,65 +1,110 @@
-import os
-import uuid
-import requests
+import time
 from io import BytesIO
 from PIL import Image, ExifTags
 import cv2
 import numpy as np
-from config import UPLOAD_FOLDER
+from config import FACE_DETECTION_MAX_DIMENSION, JPEG_QUALITY
+from utils.cv_models import model_registry
+from utils.media_fetcher import media_fetcher
+from utils.media_store import media_store
+from utils.metrics import metrics
 
 def download_image(url):
-    """Download image from URL"""
-    response = requests.get(url)
-    return BytesIO(response.content)
+    """Download image from URL (size-capped, over the shared media session)"""
+    return BytesIO(media_fetcher.fetch(url))
 
 def remove_metadata(image):
     """Remove EXIF metadata from image"""
-    data = list(image.getdata())
-    image_without_exif = Image.new(image.mode, image.size)
-    image_without_exif.putdata(data)
-    return image_without_exif
+    # Copy only the raw pixel buffer; EXIF and other info stay behind
+    return Image.frombytes(image.mode, image.size, image.tobytes())
 
-def blur_faces(image_path):
-    """Detect and blur faces in an image"""
-    # Load pre-trained face detector
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+def decode_image(image_bytes):
+    """Decode image bytes into a BGR pixel array
     
-    # Read the image
-    image = cv2.imread(image_path)
+    Only the pixels are decoded, so EXIF, GPS and other metadata are
+    dropped by construction.
+    """
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image")
+    return image
+
+def detect_faces(image, max_dimension=FACE_DETECTION_MAX_DIMENSION):
+    """Find faces in a BGR image
+    
+    Detection runs on a grayscale copy downscaled so its longest side is at
+    most max_dimension; boxes are scaled back to full-resolution coordinates.
+    
+    Returns:
+        list: (x, y, w, h) face boxes in the original image
+    """
+    height, width = image.shape[:2]
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
-    # Detect faces
-    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+    scale = 1.0
+    if max_dimension and max(height, width) > max_dimension:
+        scale = max_dimension / max(height, width)
+        gray = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))),
+                          interpolation=cv2.INTER_AREA)
     
-    # Blur each face
+    # Detect faces with this process's cached face detector
+    with model_registry.checkout('face_cascade') as face_cascade:
+        started = time.perf_counter()
+        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+        metrics.observe('cv.face_cascade.detect_ms', (time.perf_counter() - started) * 1000)
+    
+    return [
+        (int(x / scale), int(y / scale), int(w / scale), int(h / scale))
+        for (x, y, w, h) in faces
+    ]
+
+def blur_face_regions(image, faces):
+    """Blur face boxes in place"""
     for (x, y, w, h) in faces:
         # Apply stronger Gaussian blur to face region
         face_roi = image[y:y+h, x:x+w]
-        blurred_face = cv2.GaussianBlur(face_roi, (99, 99), 30)
-        image[y:y+h, x:x+w] = blurred_face
+        image[y:y+h, x:x+w] = cv2.GaussianBlur(face_roi, (99, 99), 30)
+    return image
+
+def blur_faces(image_path):
+    """Detect and blur faces in an image"""
+    # Read the image
+    image = cv2.imread(image_path)
+    
+    # Blur each face
+    blur_face_regions(image, detect_faces(image))
     
     # Save the image with blurred faces
     cv2.imwrite(image_path, image)
     
     return image_path
 
-def process_image(image_url):
-    """Process image: download, remove metadata, blur faces, and save"""
-    # Download image
-    image_data = download_image(image_url)
-    image = Image.open(image_data)
+def process_image_bytes(image_bytes, owner=None):
+    """Remove metadata from and blur faces in a downloaded image, then save it
     
-    # Remove EXIF metadata
-    clean_image = remove_metadata(image)
+    The photo is decoded once, blurred in place and encoded once. The result
+    goes into the content-addressed media store, so the caller holds a
+    reference to the returned path.
     
-    # Generate unique filename
-    filename = str(uuid.uuid4()) + '.jpg'
-    output_path = os.path.join(UPLOAD_FOLDER, filename)
+    Args:
+        owner (tuple): (job ID, attempt) of the media job processing the image
     
-    # Save cleaned image
-    clean_image.save(output_path)
+    Returns:
+        str: Path of the processed image
+    """
+    # Decode image (metadata is not carried over)
+    image = decode_image(image_bytes)
     
     # Blur faces
-    blur_faces(output_path)
+    blur_face_regions(image, detect_faces(image))
     
-    return output_path
\ No newline at end of file
+    # Encode and save cleaned image
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        raise ValueError("Could not encode image")
+    return media_store.put(encoded.tobytes(), owner=owner)
+
+def process_image(image_url):
+    """Process image: download, remove metadata, blur faces, and save"""
+    image_data = download_image(image_url)
+    return process_image_bytes(image_data.getvalue())
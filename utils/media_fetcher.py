@@ -0,0 +1,89 @@
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import (
+    TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN,
+    MEDIA_MAX_BYTES, MEDIA_CONNECT_TIMEOUT, MEDIA_READ_TIMEOUT,
+    MEDIA_POOL_SIZE, MEDIA_FETCH_PARALLELISM
+)
+
+CHUNK_SIZE = 64 * 1024
+
+class MediaTooLargeError(ValueError):
+    """Raised when a media download exceeds the size cap"""
+
+class MediaFetcher:
+    """Download MMS attachments over pooled keep-alive connections
+
+    All downloads share one requests.Session, so repeated fetches from
+    Twilio's media host reuse TCP/TLS connections. Bodies are streamed and
+    abandoned as soon as they pass max_bytes, and every request has connect
+    and read timeouts so a stalled host can't hold a worker indefinitely.
+    """
+
+    def __init__(self, max_bytes=MEDIA_MAX_BYTES, connect_timeout=MEDIA_CONNECT_TIMEOUT,
+                 read_timeout=MEDIA_READ_TIMEOUT, pool_size=MEDIA_POOL_SIZE,
+                 max_parallel=MEDIA_FETCH_PARALLELISM, auth=None):
+        self.max_bytes = max_bytes
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_parallel = max_parallel
+
+        self.session = requests.Session()
+        # Retry connection failures and transient gateway errors. Read
+        # timeouts are not retried so a stalled host fails within read_timeout.
+        retries = Retry(total=2, read=False, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                        allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if auth:
+            self.session.auth = auth
+
+    def fetch(self, url):
+        """Download one attachment
+
+        Returns:
+            bytes: The response body
+
+        Raises:
+            MediaTooLargeError: If the body is larger than max_bytes
+            requests.RequestException: On network errors, timeouts or HTTP errors
+        """
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+
+            # Reject up front when the server tells us the size
+            declared = response.headers.get('Content-Length')
+            if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+                raise MediaTooLargeError(f"Media is {declared} bytes, limit is {self.max_bytes}")
+
+            body = bytearray()
+            for chunk in response.iter_content(CHUNK_SIZE):
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    raise MediaTooLargeError(f"Media exceeds limit of {self.max_bytes} bytes")
+            return bytes(body)
+
+    def fetch_all(self, urls):
+        """Download several attachments concurrently
+
+        Returns:
+            list: Response bodies in the same order as urls
+
+        Raises:
+            The first download error, after every download has finished
+        """
+        if len(urls) <= 1:
+            return [self.fetch(url) for url in urls]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(urls))) as executor:
+            futures = [executor.submit(self.fetch, url) for url in urls]
+            return [future.result() for future in futures]
+
+# Twilio only requires credentials when HTTP auth for media is enabled on the
+# account, but sending them is harmless; requests drops them on the redirect
+# to the storage host.
+media_fetcher = MediaFetcher(
+    auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN) if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN else None
+)
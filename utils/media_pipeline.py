@@ -0,0 +1,129 @@
+import threading
+from functools import partial
+from utils.image_processing import process_image_bytes
+from utils.media_fetcher import media_fetcher
+from utils.media_store import media_store
+from utils.attachment_executor import attachment_executor
+from database.models import (
+    save_pending_report, claim_media_job, complete_media_job, fail_media_job
+)
+from config import (
+    MEDIA_WORKERS, MEDIA_JOB_MAX_ATTEMPTS, MEDIA_JOB_LEASE_SECONDS, MEDIA_POLL_INTERVAL,
+    MEDIA_JOB_RETRY_BACKOFF
+)
+
+class MediaPipeline:
+    """Background worker pool that finishes privacy processing for reports
+    
+    The /sms webhook saves the report straight away with its images in the
+    'processing' state and queues the media URLs in the media_jobs table.
+    Workers claim jobs from that table, download each image, strip metadata
+    and blur faces, then attach the processed paths to the report. Because
+    the queue lives in SQLite, jobs survive restarts and a job claimed by a
+    worker that died is picked up again once its lease runs out.
+    """
+    
+    def __init__(self, num_workers=MEDIA_WORKERS, max_attempts=MEDIA_JOB_MAX_ATTEMPTS,
+                 lease_seconds=MEDIA_JOB_LEASE_SECONDS, poll_interval=MEDIA_POLL_INTERVAL,
+                 retry_backoff=MEDIA_JOB_RETRY_BACKOFF):
+        self.num_workers = num_workers
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+    
+    def start(self):
+        """Start the worker threads (safe to call more than once)"""
+        if self._threads:
+            return
+        self._stopping.clear()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'media-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self, timeout=5.0):
+        """Ask the workers to exit and wait for them"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+    
+    def submit_report(self, report_text, media_urls, latitude, longitude):
+        """Save a report and queue its media for background processing
+        
+        Returns:
+            int: The new report ID
+        """
+        report_id = save_pending_report(report_text, media_urls, latitude, longitude)
+        self._wakeup.set()
+        return report_id
+    
+    def run_pending(self):
+        """Process queued jobs on the calling thread until the queue is empty
+        
+        Returns:
+            int: Number of jobs processed
+        """
+        processed = 0
+        job = claim_media_job(self.lease_seconds, self.max_attempts)
+        while job is not None:
+            self._run_job(job)
+            processed += 1
+            job = claim_media_job(self.lease_seconds, self.max_attempts)
+        return processed
+    
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            try:
+                job = claim_media_job(self.lease_seconds, self.max_attempts)
+            except Exception as e:
+                print(f"Error claiming media job: {str(e)}")
+                job = None
+            
+            if job is None:
+                # Queue is empty; sleep until a new report arrives or the poll
+                # interval passes (jobs may also come from other processes)
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            
+            self._run_job(job)
+    
+    def _run_job(self, job):
+        """Process every image of one report
+        
+        All attachments are downloaded concurrently, then processed
+        concurrently on the shared attachment executor. Processed paths keep
+        the order the attachments arrived in.
+        """
+        try:
+            bodies = media_fetcher.fetch_all(job['media_urls'])
+            # Stored images are recorded against this attempt until attached
+            process = partial(process_image_bytes, owner=(job['id'], job['attempts']))
+            outcomes = attachment_executor.map(process, bodies)
+        except Exception as e:
+            outcomes = [e]
+        
+        image_paths = [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+        errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+        
+        if errors:
+            # Don't leave half of a failed attempt on disk (files other
+            # reports share are kept)
+            media_store.release_job(job['id'], job['attempts'])
+            print(f"Error processing media for report {job['report_id']}: {str(errors[0])}")
+            # Back off exponentially so a flaky media host isn't hammered
+            fail_media_job(job['id'], job['report_id'], str(errors[0]), job['attempts'],
+                           retry=job['attempts'] < self.max_attempts,
+                           retry_delay=self.retry_backoff * 2 ** (job['attempts'] - 1))
+            return
+        
+        if not complete_media_job(job['id'], job['report_id'], image_paths, job['attempts']):
+            # Nothing took over the references (the report was purged or
+            # another worker finished the job)
+            media_store.release_job(job['id'], job['attempts'])
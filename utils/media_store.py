@@ -0,0 +1,116 @@
+import os
+import hashlib
+import tempfile
+from database.models import transaction, add_blob_ref, release_blob_refs, release_job_blob_refs
+from utils.metrics import metrics
+from config import UPLOAD_FOLDER
+
+class MediaStore:
+    """Content-addressed storage for processed images
+    
+    Files are named after the sha256 of their bytes and fanned out into two
+    levels of directories (ab/cd/abcd....jpg), so an identical photo sent
+    again is stored once and no directory grows past a few hundred entries.
+    Files are written to a temporary name and renamed into place, so a
+    reader never sees a partial image.
+    
+    Every put() takes a reference in the media_blobs table, which is
+    released when the report is purged (or the media job fails). A media
+    job's references are recorded against its attempt until they are
+    attached to the report, so an attempt that dies in between has them
+    released when the job is reclaimed or the report purged. Whoever
+    drops the last reference deletes the file; the reference check and the
+    unlink happen under the SQLite write lock, so a file can never be
+    removed while a concurrent put() of the same bytes is handing it out.
+    """
+    
+    def __init__(self, root=UPLOAD_FOLDER):
+        self.root = root
+    
+    def path_for(self, digest, extension='.jpg'):
+        """Where the file with this sha256 hex digest is stored"""
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + extension)
+    
+    def put(self, data, extension='.jpg', owner=None):
+        """Store bytes (if not stored already) and take a reference to them
+        
+        Args:
+            owner (tuple): (job ID, attempt) of the media job taking the reference
+        
+        Returns:
+            str: Path of the stored file
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, extension)
+        
+        # Write new files before taking the lock so it is only held for a rename
+        temp_path = None if os.path.exists(path) else self._write_temp(path, data)
+        try:
+            with transaction(immediate=True) as conn:
+                add_blob_ref(conn, path, digest, len(data), owner)
+                if os.path.exists(path):
+                    metrics.incr('media_store.dedup_hits')
+                else:
+                    # Rare: the last reference was dropped since the check above
+                    if temp_path is None:
+                        temp_path = self._write_temp(path, data)
+                    os.replace(temp_path, path)
+                    temp_path = None
+                    metrics.incr('media_store.writes')
+        finally:
+            if temp_path is not None:
+                os.remove(temp_path)
+        return path
+    
+    def discard(self, paths):
+        """Release references taken by put() and delete files nobody else holds
+        
+        Returns:
+            int: Number of files deleted
+        """
+        with transaction(immediate=True) as conn:
+            return self._remove(release_blob_refs(conn, paths))
+    
+    def release_job(self, job_id, attempt):
+        """Release the references a media job attempt still holds
+        
+        Only references recorded for the attempt are dropped, so references
+        already released (the job was reclaimed or its report purged) or
+        attached to the report are never released twice.
+        
+        Returns:
+            int: Number of files deleted
+        """
+        with transaction(immediate=True) as conn:
+            return self._remove(release_job_blob_refs(conn, [job_id], attempt))
+    
+    def _remove(self, paths):
+        """Delete unreferenced files; runs under the caller's write lock"""
+        deleted = 0
+        for path in paths:
+            try:
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+    
+    def _write_temp(self, path, data):
+        """Durably write data to a temporary file next to path"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            # mkstemp creates files readable by the owner only
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return temp_path
+
+# Shared store for processed report images
+media_store = MediaStore()
@@ -0,0 +1,74 @@
+import threading
+from collections import deque
+
+class MetricsRegistry:
+    """Thread-safe in-process counters, gauges and timings
+
+    Timings keep a count, total and max plus a bounded window of recent
+    samples so percentiles can be reported without unbounded memory.
+    """
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._timings = {}
+
+    def incr(self, name, value=1):
+        """Add to a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        """Record the current value of something"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, value):
+        """Record one sample of a timing or size distribution"""
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = {
+                    'count': 0, 'sum': 0.0, 'max': 0.0, 'recent': deque(maxlen=self.window)
+                }
+            timing['count'] += 1
+            timing['sum'] += value
+            timing['max'] = max(timing['max'], value)
+            timing['recent'].append(value)
+
+    def snapshot(self):
+        """Get a JSON-serializable copy of every metric"""
+        with self._lock:
+            timings = {}
+            for name, timing in self._timings.items():
+                recent = sorted(timing['recent'])
+                timings[name] = {
+                    'count': timing['count'],
+                    'avg': timing['sum'] / timing['count'],
+                    'max': timing['max'],
+                    'p50': _percentile(recent, 0.50),
+                    'p99': _percentile(recent, 0.99),
+                }
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'timings': timings,
+            }
+
+    def reset(self):
+        """Clear every metric"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+# Shared registry for the whole process
+metrics = MetricsRegistry()
@@ -1,3 +1,25 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+import pytesseract
+from utils.image_processing import download_image, decode_image
+from utils.metrics import metrics
+from utils.vin_check import best_vin
+from config import OCR_CACHE_SIZE, OCR_MAX_REGIONS, VIN_REQUIRE_CHECK_DIGIT
+
+VIN_CHARS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+
+# Tesseract configurations for each stage
+REGION_OCR_CONFIG = f'--oem 3 --psm 7 -c tessedit_char_whitelist={VIN_CHARS}'
+FULL_OCR_CONFIG = f'--oem 3 --psm 6 -c tessedit_char_whitelist={VIN_CHARS}'
+SPARSE_OCR_CONFIG = '--psm 11'
+
+# Images are scaled so OCR sees text at a consistent size
+OCR_TARGET_WIDTH = 1600
+
 def validate_vin(vin):
     """Validate VIN using the standard VIN format rules"""
     # Basic VIN validation - 17 characters, alphanumeric only (excluding I, O, Q)
@@ -8,47 +30,193 @@ def validate_vin(vin):
     valid_chars = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
     return all(char in valid_chars for char in vin.upper())
 
+def find_vin_in_text(ocr_text, require_check_digit=VIN_REQUIRE_CHECK_DIGIT):
+    """Find the most likely VIN in OCR output
+    
+    Common OCR confusions (0/O, 1/I, 5/S, 8/B) are corrected and every
+    reading is ranked, so noise that merely looks like a VIN is rejected
+    before it reaches the stolen-vehicle lookup.
+    
+    Returns:
+        str: The best candidate, or None if none has a valid check digit
+    """
+    return best_vin(ocr_text, require_check_digit)
+
+def preprocess_image(img):
+    """Prepare a BGR image for OCR
+    
+    Converts to grayscale, scales to a consistent width, evens out lighting
+    with CLAHE and removes sensor noise while keeping character edges.
+    
+    Returns:
+        numpy.ndarray: Grayscale image ready for region detection and OCR
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    
+    height, width = gray.shape
+    if width != OCR_TARGET_WIDTH:
+        scale = OCR_TARGET_WIDTH / width
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        gray = cv2.resize(gray, (OCR_TARGET_WIDTH, max(1, int(height * scale))), interpolation=interpolation)
+    
+    gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+    return cv2.bilateralFilter(gray, 5, 50, 50)
+
+def find_vin_regions(gray, max_regions=OCR_MAX_REGIONS):
+    """Find regions likely to hold a VIN
+    
+    A VIN plate or sticker is a single long, thin line of dense characters.
+    Character strokes are picked out with a morphological gradient, merged
+    into text lines with a wide closing kernel, and the resulting blobs are
+    kept if their shape looks like one line of 17 characters.
+    
+    Returns:
+        list: Cropped grayscale regions, largest first
+    """
+    height, width = gray.shape
+    
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+    _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    lines = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (25, 3)))
+    
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        aspect = w / float(h)
+        if 5 <= aspect <= 30 and w >= width * 0.15 and h >= 10:
+            boxes.append((w * h, x, y, w, h))
+    
+    regions = []
+    for _, x, y, w, h in sorted(boxes, reverse=True)[:max_regions]:
+        pad = h // 2
+        regions.append(gray[max(0, y - pad):min(height, y + h + pad), max(0, x - pad):min(width, x + w + pad)])
+    return regions
+
+def perceptual_hash(img):
+    """256-bit difference hash, stable across recompression
+    
+    Only exact matches are used as cache hits, so the hash is kept large
+    enough that two different photos practically never collide.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (17, 16), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return np.packbits(bits).tobytes().hex()
+
+class OCRResultCache:
+    """Thread-safe LRU of OCR results keyed by image hash
+    
+    Results are stored under both the SHA-256 of the image bytes and the
+    image's perceptual hash, so an identical resend hits without decoding
+    and a recompressed copy of the same photo hits after decoding.
+    """
+    
+    def __init__(self, max_entries=OCR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Look up a result; returns (hit, vin)"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True, self._entries[key]
+            return False, None
+    
+    def put(self, keys, vin):
+        """Store a result (which may be None) under one or more keys"""
+        with self._lock:
+            for key in keys:
+                self._entries[key] = vin
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+ocr_cache = OCRResultCache()
+
+class _StageTimer:
+    """Records how long each OCR stage takes"""
+    
+    def __init__(self):
+        self._started = time.perf_counter()
+    
+    def lap(self, stage):
+        now = time.perf_counter()
+        metrics.observe(f'ocr.{stage}_ms', (now - self._started) * 1000)
+        self._started = now
+
+def extract_vin_from_bytes(image_bytes):
+    """Extract a VIN from a photo, running the cheapest OCR stages first
+    
+    Stages:
+        1. Cache lookup by SHA-256 of the bytes, then by perceptual hash
+        2. Preprocess and find candidate VIN regions
+        3. Single-line OCR on each region, stopping at the first valid VIN
+        4. Whole-image OCR with a VIN character whitelist
+        5. Sparse-text OCR over the whole image
+    
+    Returns:
+        str: The VIN, or None if none was found
+    """
+    timer = _StageTimer()
+    
+    sha_key = 'sha:' + hashlib.sha256(image_bytes).hexdigest()
+    hit, vin = ocr_cache.get(sha_key)
+    if hit:
+        metrics.incr('ocr.cache_hits')
+        return vin
+    
+    img = decode_image(image_bytes)
+    phash_key = f'phash:{img.shape[1]}x{img.shape[0]}:{perceptual_hash(img)}'
+    hit, vin = ocr_cache.get(phash_key)
+    timer.lap('decode')
+    if hit:
+        metrics.incr('ocr.cache_hits')
+        ocr_cache.put([sha_key], vin)
+        return vin
+    metrics.incr('ocr.cache_misses')
+    
+    vin = _run_ocr_stages(img, timer)
+    ocr_cache.put([sha_key, phash_key], vin)
+    return vin
+
+def _run_ocr_stages(img, timer):
+    processed = preprocess_image(img)
+    timer.lap('preprocess')
+    
+    regions = find_vin_regions(processed)
+    timer.lap('regions')
+    
+    for region in regions:
+        vin = find_vin_in_text(pytesseract.image_to_string(region, config=REGION_OCR_CONFIG))
+        if vin:
+            timer.lap('region_ocr')
+            metrics.incr('ocr.early_exits')
+            return vin
+    timer.lap('region_ocr')
+    
+    # No VIN in the candidate regions; fall back to the whole image
+    for stage, config in (('full_ocr', FULL_OCR_CONFIG), ('sparse_ocr', SPARSE_OCR_CONFIG)):
+        vin = find_vin_in_text(pytesseract.image_to_string(processed, config=config))
+        timer.lap(stage)
+        if vin:
+            return vin
+    
+    return None
+
 def extract_vin(image_url):
     """Extract VIN from image using OCR"""
     try:
         # Download and open image
         image_data = download_image(image_url)
-        img = np.array(Image.open(image_data))
-        
-        # Preprocess image
-        processed = preprocess_image(img)
-        
-        # Apply OCR
-        ocr_text = pytesseract.image_to_string(processed, config='--psm 11')
-        
-        # Process OCR text to find potential VINs
-        text_lines = ocr_text.split('\n')
-        for line in text_lines:
-            # Clean the line
-            cleaned = re.sub(r'[^A-Z0-9]', '', line.upper())
-            
-            # Look for 17-character sequences that could be VINs
-            potential_vins = re.findall(r'[A-HJ-NPR-Z0-9]{17}', cleaned)
-            
-            for vin in potential_vins:
-                if validate_vin(vin):
-                    return vin
-        
-        # If no valid VIN was found in the OCR text, try a different approach
-        # This uses a more focused OCR with custom configuration
-        custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
-        ocr_text = pytesseract.image_to_string(processed, config=custom_config)
-        
-        # Clean and search again
-        cleaned = re.sub(r'[^A-Z0-9]', '', ocr_text.upper())
-        potential_vins = re.findall(r'[A-HJ-NPR-Z0-9]{17}', cleaned)
-        
-        for vin in potential_vins:
-            if validate_vin(vin):
-                return vin
-                
-        return None
-        
+        return extract_vin_from_bytes(image_data.getvalue())
+    
     except Exception as e:
         print(f"Error extracting VIN: {str(e)}")
-        return None
\ No newline at end of file
+        return None
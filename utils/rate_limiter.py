@@ -0,0 +1,101 @@
+import time
+import threading
+from collections import OrderedDict
+import redis
+from utils.redis_manager import hash_phone_number
+from utils.metrics import metrics
+from config import RATE_LIMITS, RATE_LIMIT_ENABLED
+
+# How long to use the in-process buckets after a Redis error
+REDIS_RETRY_SECONDS = 30
+
+# Budget for messages that match no command (the help reply)
+DEFAULT_RATE_CLASS = 'lookup'
+
+class LocalTokenBuckets:
+    """In-process token buckets, used while Redis is unreachable
+    
+    Each worker process keeps its own buckets, so the effective limit is
+    looser than the shared Redis one, but a single spamming number is
+    still held back. The least recently used buckets are dropped beyond
+    max_buckets.
+    """
+    
+    def __init__(self, max_buckets=100000):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def take(self, key, capacity, period, cost=1, now=None):
+        """Same semantics as RedisManager.take_tokens"""
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated_at) * capacity / period)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            return allowed
+
+class RateLimiter:
+    """Per-number budgets for each class of SMS command
+    
+    A check is one Lua script call in Redis. If Redis fails, checks fall
+    back to in-process buckets for REDIS_RETRY_SECONDS before Redis is
+    tried again, so an outage never blocks messages.
+    """
+    
+    def __init__(self, redis_manager=None, limits=RATE_LIMITS, enabled=RATE_LIMIT_ENABLED):
+        self.redis_manager = redis_manager
+        self.limits = limits
+        self.enabled = enabled
+        self._local = LocalTokenBuckets()
+        self._redis_retry_at = 0
+    
+    def allow(self, phone_number, rate_class, cost=1):
+        """Spend from a number's budget
+        
+        Args:
+            phone_number (str): Sender's phone number
+            rate_class (str): Key of RATE_LIMITS; classes without a limit always pass
+            cost (int): Units to spend, e.g. the number of photos in a report
+        
+        Returns:
+            bool: False if the number is over budget and the request should be rejected
+        """
+        if not self.enabled or rate_class not in self.limits:
+            return True
+        capacity, period = self.limits[rate_class]
+        # An oversized request drains the bucket instead of never passing
+        cost = min(max(cost, 1), capacity)
+        
+        allowed = None
+        if self.redis_manager is not None and time.monotonic() >= self._redis_retry_at:
+            try:
+                allowed = self.redis_manager.take_tokens(rate_class, phone_number, capacity, period, cost)
+            except redis.RedisError as e:
+                print(f"Error checking rate limit in Redis: {str(e)}")
+                self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        if allowed is None:
+            metrics.incr('rate_limit.local_checks')
+            allowed = self._local.take(f'{rate_class}:{hash_phone_number(phone_number)}', capacity, period, cost)
+        
+        if not allowed:
+            metrics.incr(f'rate_limit.throttled.{rate_class}')
+        return allowed
+    
+    def allow_message(self, message, command):
+        """Check an SmsMessage against the budget of the command it matched
+        
+        Args:
+            message (SmsMessage): Parsed webhook
+            command (Command): Matched command, or None for the help reply
+        """
+        rate_class = command.rate_class if command is not None else DEFAULT_RATE_CLASS
+        # Only reports store every photo; check vin reads just the first
+        cost = len(message.image_urls) if rate_class == 'report' else 1
+        return self.allow(message.from_number, rate_class, cost)
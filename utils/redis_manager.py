@@ -1,13 +1,99 @@
 import redis
+import hashlib
 import json
-from config import REDIS_URL
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from config import (
+    REDIS_URL, REDIS_MAX_CONNECTIONS, REDIS_SOCKET_KEEPALIVE, REDIS_HEALTH_CHECK_INTERVAL,
+    REDIS_SOCKET_TIMEOUT, REDIS_PIPELINE_CHUNK, PHONE_HASH_CACHE_SIZE,
+    LOCATION_EVICTION_INTERVAL, LOCATION_EVICTION_BATCH
+)
+
+# Geospatial index of every user's last known location
+USER_LOCATIONS_KEY = 'users:locations'
+# When each member of the geo index expires. Redis can't expire individual
+# members of a sorted set, so stale entries are filtered out of queries and
+# evicted in batches using this companion set.
+USER_LOCATION_EXPIRY_KEY = 'users:locations:expiry'
+
+# Cached NHTSA decode for a VIN
+VEHICLE_DECODE_KEY = 'vin:decode:{}'
+
+# Token bucket for per-number rate limiting: ratelimit:<class>:<hashed number>
+RATE_LIMIT_KEY = 'ratelimit:{}:{}'
+
+# Refills the bucket in KEYS[1] (capacity ARGV[1], ARGV[2] tokens per ms)
+# up to ARGV[3] ms, then takes ARGV[4] tokens if there are enough. One
+# round-trip, and concurrent requests from the same number can't both
+# spend the last token. Returns 1 if the tokens were taken.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1000)
+return allowed
+"""
+
+# Removes up to ARGV[2] members whose expiry is at or before ARGV[1] from both
+# sets in one atomic step, so a user who checks in again mid-eviction is not lost
+EVICT_STALE_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #stale > 0 then
+    redis.call('ZREM', KEYS[1], unpack(stale))
+    redis.call('ZREM', KEYS[2], unpack(stale))
+end
+return #stale
+"""
+
+@lru_cache(maxsize=PHONE_HASH_CACHE_SIZE)
+def hash_phone_number(phone_number):
+    """Hash phone number for privacy
+    
+    Memoized because the same numbers text in all day.
+    """
+    # Remove any non-digit characters
+    clean_number = ''.join(filter(str.isdigit, phone_number))
+    # Create a hash
+    return hashlib.sha256(clean_number.encode()).hexdigest()
+
+def create_redis_client(url=REDIS_URL):
+    """Create a Redis client backed by a tuned connection pool"""
+    return redis.from_url(
+        url,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        socket_keepalive=REDIS_SOCKET_KEEPALIVE,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL
+    )
 
 class RedisManager:
     """Manage Redis operations for scaling to 870k users"""
     
-    def __init__(self):
-        """Initialize Redis connection"""
-        self.redis = redis.from_url(REDIS_URL)
+    def __init__(self, redis_client=None):
+        """Initialize Redis connection
+        
+        Args:
+            redis_client: Existing client to use instead of connecting to
+                REDIS_URL (e.g. a fakeredis instance in tests)
+        """
+        self.redis = redis_client if redis_client is not None else create_redis_client()
+        self._evict_stale = self.redis.register_script(EVICT_STALE_SCRIPT)
+        self._take_tokens = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self._eviction_thread = None
     
     def cache_user_location(self, phone_number, latitude, longitude, ttl=3600):
         """Cache user location for faster lookups
@@ -18,42 +104,176 @@ class RedisManager:
             longitude (float): User's longitude
             ttl (int): Time-to-live in seconds (default 1 hour)
         """
-        # Hash the phone number for privacy
-        hashed_number = self._hash_phone_number(phone_number)
-        
-        # Store location data
-        location_data = {
-            'lat': latitude,
-            'lon': longitude,
-            'updated_at': json.dumps({'$date': int(datetime.now().timestamp() * 1000)})
-        }
-        
-        # Save to Redis with expiration
-        self.redis.setex(
-            f"user:location:{hashed_number}",
-            ttl,
-            json.dumps(location_data)
-        )
+        self.cache_user_locations([(phone_number, latitude, longitude)], ttl)
+    
+    def cache_user_locations(self, updates, ttl=3600, chunk_size=REDIS_PIPELINE_CHUNK):
+        """Cache many user locations with one round-trip per chunk
+        
+        Each chunk is written as a single MULTI pipeline: one SETEX per user
+        plus one GEOADD and one ZADD covering the whole chunk, so the geo
+        entries and their expiries always stay in step.
+        
+        Args:
+            updates (iterable): (phone_number, latitude, longitude) tuples
+            ttl (int): Time-to-live in seconds (default 1 hour)
+            chunk_size (int): Maximum users written per pipeline
+        
+        Returns:
+            int: Number of locations written
+        """
+        written = 0
+        chunk = []
+        for update in updates:
+            chunk.append(update)
+            if len(chunk) >= chunk_size:
+                written += self._write_locations(chunk, ttl)
+                chunk = []
+        if chunk:
+            written += self._write_locations(chunk, ttl)
+        return written
+    
+    def _write_locations(self, chunk, ttl):
+        now = datetime.now()
+        updated_at = json.dumps({'$date': int(now.timestamp() * 1000)})
+        expires_at = now.timestamp() + ttl
+        
+        pipe = self.redis.pipeline(transaction=True)
+        geo_values = []
+        expiries = {}
+        for phone_number, latitude, longitude in chunk:
+            # Hash the phone number for privacy
+            hashed_number = self._hash_phone_number(phone_number)
+            
+            # Store location data
+            location_data = {
+                'lat': latitude,
+                'lon': longitude,
+                'updated_at': updated_at
+            }
+            pipe.setex(
+                f"user:location:{hashed_number}",
+                ttl,
+                json.dumps(location_data)
+            )
+            geo_values.extend((float(longitude), float(latitude), hashed_number))
+            expiries[hashed_number] = expires_at
+        
+        # Index the locations for area searches
+        pipe.geoadd(USER_LOCATIONS_KEY, geo_values)
+        pipe.zadd(USER_LOCATION_EXPIRY_KEY, expiries)
+        pipe.execute()
+        return len(chunk)
     
     def get_users_in_area(self, latitude, longitude, radius_miles=1.0):
         """Get all users in a specific area (useful for emergency alerts)
         
-        In a real implementation, this would use Redis geospatial commands.
-        For simplicity, we're implementing a basic version here.
+        Uses GEOSEARCH on the location index, so the cost is O(log N + M)
+        in the number of indexed users N and matches M. Entries past their
+        TTL that have not been evicted yet are filtered out.
+        
+        Returns:
+            list: Hashed phone numbers of users within the radius
         """
-        # In production, use Redis GEO commands:
-        # GEOADD users:locations longitude latitude hashed_phone_number
-        # GEORADIUS users:locations longitude latitude radius_miles mi
+        members = self.redis.geosearch(
+            USER_LOCATIONS_KEY,
+            longitude=float(longitude),
+            latitude=float(latitude),
+            radius=radius_miles,
+            unit='mi'
+        )
+        if not members:
+            return []
+        
+        expiries = self.redis.zmscore(USER_LOCATION_EXPIRY_KEY, members)
+        now = time.time()
+        return [
+            member.decode() if isinstance(member, bytes) else member
+            for member, expires_at in zip(members, expiries)
+            if expires_at is not None and expires_at > now
+        ]
+    
+    def evict_stale_locations(self, batch_size=LOCATION_EVICTION_BATCH, now=None):
+        """Remove expired users from the location index in bounded batches
+        
+        Args:
+            batch_size (int): Maximum members removed per Redis call
+            now (float): Eviction cutoff as a Unix timestamp (default: now)
+        
+        Returns:
+            int: Number of users evicted
+        """
+        cutoff = time.time() if now is None else now
+        evicted = 0
+        while True:
+            removed = self._evict_stale(
+                keys=[USER_LOCATION_EXPIRY_KEY, USER_LOCATIONS_KEY],
+                args=[cutoff, batch_size]
+            )
+            evicted += removed
+            if removed < batch_size:
+                return evicted
+    
+    def start_location_eviction(self, interval=LOCATION_EVICTION_INTERVAL):
+        """Evict stale locations every `interval` seconds on a background thread"""
+        if self._eviction_thread is not None:
+            return
+        
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.evict_stale_locations()
+                except redis.RedisError as e:
+                    print(f"Error evicting stale locations: {str(e)}")
+        
+        self._eviction_thread = threading.Thread(target=run, name='location-eviction', daemon=True)
+        self._eviction_thread.start()
+    
+    def get_vehicle_decodes(self, vins):
+        """Look up cached VIN decodes with a single MGET
         
-        # Simplified approach for this example:
-        # This would scan the recent locations in Redis and filter by distance
-        # For demo purposes only - not efficient for 870k users
-        return []
+        Returns:
+            dict: VIN -> decoded details, for the VINs that were cached
+        """
+        if not vins:
+            return {}
+        values = self.redis.mget([VEHICLE_DECODE_KEY.format(vin) for vin in vins])
+        return {vin: json.loads(value) for vin, value in zip(vins, values) if value is not None}
+    
+    def cache_vehicle_decodes(self, decodes, ttl):
+        """Cache VIN decodes in one pipeline
+        
+        Args:
+            decodes (dict): VIN -> decoded details
+            ttl (int): Time-to-live in seconds
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for vin, details in decodes.items():
+            pipe.setex(VEHICLE_DECODE_KEY.format(vin), ttl, json.dumps(details))
+        pipe.execute()
+    
+    def take_tokens(self, rate_class, phone_number, capacity, period, cost=1, now=None):
+        """Spend from a phone number's token bucket for a class of commands
+        
+        The bucket holds up to `capacity` tokens and refills completely over
+        `period` seconds. Buckets live under the hashed number and expire
+        once they would be full again.
+        
+        Args:
+            rate_class (str): Budget name, e.g. 'call' or 'report'
+            phone_number (str): Sender's phone number (hashed for privacy)
+            capacity (int): Burst size
+            period (float): Seconds to refill an empty bucket
+            cost (int): Tokens to take
+            now (float): Current Unix time (default: now)
+        
+        Returns:
+            bool: True if the tokens were taken, False if the number is over budget
+        """
+        now_ms = int((time.time() if now is None else now) * 1000)
+        key = RATE_LIMIT_KEY.format(rate_class, self._hash_phone_number(phone_number))
+        return bool(self._take_tokens(keys=[key], args=[capacity, capacity / (period * 1000), now_ms, cost]))
     
     def _hash_phone_number(self, phone_number):
         """Hash phone number for privacy"""
-        import hashlib
-        # Remove any non-digit characters
-        clean_number = ''.join(filter(str.isdigit, phone_number))
-        # Create a hash
-        return hashlib.sha256(clean_number.encode()).hexdigest()
\ No newline at end of file
+        return hash_phone_number(phone_number)
@@ -0,0 +1,176 @@
+import os
+import uuid
+import fcntl
+import socket
+import threading
+from apscheduler.schedulers.background import BackgroundScheduler
+import redis
+from utils.metrics import metrics
+from config import (
+    RETENTION_TICK_SECONDS, RETENTION_CHUNKS_PER_TICK, RETENTION_LEADER_LOCK,
+    RETENTION_LOCK_PATH, RETENTION_LEADER_TTL
+)
+
+# Redis key holding the current retention leader's token
+RETENTION_LEADER_KEY = 'retention:leader'
+
+# Extends the leader key's TTL only if this process still holds it
+RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Deletes the leader key only if this process still holds it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class FileLeaderLock:
+    """Leader election between the processes on one host (e.g. gunicorn workers)
+    
+    The first process to flock() the lock file stays leader until it
+    exits; the kernel releases the lock if it dies, and another worker
+    takes over on its next tick.
+    """
+    
+    def __init__(self, path=RETENTION_LOCK_PATH):
+        self.path = path
+        self._file = None
+        self._pid = None
+    
+    def acquire(self):
+        """Become or stay leader
+        
+        Returns:
+            bool: True if this process is the leader
+        """
+        # A lock inherited across a fork belongs to the parent
+        if self._file is not None and self._pid == os.getpid():
+            return True
+        self._file = None
+        lock_file = open(self.path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        self._pid = os.getpid()
+        return True
+    
+    def release(self):
+        if self._file is not None and self._pid == os.getpid():
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        self._file = None
+
+class RedisLeaderLock:
+    """Leader election across hosts through a Redis key with a TTL
+    
+    The leader renews the key on every tick. If it stops (crash, network
+    partition) the key expires after ttl seconds and another process
+    takes over.
+    """
+    
+    def __init__(self, redis_client, ttl=RETENTION_LEADER_TTL, key=RETENTION_LEADER_KEY):
+        self.redis = redis_client
+        self.ttl_ms = int(ttl * 1000)
+        self.key = key
+        self.token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}'
+        self._renew = self.redis.register_script(RENEW_LOCK_SCRIPT)
+        self._release = self.redis.register_script(RELEASE_LOCK_SCRIPT)
+    
+    def acquire(self):
+        """Become or stay leader
+        
+        Returns:
+            bool: True if this process is the leader
+        """
+        if self._renew(keys=[self.key], args=[self.token, self.ttl_ms]):
+            return True
+        return bool(self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms))
+    
+    def release(self):
+        self._release(keys=[self.key], args=[self.token])
+
+def create_leader_lock(redis_manager, kind=RETENTION_LEADER_LOCK):
+    """The leader lock configured by RETENTION_LEADER_LOCK ('file' or 'redis')"""
+    if kind == 'redis':
+        return RedisLeaderLock(redis_manager.redis)
+    return FileLeaderLock()
+
+class RetentionScheduler:
+    """Expires data continuously instead of in an hourly cron batch
+    
+    Every tick_seconds the leader purges up to chunks_per_tick chunks with
+    the RetentionEngine, so reports are gone within about one tick of
+    their retention period ending and no run is a mass delete. Every
+    worker runs the scheduler; the leader lock makes sure only one of
+    them purges at a time.
+    
+    Gauges: retention.leader (1 on the leader), retention.backlog (expired
+    reports still stored) and retention.lag_seconds (how long past its
+    expiry the oldest stored report is).
+    """
+    
+    def __init__(self, engine, leader_lock, tick_seconds=RETENTION_TICK_SECONDS,
+                 chunks_per_tick=RETENTION_CHUNKS_PER_TICK):
+        self.engine = engine
+        self.leader_lock = leader_lock
+        self.tick_seconds = tick_seconds
+        self.chunks_per_tick = chunks_per_tick
+        self._scheduler = None
+        self._lock = threading.Lock()
+    
+    def tick(self):
+        """Purge one bounded batch if this process is the leader
+        
+        Returns:
+            PurgeStats: The batch purged, or None if another process is the leader
+        """
+        # APScheduler never overlaps ticks, but tick() may also be called directly
+        with self._lock:
+            try:
+                leader = self.leader_lock.acquire()
+            except (redis.RedisError, OSError) as e:
+                print(f"Error acquiring retention leader lock: {str(e)}")
+                leader = False
+            metrics.set_gauge('retention.leader', int(leader))
+            if not leader:
+                return None
+            
+            try:
+                stats = self.engine.purge(max_chunks=self.chunks_per_tick)
+                metrics.set_gauge('retention.backlog', self.engine.backlog())
+                metrics.set_gauge('retention.lag_seconds', round(self.engine.lag_seconds(), 1))
+                return stats
+            except Exception as e:
+                metrics.incr('retention.errors')
+                print(f"Error purging expired reports: {str(e)}")
+                return None
+    
+    def start(self):
+        """Start ticking on a background scheduler thread (safe to call more than once)"""
+        if self._scheduler is not None:
+            return
+        self.engine.start_image_deleter()
+        self._scheduler = BackgroundScheduler(daemon=True)
+        self._scheduler.add_job(self.tick, 'interval', seconds=self.tick_seconds, id='retention',
+                                max_instances=1, coalesce=True)
+        self._scheduler.start()
+    
+    def stop(self):
+        """Stop ticking and give up leadership"""
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=True)
+            self._scheduler = None
+        self.engine.stop_image_deleter()
+        try:
+            self.leader_lock.release()
+        except (redis.RedisError, OSError) as e:
+            print(f"Error releasing retention leader lock: {str(e)}")
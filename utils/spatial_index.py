@@ -0,0 +1,177 @@
+import math
+import threading
+import numpy as np
+
+# Same earth radius as utils.bait_car_api.calculate_distance
+EARTH_RADIUS_MILES = 3956
+MILES_PER_DEGREE_LAT = 69.0
+
+def haversine_miles(lat, lon, lats, lons):
+    """Vectorized haversine distance from one point to many
+
+    Args:
+        lat (float): Origin latitude
+        lon (float): Origin longitude
+        lats (numpy.ndarray): Target latitudes
+        lons (numpy.ndarray): Target longitudes
+
+    Returns:
+        numpy.ndarray: Distances in miles
+    """
+    lat_rad = math.radians(lat)
+    lats_rad = np.radians(lats)
+    dlat = lats_rad - lat_rad
+    dlon = np.radians(lons) - math.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat_rad) * np.cos(lats_rad) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def bounding_box(lat, lon, radius_miles):
+    """Lat/lon box enclosing a radius around a point
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lon, max_lon)
+    """
+    dlat = radius_miles / MILES_PER_DEGREE_LAT
+    # Longitude degrees shrink towards the poles; clamp to avoid dividing by zero
+    dlon = radius_miles / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+class GridIndex:
+    """In-memory grid index for radius queries over moving points
+
+    Points are bucketed into fixed-size lat/lon cells (a geohash-style
+    grid). A radius query only visits the cells overlapping the query's
+    bounding box, drops candidates outside the box, and computes exact
+    haversine distances for the rest in one NumPy call.
+
+    Points can be added, moved and removed individually, so the index is
+    updated incrementally as a feed changes rather than rebuilt. copy()
+    shares cells with the original until either side changes them, so a
+    snapshot can be derived from the previous one by syncing only the delta.
+    """
+
+    def __init__(self, cell_degrees=0.01):
+        """Create an empty index
+
+        Args:
+            cell_degrees (float): Cell size in degrees (0.01 is about 0.7 miles)
+        """
+        self.cell_degrees = cell_degrees
+        self._cells = {}
+        self._points = {}
+        # Cells whose member sets are not shared with a copy
+        self._owned_cells = set()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, item_id):
+        return item_id in self._points
+
+    def _cell(self, lat, lon):
+        return (int(math.floor(lat / self.cell_degrees)), int(math.floor(lon / self.cell_degrees)))
+
+    def upsert(self, item_id, lat, lon, payload=None):
+        """Add a point or move an existing one"""
+        with self._lock:
+            existing = self._points.get(item_id)
+            cell = self._cell(lat, lon)
+            if existing is not None and existing[3] != cell:
+                self._remove_from_cell(item_id, existing[3])
+            self._points[item_id] = (lat, lon, payload, cell)
+            self._writable_cell(cell).add(item_id)
+
+    def remove(self, item_id):
+        """Remove a point if it is in the index"""
+        with self._lock:
+            existing = self._points.pop(item_id, None)
+            if existing is not None:
+                self._remove_from_cell(item_id, existing[3])
+
+    def _remove_from_cell(self, item_id, cell):
+        if cell not in self._cells:
+            return
+        members = self._writable_cell(cell)
+        members.discard(item_id)
+        if not members:
+            del self._cells[cell]
+            self._owned_cells.discard(cell)
+
+    def _writable_cell(self, cell):
+        """A cell's member set, copied first if it is shared with a copy"""
+        members = self._cells.get(cell)
+        if members is None or cell not in self._owned_cells:
+            members = self._cells[cell] = set(members or ())
+            self._owned_cells.add(cell)
+        return members
+
+    def copy(self):
+        """A new index holding the same points that can be changed independently
+
+        Only the point and cell dicts are copied; each cell's member set is
+        shared until one of the two indexes changes it.
+        """
+        with self._lock:
+            clone = GridIndex(self.cell_degrees)
+            clone._points = dict(self._points)
+            clone._cells = dict(self._cells)
+            # From now on neither side may change a cell in place
+            self._owned_cells = set()
+            return clone
+
+    def sync(self, points):
+        """Bring the index in line with a full feed snapshot
+
+        Only points that were added, changed or dropped are touched.
+
+        Args:
+            points (dict): Maps item ID to a (lat, lon, payload) tuple
+
+        Returns:
+            int: Number of points added, changed or removed
+        """
+        changed = 0
+        with self._lock:
+            for item_id in list(self._points):
+                if item_id not in points:
+                    self.remove(item_id)
+                    changed += 1
+            for item_id, (lat, lon, payload) in points.items():
+                existing = self._points.get(item_id)
+                if existing is None or existing[:3] != (lat, lon, payload):
+                    self.upsert(item_id, lat, lon, payload)
+                    changed += 1
+        return changed
+
+    def query(self, lat, lon, radius_miles):
+        """Find every point within a radius
+
+        Returns:
+            list: (item_id, payload, distance_miles) tuples, nearest first
+        """
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_miles)
+
+        min_cell = self._cell(min_lat, min_lon)
+        max_cell = self._cell(max_lat, max_lon)
+
+        candidates = []
+        with self._lock:
+            for i in range(min_cell[0], max_cell[0] + 1):
+                for j in range(min_cell[1], max_cell[1] + 1):
+                    for item_id in self._cells.get((i, j), ()):
+                        point = self._points[item_id]
+                        # Bounding-box prefilter before the exact distance
+                        if min_lat <= point[0] <= max_lat and min_lon <= point[1] <= max_lon:
+                            candidates.append((item_id, point[0], point[1], point[2]))
+
+        if not candidates:
+            return []
+
+        lats = np.fromiter((c[1] for c in candidates), dtype=np.float64, count=len(candidates))
+        lons = np.fromiter((c[2] for c in candidates), dtype=np.float64, count=len(candidates))
+        distances = haversine_miles(lat, lon, lats, lons)
+
+        within = np.nonzero(distances <= radius_miles)[0]
+        within = within[np.argsort(distances[within])]
+        return [(candidates[k][0], candidates[k][3], float(distances[k])) for k in within]
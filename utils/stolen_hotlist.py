@@ -0,0 +1,232 @@
+import os
+import time
+import threading
+import numpy as np
+from utils.metrics import metrics
+from config import STOLEN_HOTLIST_PATH, STOLEN_HOTLIST_DELTA_DIR, STOLEN_HOTLIST_SYNC_INTERVAL
+
+VIN_LENGTH = 17
+VIN_CHARS = b"ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+
+# VIN character -> base-33 digit (-1 for anything else), upper or lower case
+_DIGITS = np.full(256, -1, dtype=np.int8)
+_DIGITS[np.frombuffer(VIN_CHARS, dtype=np.uint8)] = np.arange(len(VIN_CHARS))
+_DIGITS[np.frombuffer(VIN_CHARS.lower(), dtype=np.uint8)] = np.arange(len(VIN_CHARS))
+_DIGIT_OF = {chr(code): int(digit) for code, digit in enumerate(_DIGITS) if digit >= 0}
+
+# A VIN packs into 12 bytes: the first 12 characters as a base-33 number
+# (< 2**61) in a big-endian uint64 and the last 5 (< 2**26) in a uint32.
+# Big-endian keeps byte order equal to numeric order, so the packed keys
+# sort and binary-search as plain byte strings.
+_HI_POWERS = 33 ** np.arange(11, -1, -1, dtype=np.int64)
+_LO_POWERS = 33 ** np.arange(4, -1, -1, dtype=np.int64)
+_PACKED = np.dtype([('hi', '>u8'), ('lo', '>u4')])
+KEY_DTYPE = np.dtype('S12')
+_CHUNK_ROWS = 1 << 18
+
+def pack_vin(vin):
+    """Pack one VIN into its 12-byte key
+    
+    Returns:
+        bytes: The key, or None if the VIN is malformed
+    """
+    if len(vin) != VIN_LENGTH:
+        return None
+    try:
+        digits = [_DIGIT_OF[char] for char in vin]
+    except KeyError:
+        return None
+    hi = lo = 0
+    for digit in digits[:12]:
+        hi = hi * 33 + digit
+    for digit in digits[12:]:
+        lo = lo * 33 + digit
+    return hi.to_bytes(8, 'big') + lo.to_bytes(4, 'big')
+
+def pack_vins(vins):
+    """Pack VINs into sortable 12-byte keys, dropping malformed entries
+    
+    Args:
+        vins: A list of VINs (str or bytes) or an 'S17' array
+    
+    Returns:
+        numpy.ndarray: Sorted, de-duplicated keys
+    """
+    raw = np.asarray(vins, dtype=f'S{VIN_LENGTH}')
+    if not len(raw):
+        return np.empty(0, dtype=KEY_DTYPE)
+    
+    packed = np.empty(len(raw), dtype=_PACKED)
+    valid = np.empty(len(raw), dtype=bool)
+    # Work in chunks to bound the size of the int64 temporaries
+    for start in range(0, len(raw), _CHUNK_ROWS):
+        digits = _DIGITS[raw[start:start + _CHUNK_ROWS].view(np.uint8).reshape(-1, VIN_LENGTH)]
+        valid[start:start + len(digits)] = digits.min(axis=1) >= 0
+        digits = digits.astype(np.int64)
+        packed['hi'][start:start + len(digits)] = digits[:, :12] @ _HI_POWERS
+        packed['lo'][start:start + len(digits)] = digits[:, 12:] @ _LO_POWERS
+    packed = packed[valid]
+    
+    keys = np.sort(packed.view(KEY_DTYPE))
+    # Compare neighbours as integers; much faster than comparing byte strings
+    as_ints = keys.view(_PACKED)
+    duplicate = (as_ints['hi'][1:] == as_ints['hi'][:-1]) & (as_ints['lo'][1:] == as_ints['lo'][:-1])
+    return keys[np.concatenate(([True], ~duplicate))]
+
+def _read_vins(path):
+    """Read one VIN per line; for CSV files the VIN is the first column
+    
+    Returns:
+        numpy.ndarray: The VINs as an 'S17' array
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    
+    # Fast path for the usual layout, one bare VIN per line
+    for line_ending in (b'\n', b'\r\n'):
+        width = VIN_LENGTH + len(line_ending)
+        body = data if data.endswith(line_ending) else data + line_ending
+        if len(body) % width == 0:
+            lines = np.frombuffer(body, dtype=np.uint8).reshape(-1, width)
+            if (lines[:, VIN_LENGTH:] == np.frombuffer(line_ending, dtype=np.uint8)).all():
+                return np.ascontiguousarray(lines[:, :VIN_LENGTH]).view(f'S{VIN_LENGTH}').ravel()
+    
+    return np.array([line.split(b',', 1)[0].strip() for line in data.split(b'\n') if len(line) >= VIN_LENGTH],
+                    dtype=f'S{VIN_LENGTH}')
+
+def _merge(keys, added, removed):
+    """Insert and delete sorted keys without re-sorting the whole hotlist"""
+    if len(added):
+        positions = np.searchsorted(keys, added)
+        present = positions < len(keys)
+        present[present] = keys[positions[present]] == added[present]
+        keys = np.insert(keys, positions[~present], added[~present])
+    if len(removed) and len(keys):
+        positions = np.searchsorted(keys, removed)
+        present = positions < len(keys)
+        present[present] = keys[positions[present]] == removed[present]
+        keys = np.delete(keys, positions[present])
+    return keys
+
+class StolenHotlist:
+    """Local copy of the stolen-vehicle hotlist for microsecond lookups
+    
+    The bulk file (one VIN per line) is loaded into a sorted array of packed
+    12-byte keys, about a ninth of the memory a Python set of VIN strings
+    would take, and looked up by binary search.
+    
+    Delta files dropped in delta_dir are applied in name order; each line
+    is "+VIN" to add a vehicle or "-VIN" once it is recovered. Write deltas
+    under a name starting with '.' and rename them into place so a
+    half-written file is never read. A replaced bulk file triggers a full
+    reload, after which only deltas newer than it are applied.
+    
+    Every update builds a new array and swaps the reference, so lookups
+    never take a lock.
+    """
+    
+    def __init__(self, path=STOLEN_HOTLIST_PATH, delta_dir=STOLEN_HOTLIST_DELTA_DIR):
+        self.path = path
+        self.delta_dir = delta_dir
+        self._keys = None
+        self._bulk_mtime = None
+        self._applied_deltas = set()
+        self._sync_lock = threading.Lock()
+        self._sync_thread = None
+    
+    @property
+    def loaded(self):
+        return self._keys is not None
+    
+    def __len__(self):
+        return 0 if self._keys is None else len(self._keys)
+    
+    def contains(self, vin):
+        """Check whether a VIN is on the hotlist
+        
+        Returns:
+            bool: True if listed (malformed VINs are never listed)
+        """
+        keys = self._keys
+        key = pack_vin(vin)
+        if keys is None or key is None:
+            return False
+        index = np.searchsorted(keys, key)
+        return bool(index < len(keys) and keys[index] == key)
+    
+    def load(self):
+        """Load the bulk file and every delta newer than it"""
+        with self._sync_lock:
+            started = time.perf_counter()
+            mtime = os.path.getmtime(self.path)
+            keys = pack_vins(_read_vins(self.path))
+            self._applied_deltas = set()
+            self._bulk_mtime = mtime
+            self._keys = self._apply_deltas(keys)
+            metrics.observe('hotlist.load_ms', (time.perf_counter() - started) * 1000)
+            metrics.set_gauge('hotlist.size', len(self._keys))
+    
+    def sync(self):
+        """Pick up a replaced bulk file or new delta files
+        
+        Returns:
+            bool: True if the hotlist changed
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+        if self._keys is None or os.path.getmtime(self.path) != self._bulk_mtime:
+            self.load()
+            return True
+        
+        with self._sync_lock:
+            keys = self._apply_deltas(self._keys)
+            changed = keys is not self._keys
+            self._keys = keys
+            metrics.set_gauge('hotlist.size', len(keys))
+            return changed
+    
+    def _apply_deltas(self, keys):
+        """Apply unseen delta files to keys, returning the new array"""
+        if not self.delta_dir or not os.path.isdir(self.delta_dir):
+            return keys
+        
+        for name in sorted(os.listdir(self.delta_dir)):
+            path = os.path.join(self.delta_dir, name)
+            if name.startswith('.') or name in self._applied_deltas or not os.path.isfile(path):
+                continue
+            # Deltas older than the bulk file are already part of it
+            if os.path.getmtime(path) <= self._bulk_mtime:
+                self._applied_deltas.add(name)
+                continue
+            
+            added, removed = [], []
+            with open(path, 'rb') as f:
+                for line in f:
+                    line = line.strip()
+                    if line[:1] == b'+':
+                        added.append(line[1:])
+                    elif line[:1] == b'-':
+                        removed.append(line[1:])
+            
+            keys = _merge(keys, pack_vins(added), pack_vins(removed))
+            self._applied_deltas.add(name)
+            metrics.incr('hotlist.deltas_applied')
+        return keys
+    
+    def start_sync(self, interval=STOLEN_HOTLIST_SYNC_INTERVAL):
+        """Load the hotlist, then check for updates every `interval` seconds"""
+        if self._sync_thread is not None or not self.path:
+            return
+        
+        def run():
+            while True:
+                try:
+                    self.sync()
+                except Exception as e:
+                    print(f"Error syncing stolen vehicle hotlist: {str(e)}")
+                time.sleep(interval)
+        
+        self._sync_thread = threading.Thread(target=run, name='hotlist-sync', daemon=True)
+        self._sync_thread.start()
+
+stolen_hotlist = StolenHotlist()
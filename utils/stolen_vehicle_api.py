@@ -1,12 +1,46 @@
 import requests
 import json
 import random
+from utils.stolen_hotlist import stolen_hotlist
+from utils.metrics import metrics
+from utils.vin_decoder import vin_decoder
 from config import NHTSA_API_URL
 
+STOLEN_INSTRUCTIONS = 'Do not approach. Contact IMPD at 317-327-3811.'
+
 # This is a mock implementation. In production, this would connect to the actual NHTSA database
-def check_stolen_status(vin):
+def check_stolen_status(vin, with_details=True):
     """Check if a vehicle with the given VIN is reported stolen
     
+    When the local hotlist is loaded it decides: it is an exact set, so
+    VINs not on it are not stolen and VINs on it are. Hits still go to the
+    remote lookup, but only for report details; its answer never overrides
+    the hotlist.
+    
+    Args:
+        vin (str): Vehicle identification number
+        with_details (bool): Decode the VIN with NHTSA for vehicle_details
+    """
+    if stolen_hotlist.loaded and not stolen_hotlist.contains(vin):
+        metrics.incr('hotlist.misses')
+        return {
+            'is_stolen': False,
+            'vin': vin,
+            'vehicle_details': get_vehicle_details(vin) if with_details else None,
+            'last_checked': 'hotlist'
+        }
+    if stolen_hotlist.loaded:
+        metrics.incr('hotlist.hits')
+        result = query_stolen_status(vin, with_details)
+        result.pop('error', None)
+        result.update({'is_stolen': True, 'vin': vin, 'last_checked': 'hotlist'})
+        result.setdefault('instructions', STOLEN_INSTRUCTIONS)
+        return result
+    return query_stolen_status(vin, with_details)
+
+def query_stolen_status(vin, with_details=True):
+    """Look up a VIN's stolen status remotely
+    
     In a real implementation, this would query the NHTSA database
     or other law enforcement databases. For this project, we'll
     mock the API response.
@@ -25,14 +59,14 @@ def check_stolen_status(vin):
                 'vin': vin,
                 'report_date': '2023-05-15',
                 'report_location': 'Indianapolis, IN',
-                'vehicle_details': get_vehicle_details(vin),
-                'instructions': 'Do not approach. Contact IMPD at 317-327-3811.'
+                'vehicle_details': get_vehicle_details(vin) if with_details else None,
+                'instructions': STOLEN_INSTRUCTIONS
             }
         else:
             return {
                 'is_stolen': False,
                 'vin': vin,
-                'vehicle_details': get_vehicle_details(vin),
+                'vehicle_details': get_vehicle_details(vin) if with_details else None,
                 'last_checked': '2023-08-10'
             }
     
@@ -41,33 +75,14 @@ def check_stolen_status(vin):
         return {'is_stolen': False, 'error': 'Could not verify status', 'vin': vin}
 
 def get_vehicle_details(vin):
-    """Get vehicle details from NHTSA database based on VIN"""
+    """Get vehicle details from NHTSA database based on VIN
+    
+    Decodes never change, so they are served from the VIN decoder's
+    in-process and Redis caches whenever possible.
+    """
     try:
-        # In a real implementation, this would query the NHTSA API
-        # For example: 
-        # response = requests.get(f"{NHTSA_API_URL}/DecodeVin/{vin}?format=json")
-        # data = response.json()
-        
-        # For this project, we'll mock the response
-        # These are common vehicle makes and models
-        makes = ["Toyota", "Honda", "Ford", "Chevrolet", "Nissan", "Jeep", "BMW", "Mercedes-Benz", "Audi"]
-        models = ["Camry", "Civic", "F-150", "Silverado", "Altima", "Wrangler", "X5", "C-Class", "A4"]
-        years = list(range(2010, 2024))
-        
-        # Use VIN to "determine" the vehicle (in a real system, this would come from the API)
-        # This is a deterministic approach so the same VIN always returns the same vehicle
-        vin_sum = sum(ord(c) for c in vin)
-        make = makes[vin_sum % len(makes)]
-        model = models[(vin_sum // 10) % len(models)]
-        year = years[(vin_sum // 100) % len(years)]
-        
-        return {
-            'make': make,
-            'model': model,
-            'year': year,
-            'color': ['Black', 'White', 'Silver', 'Blue', 'Red'][(vin_sum // 1000) % 5]
-        }
+        return vin_decoder.decode(vin)
         
     except Exception as e:
         print(f"Error fetching vehicle details: {str(e)}")
-        return {'make': 'Unknown', 'model': 'Unknown', 'year': 'Unknown'}
\ No newline at end of file
+        return {'make': 'Unknown', 'model': 'Unknown', 'year': 'Unknown', 'color': 'Unknown'}
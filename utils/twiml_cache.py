@@ -0,0 +1,83 @@
+import os
+import threading
+from string import Template
+from twilio.twiml.messaging_response import MessagingResponse
+from config import TWIML_CACHE_MAX_ROOTS
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+def render_message(text):
+    """Serialize a one-message SMS reply"""
+    resp = MessagingResponse()
+    resp.message(text)
+    return str(resp)
+
+def template_renderer(path):
+    """Renderer for a TwiML file in templates/
+    
+    The file is read once; $url_root in it is replaced per server URL.
+    """
+    with open(path, encoding='utf-8') as f:
+        template = Template(f.read())
+    return lambda url_root: template.safe_substitute(url_root=url_root)
+
+class TwimlCache:
+    """Pre-encoded TwiML bodies for static replies
+    
+    SMS replies registered with add_messages are rendered once, up front.
+    Voice scripts only vary by the server's URL root, so each is rendered
+    the first time a URL root is seen and then served as the same bytes.
+    At most max_roots URL roots are kept (the root comes from the Host
+    header); beyond that, responses are rendered per request.
+    
+    Replies that aren't registered (report IDs, VINs) are rendered as
+    usual, so every reply can go through message().
+    """
+    
+    def __init__(self, max_roots=TWIML_CACHE_MAX_ROOTS):
+        self.max_roots = max_roots
+        self._messages = {}
+        self._voice = {}
+        self._rendered = {}
+        self._roots = set()
+        self._lock = threading.Lock()
+    
+    def add_messages(self, *texts):
+        """Pre-render SMS replies that never change"""
+        for text in texts:
+            self._messages[text] = render_message(text).encode('utf-8')
+    
+    def add_voice(self, name, render):
+        """Register a voice script
+        
+        Args:
+            name (str): Script name, e.g. 'emergency_call'
+            render (callable): Takes the URL root, returns the TwiML string
+        """
+        self._voice[name] = render
+        with self._lock:
+            self._rendered = {key: body for key, body in self._rendered.items() if key[0] != name}
+    
+    def message(self, text):
+        """TwiML bytes for a one-message SMS reply"""
+        body = self._messages.get(text)
+        if body is None:
+            body = render_message(text).encode('utf-8')
+        return body
+    
+    def voice(self, name, url_root):
+        """TwiML bytes for a voice script
+        
+        Raises:
+            KeyError: If no script is registered under name
+        """
+        body = self._rendered.get((name, url_root))
+        if body is not None:
+            return body
+        
+        body = self._voice[name](url_root).encode('utf-8')
+        with self._lock:
+            if url_root in self._roots or len(self._roots) < self.max_roots:
+                self._roots.add(url_root)
+                self._rendered[(name, url_root)] = body
+        return body
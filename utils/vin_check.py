@@ -0,0 +1,211 @@
+import re
+from itertools import accumulate, combinations
+import numpy as np
+from config import VIN_MAX_CORRECTIONS
+
+VIN_LENGTH = 17
+CHECK_DIGIT_INDEX = 8
+MODEL_YEAR_INDEX = 9
+
+# ISO 3779 / 49 CFR 565 transliteration and position weights
+_TRANSLITERATION = {
+    **{str(digit): digit for digit in range(10)},
+    'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
+    'J': 1, 'K': 2, 'L': 3, 'M': 4, 'N': 5, 'P': 7, 'R': 9,
+    'S': 2, 'T': 3, 'U': 4, 'V': 5, 'W': 6, 'X': 7, 'Y': 8, 'Z': 9,
+}
+_WEIGHTS = np.array([8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2], dtype=np.int64)
+
+# Lookup table from ASCII code to transliterated value (-1 for illegal characters)
+_VALUES = np.full(128, -1, dtype=np.int64)
+for _char, _value in _TRANSLITERATION.items():
+    _VALUES[ord(_char)] = _value
+
+# Model year codes never use these characters
+_INVALID_YEAR_CODES = np.zeros(128, dtype=bool)
+for _char in 'UZ0':
+    _INVALID_YEAR_CODES[ord(_char)] = True
+
+# What each OCR character could really be. The first entry is the reading
+# to use by default; I, O and Q never appear in a VIN so they are always
+# corrected. Later entries are alternatives worth trying.
+_READINGS = {char: (char,) for char in _TRANSLITERATION}
+_READINGS.update({
+    'O': ('0',), 'Q': ('0',), 'I': ('1',),
+    '5': ('5', 'S'), 'S': ('S', '5'),
+    '8': ('8', 'B'), 'B': ('B', '8'),
+})
+
+_ALNUM_RUN = re.compile(r'[A-Z0-9]+')
+
+# First and alternative reading of each ASCII code (0 if there is no alternative)
+_BASE_CODES = np.zeros(128, dtype=np.uint8)
+_ALT_CODES = np.zeros(128, dtype=np.uint8)
+for _char, _reading in _READINGS.items():
+    _BASE_CODES[ord(_char)] = ord(_reading[0])
+    if len(_reading) > 1:
+        _ALT_CODES[ord(_char)] = ord(_reading[1])
+
+# Swap tables for n ambiguous positions with up to k substitutions,
+# precomputed so expanding windows is a table lookup
+_MAX_CORRECTIONS = 4
+
+def _swap_table(n, k):
+    """Every way to pick at most k of n ambiguous positions to swap
+
+    Returns:
+        tuple: (masks, widths) where row r of masks is True in column j if
+        the r-th combination swaps the j-th ambiguous position (column n is
+        always False, for positions that are not ambiguous), and widths[r]
+        is how many ambiguous positions a window needs for the combination
+        to apply to it. Rows are ordered by size, then lexicographically,
+        so the rows that fit a window with fewer ambiguous positions come
+        in the same order as in that window's own table.
+    """
+    rows = [()]
+    for size in range(1, min(n, k) + 1):
+        rows.extend(combinations(range(n), size))
+    masks = np.zeros((len(rows), n + 1), dtype=bool)
+    for r, row in enumerate(rows):
+        masks[r, list(row)] = True
+    widths = np.array([row[-1] + 1 if row else 0 for row in rows], dtype=np.int64)
+    return masks, widths
+
+_SWAP_TABLES = [[_swap_table(n, k) for k in range(_MAX_CORRECTIONS + 1)] for n in range(VIN_LENGTH + 1)]
+
+def check_digit(vin):
+    """Compute the ISO 3779 check digit (position 9) for a VIN
+
+    Returns:
+        str: '0'-'9' or 'X', or None if the VIN has illegal characters
+    """
+    codes = np.frombuffer(vin.upper().encode('ascii', 'replace'), dtype=np.uint8)
+    if len(codes) != VIN_LENGTH:
+        return None
+    values = _VALUES[codes]
+    if (values < 0).any():
+        return None
+    remainder = int(values @ _WEIGHTS) % 11
+    return 'X' if remainder == 10 else str(remainder)
+
+def has_valid_check_digit(vin):
+    """Check a VIN's position-9 check digit"""
+    return vin is not None and len(vin) == VIN_LENGTH and check_digit(vin) == vin[CHECK_DIGIT_INDEX].upper()
+
+def _expand(windows, max_corrections):
+    """Corrected readings of 17-character OCR windows, all in one pass
+
+    Every window's ambiguous positions are numbered in order, and the swap
+    table for the most ambiguous window is indexed with those numbers.
+    Combinations reaching past a window's own ambiguous positions are
+    dropped, which leaves exactly that window's combinations.
+
+    Returns:
+        tuple: (candidates, corrections, window_index) where candidates is
+        an (n, 17) uint8 array of ASCII codes, window by window and in
+        table order within a window, corrections counts the optional
+        substitutions in each candidate (at most max_corrections), and
+        window_index says which window each candidate came from
+    """
+    codes = np.frombuffer(''.join(windows).encode(), dtype=np.uint8).reshape(len(windows), VIN_LENGTH)
+    base = _BASE_CODES[codes]
+    alternative = _ALT_CODES[codes]
+    ambiguous = alternative != 0
+    counts = ambiguous.sum(axis=1)
+    width = int(counts.max())
+    masks, widths = _SWAP_TABLES[width][max_corrections]
+    # Number of each ambiguous position within its window; width (a column
+    # that is never swapped) for the rest
+    numbers = np.where(ambiguous, np.cumsum(ambiguous, axis=1) - 1, width)
+
+    window_index, row = np.nonzero(counts[:, None] >= widths[None, :])
+    swaps = masks[row[:, None], numbers[window_index]]
+    candidates = np.where(swaps, alternative[window_index], base[window_index])
+    return candidates, masks.sum(axis=1)[row], window_index
+
+def ocr_windows(ocr_text, max_breaks=2):
+    """Plausible 17-character VIN windows in OCR output
+
+    Separators are removed so a VIN that Tesseract split across lines or
+    spaced out is still found, but a VIN is printed as one unit, so a
+    window must either start and end on a separator with at most max_breaks
+    separators inside, or sit within a single token with a label glued to
+    one end (e.g. "VIN1HGCM...").
+
+    Returns:
+        list: (window, breaks) tuples in reading order
+    """
+    tokens = _ALNUM_RUN.findall(ocr_text.upper())
+    cleaned = ''.join(tokens)
+    boundaries = list(accumulate((len(token) for token in tokens), initial=0))
+    is_boundary = np.zeros(len(cleaned) + 1, dtype=bool)
+    is_boundary[boundaries] = True
+    breaks_before = np.cumsum(is_boundary)
+
+    count = len(cleaned) - VIN_LENGTH + 1
+    if count <= 0:
+        return []
+    starts = np.arange(count)
+    breaks = breaks_before[starts + VIN_LENGTH - 1] - breaks_before[starts]
+    aligned = is_boundary[:count].astype(np.int64) + is_boundary[VIN_LENGTH:]
+    keep = np.flatnonzero(((aligned == 2) & (breaks <= max_breaks)) | ((aligned == 1) & (breaks == 0)))
+    return [(cleaned[start:start + VIN_LENGTH], int(breaks[start])) for start in keep]
+
+def rank_vin_candidates(windows, max_corrections=VIN_MAX_CORRECTIONS):
+    """Generate and rank corrected VIN candidates for OCR windows
+
+    Every window is expanded into its plausible readings (fixing 0/O, 1/I,
+    and up to max_corrections 5/S or 8/B confusions), then all candidates
+    are scored together with table lookups and one matrix product. In order
+    of importance:
+        - a valid check digit
+        - fewer separators inside the window
+        - a legal model-year character (position 10)
+        - fewer optional substitutions
+
+    Args:
+        windows (list): (window, breaks) tuples from ocr_windows
+
+    Returns:
+        list: (vin, has_valid_check_digit) tuples, best first, without duplicates
+    """
+    if not windows:
+        return []
+
+    candidates, corrections, window_index = _expand([window for window, _ in windows], max_corrections)
+    breaks = np.array([breaks for _, breaks in windows])[window_index]
+
+    remainders = (_VALUES[candidates] @ _WEIGHTS) % 11
+    expected = np.where(remainders == 10, ord('X'), ord('0') + remainders)
+    check_ok = candidates[:, CHECK_DIGIT_INDEX] == expected
+    year_ok = ~_INVALID_YEAR_CODES[candidates[:, MODEL_YEAR_INDEX]]
+
+    # One sort key, most important criterion in the highest bits. The sort
+    # is stable and candidates come window by window, so earlier windows
+    # (and combinations) win ties.
+    key = ((~check_ok).astype(np.int64) << 48) | (breaks.astype(np.int64) << 16) \
+        | ((~year_ok).astype(np.int64) << 8) | corrections
+    order = np.argsort(key, kind='stable')
+
+    vins = np.ascontiguousarray(candidates[order]).view(f'S{VIN_LENGTH}').ravel().astype(f'U{VIN_LENGTH}')
+    # A VIN's check digit result depends only on the VIN, so keeping the
+    # first (best-ranked) copy of each is enough
+    return list(dict(zip(vins.tolist(), check_ok[order].tolist())).items())
+
+def best_vin(ocr_text, require_check_digit=True):
+    """Pick the single most likely VIN in OCR output
+
+    Args:
+        ocr_text (str): Raw Tesseract output
+        require_check_digit (bool): Only accept VINs whose check digit is
+            valid (mandatory for North American vehicles)
+
+    Returns:
+        str: The best VIN, or None if no acceptable candidate exists
+    """
+    ranked = rank_vin_candidates(ocr_windows(ocr_text))
+    if not ranked:
+        return None
+    # Candidates with a valid check digit always rank first
+    vin, check_ok = ranked[0]
+    return vin if check_ok or not require_check_digit else None
@@ -0,0 +1,232 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import redis
+import requests
+from utils.metrics import metrics
+from config import (
+    NHTSA_API_URL, NHTSA_TIMEOUT, VIN_DECODE_CACHE_SIZE, VIN_DECODE_CACHE_TTL,
+    VIN_DECODE_REDIS_TTL, VIN_DECODE_BATCH_SIZE
+)
+
+UNKNOWN_VEHICLE = {'make': 'Unknown', 'model': 'Unknown', 'year': 'Unknown', 'color': 'Unknown'}
+
+# How long to skip the Redis tier after a Redis error
+REDIS_RETRY_SECONDS = 30
+
+def parse_decode_result(result):
+    """Turn one NHTSA DecodeVinValues result into vehicle details
+    
+    vPIC has no paint color, so color is always 'Unknown'; it is kept so
+    callers see the same keys as before.
+    """
+    year = (result.get('ModelYear') or '').strip()
+    return {
+        'make': (result.get('Make') or 'Unknown').strip().title(),
+        'model': (result.get('Model') or 'Unknown').strip(),
+        'year': int(year) if year.isdigit() else 'Unknown',
+        'color': 'Unknown',
+        'body_class': (result.get('BodyClass') or '').strip() or None
+    }
+
+class TTLCache:
+    """Thread-safe LRU whose entries also expire after a fixed TTL"""
+    
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Get a cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class VinDecoder:
+    """Cached NHTSA VIN decoding
+    
+    Lookups go through an in-process TTL LRU, then a Redis tier shared by
+    every worker, and only then to NHTSA. Concurrent requests for the same
+    VIN are coalesced so only one upstream call is made, and bulk jobs are
+    decoded up to 50 VINs per request with DecodeVINValuesBatch.
+    
+    Upstream failures return UNKNOWN_VEHICLE and are not cached.
+    """
+    
+    def __init__(self, base_url=NHTSA_API_URL, redis_manager=None, max_entries=VIN_DECODE_CACHE_SIZE,
+                 local_ttl=VIN_DECODE_CACHE_TTL, redis_ttl=VIN_DECODE_REDIS_TTL,
+                 batch_size=VIN_DECODE_BATCH_SIZE, timeout=NHTSA_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.redis_manager = redis_manager
+        self.redis_ttl = redis_ttl
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._cache = TTLCache(max_entries, local_ttl)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._redis_retry_at = 0
+        self._stats = {'local_hits': 0, 'redis_hits': 0, 'coalesced': 0, 'upstream_vins': 0, 'upstream_calls': 0}
+    
+    def decode(self, vin):
+        """Decode one VIN
+        
+        Returns:
+            dict: make, model, year, color and body_class
+        """
+        return self.decode_many([vin])[vin.upper()]
+    
+    def decode_many(self, vins):
+        """Decode several VINs, batching whatever is not cached
+        
+        Returns:
+            dict: Upper-cased VIN -> vehicle details
+        """
+        vins = list(dict.fromkeys(vin.upper() for vin in vins))
+        results = {}
+        
+        missing = []
+        for vin in vins:
+            details = self._cache.get(vin)
+            if details is None:
+                missing.append(vin)
+            else:
+                results[vin] = details
+        self._count('local_hits', len(results))
+        
+        if missing:
+            shared = self._redis_get(missing)
+            for vin, details in shared.items():
+                self._cache.put(vin, details)
+            results.update(shared)
+            self._count('redis_hits', len(shared))
+            missing = [vin for vin in missing if vin not in shared]
+        
+        if missing:
+            results.update(self._fetch_coalesced(missing))
+        return results
+    
+    def _fetch_coalesced(self, vins):
+        """Fetch VINs from NHTSA, joining any fetch already in progress"""
+        owned, waiting = [], {}
+        with self._lock:
+            for vin in vins:
+                future = self._in_flight.get(vin)
+                if future is None:
+                    self._in_flight[vin] = Future()
+                    owned.append(vin)
+                else:
+                    waiting[vin] = future
+        self._count('coalesced', len(waiting))
+        
+        results = {}
+        try:
+            fetched = self._fetch_upstream(owned) if owned else {}
+        except Exception as e:
+            print(f"Error decoding VINs with NHTSA: {str(e)}")
+            fetched = {}
+        
+        for vin, details in fetched.items():
+            self._cache.put(vin, details)
+        self._redis_put(fetched)
+        
+        with self._lock:
+            for vin in owned:
+                self._in_flight.pop(vin).set_result(fetched.get(vin))
+        for vin in owned:
+            results[vin] = fetched.get(vin) or dict(UNKNOWN_VEHICLE)
+        
+        for vin, future in waiting.items():
+            results[vin] = future.result() or dict(UNKNOWN_VEHICLE)
+        return results
+    
+    def _fetch_upstream(self, vins):
+        """Call NHTSA for VINs that are in no cache"""
+        fetched = {}
+        if len(vins) == 1:
+            self._count('upstream_calls')
+            response = self.session.get(f"{self.base_url}/DecodeVinValues/{vins[0]}",
+                                        params={'format': 'json'}, timeout=self.timeout)
+            response.raise_for_status()
+            fetched[vins[0]] = parse_decode_result(response.json()['Results'][0])
+        else:
+            for start in range(0, len(vins), self.batch_size):
+                self._count('upstream_calls')
+                batch = vins[start:start + self.batch_size]
+                response = self.session.post(f"{self.base_url}/DecodeVINValuesBatch/",
+                                             data={'format': 'json', 'data': ';'.join(batch)},
+                                             timeout=self.timeout)
+                response.raise_for_status()
+                for result in response.json()['Results']:
+                    vin = (result.get('VIN') or '').upper()
+                    if vin in batch:
+                        fetched[vin] = parse_decode_result(result)
+        self._count('upstream_vins', len(fetched))
+        return fetched
+    
+    def _redis_get(self, vins):
+        if self.redis_manager is None or time.monotonic() < self._redis_retry_at:
+            return {}
+        try:
+            return self.redis_manager.get_vehicle_decodes(vins)
+        except redis.RedisError as e:
+            print(f"Error reading VIN decodes from Redis: {str(e)}")
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+            return {}
+    
+    def _redis_put(self, decodes):
+        if not decodes or self.redis_manager is None or time.monotonic() < self._redis_retry_at:
+            return
+        try:
+            self.redis_manager.cache_vehicle_decodes(decodes, self.redis_ttl)
+        except redis.RedisError as e:
+            print(f"Error caching VIN decodes in Redis: {str(e)}")
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+    
+    def _count(self, name, value=1):
+        if not value:
+            return
+        with self._lock:
+            self._stats[name] += value
+        metrics.incr(f'vin_decode.{name}', value)
+    
+    def stats(self):
+        """Cache counters plus the overall hit rate
+        
+        Returns:
+            dict: Hit counts per tier, upstream usage and hit_rate (0-1)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats['local_hits'] + stats['redis_hits'] + stats['coalesced']
+        lookups = hits + stats['upstream_vins']
+        stats['hit_rate'] = hits / lookups if lookups else 0.0
+        return stats
+    
+    def clear(self):
+        """Drop the in-process tier"""
+        self._cache.clear()
+
+# app.py attaches its RedisManager, so the Redis tier shares the app's pool
+vin_decoder = VinDecoder()